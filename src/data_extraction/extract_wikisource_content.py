@@ -1,22 +1,31 @@
+import os
 import requests
-from bs4 import BeautifulSoup
+from functools import partial
 from loguru import logger
 from pathlib import Path
+from typing import Optional
 
+from data_extraction.html_parsing import HTMLContent, map_files
 
-def download_html(url: str, output_path: Path) -> None:
+
+def download_html(url: str, output_path: Path, session: Optional[requests.Session] = None) -> None:
     """
     Downloads the HTML content of a given URL and saves it to the specified file path.
 
+    For whole journals, use `wikisource_crawler.WikisourceCrawler`, which
+    fetches concurrently and revalidates pages that were already downloaded.
+
     Args:
         url (str): URL of the page to download.
         output_path (Path): Path to save the HTML content.
+        session (Optional[requests.Session]): Session reused across calls (keeps
+            connections alive); a one-off request is made if omitted.
     """
     if output_path.exists():
         logger.info(f"HTML file already exists: {output_path}")
         return
 
-    response = requests.get(url)
+    response = (session or requests).get(url, timeout=30)
     response.raise_for_status()
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -24,27 +33,47 @@ def download_html(url: str, output_path: Path) -> None:
     logger.success(f"HTML downloaded and saved to: {output_path}")
 
 
-def extract_text_from_html(html_path: Path, text_output_path: Path) -> None:
+def extract_text_from_html(html_path: Path, text_output_path: Path, backend: Optional[str] = None) -> None:
     """
     Extracts text from a saved HTML file and saves it to a text file.
 
     Args:
         html_path (Path): Path to the saved HTML file.
         text_output_path (Path): Path to save the extracted text.
+        backend (Optional[str]): HTML parser (the fastest installed one if omitted).
     """
-    html_content = html_path.read_text(encoding='utf-8')
-    soup = BeautifulSoup(html_content, 'html.parser')
-
-    main_div = soup.find('div', class_='mw-parser-output')
-    if not main_div:
+    content = HTMLContent.from_file(html_path, backend)
+    if not content.found:
         logger.error("Main content not found in HTML.")
         return
 
-    text = main_div.get_text(separator='\n', strip=True)
+    text = content.text(separator='\n', strip=True)
     text_output_path.write_text(text, encoding='utf-8')
     logger.success(f"Extracted text saved to: {text_output_path}")
 
 
+def _extract_text_to_folder(html_path: Path, html_dir: Path, output_dir: Path) -> None:
+    """Extract one page of a directory, mirroring its relative path under `output_dir`."""
+    text_output_path = (output_dir / html_path.relative_to(html_dir)).with_suffix(".txt")
+    text_output_path.parent.mkdir(parents=True, exist_ok=True)
+    extract_text_from_html(html_path, text_output_path)
+
+
+def extract_text_from_directory(html_dir: Path, output_dir: Path, workers: int = os.cpu_count() or 1) -> None:
+    """
+    Extracts the text of every HTML file below a folder, in parallel.
+
+    Args:
+        html_dir (Path): Folder of saved HTML files (searched recursively).
+        output_dir (Path): Folder of the text files (same relative paths).
+        workers (int): Number of processes.
+    """
+    html_files = sorted(html_dir.rglob("*.html"))
+    for _ in map_files(partial(_extract_text_to_folder, html_dir=html_dir, output_dir=output_dir), html_files, workers):
+        pass
+    logger.info(f"Extracted the text of {len(html_files)} HTML files to: {output_dir}")
+
+
 if __name__ == "__main__":
     url = "https://vi.m.wikisource.org/wiki/Nam_Phong_t%E1%BA%A1p_ch%C3%AD/Quy%E1%BB%83n_I/S%E1%BB%91_1/T%E1%BB%B1-v%E1%BB%B1ng"
     output_folder = Path("data/Nam-Phong/Quyen-1/So-1/")
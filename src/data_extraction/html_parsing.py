@@ -0,0 +1,272 @@
+import argparse
+import os
+import random
+import time
+from bs4 import BeautifulSoup, SoupStrainer
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from loguru import logger
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+CONTENT_CLASS = "mw-parser-output"
+# Elements whose text is not page content (MediaWiki inlines TemplateStyles in the content div)
+SKIPPED_TAGS = ("script", "style")
+
+
+def _has_module(name: str) -> bool:
+    try:
+        __import__(name)
+        return True
+    except ImportError:
+        return False
+
+
+def default_backend() -> str:
+    """
+    Pick the fastest installed HTML parser: selectolax, then lxml, then BeautifulSoup.
+
+    Returns:
+        str: "selectolax", "lxml" or "bs4".
+    """
+    if _has_module("selectolax"):
+        return "selectolax"
+    if _has_module("lxml"):
+        return "lxml"
+    return "bs4"
+
+
+def _join(strings: Iterable[str], separator: str, strip: bool) -> str:
+    """Join text nodes like BeautifulSoup's `get_text(separator, strip)`."""
+    if strip:
+        return separator.join(s.strip() for s in strings if s.strip())
+    return separator.join(strings)
+
+
+class HTMLContent:
+    """
+    Parsed main content of a MediaWiki page (`div.mw-parser-output`), independent of the parser.
+
+    Only the content div is handed to callers; with BeautifulSoup it is the
+    only part of the page that is parsed at all. Pages without the div fall
+    back to the whole document.
+
+    Attributes:
+        backend (str): Parser used ("selectolax", "lxml" or "bs4").
+        root (Any): Content node of the backend.
+        found (bool): Whether the content div was found.
+    """
+    def __init__(self, html: str, backend: Optional[str] = None):
+        """
+        Parse a page.
+
+        Args:
+            html (str): HTML of the page.
+            backend (Optional[str]): Parser to use (the fastest installed one if omitted).
+
+        Returns:
+            None
+        """
+        self.backend = backend or default_backend()
+        if self.backend == "selectolax":
+            from selectolax.parser import HTMLParser
+            tree = HTMLParser(html)
+            tree.strip_tags(list(SKIPPED_TAGS))
+            content = tree.css_first(f"div.{CONTENT_CLASS}")
+            self.found = content is not None
+            self.root = content if content is not None else (tree.body or tree.root)
+        elif self.backend == "lxml":
+            import lxml.etree
+            import lxml.html
+            tree = lxml.html.document_fromstring(html)
+            lxml.etree.strip_elements(tree, *SKIPPED_TAGS, with_tail=False)
+            lxml.etree.strip_elements(tree, lxml.etree.Comment, with_tail=False)
+            matches = tree.xpath(
+                f"//div[contains(concat(' ', normalize-space(@class), ' '), ' {CONTENT_CLASS} ')]"
+            )
+            self.found = bool(matches)
+            self.root = matches[0] if matches else tree
+        elif self.backend == "bs4":
+            soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("div", class_=CONTENT_CLASS))
+            content = soup.find("div", class_=CONTENT_CLASS)
+            self.found = content is not None
+            self.root = content if content is not None else BeautifulSoup(html, "html.parser")
+        else:
+            raise ValueError(f"Unknown HTML parser backend: {self.backend}")
+
+    @classmethod
+    def from_file(cls, html_path: Path, backend: Optional[str] = None) -> "HTMLContent":
+        """Parse a saved HTML file."""
+        return cls(html_path.read_text(encoding="utf-8"), backend)
+
+    def text(self, separator: str = "\n", strip: bool = True, node: Any = None) -> str:
+        """
+        Text of the content (or of one of its nodes), like BeautifulSoup's `get_text`.
+
+        Args:
+            separator (str): String inserted between text nodes.
+            strip (bool): Strip text nodes and drop empty ones.
+            node (Any): Backend node to read (the content div if omitted).
+
+        Returns:
+            str: The text.
+        """
+        node = self.root if node is None else node
+        if self.backend == "selectolax":
+            return node.text(deep=True, separator=separator, strip=strip)
+        if self.backend == "lxml":
+            return _join(node.itertext(), separator, strip)
+        return _join(node.strings, separator, strip)
+
+    def _find_all(self, node: Any, tag: str) -> List[Any]:
+        """Descendants of a backend node with a given tag, in document order."""
+        if self.backend == "selectolax":
+            return node.css(tag)
+        if self.backend == "lxml":
+            return node.xpath(f".//{tag}")
+        return node.find_all(tag)
+
+    def paragraphs(self) -> List[str]:
+        """
+        Stripped text of every `<p>` of the content.
+
+        Returns:
+            List[str]: One string per paragraph (possibly empty), in order.
+        """
+        return [self.text("", True, p) for p in self._find_all(self.root, "p")]
+
+    def table_rows(self, strip: bool = False) -> List[List[str]]:
+        """
+        Text of the `<td>` cells of every table row of the content.
+
+        Args:
+            strip (bool): Strip text nodes (and join them without separator).
+
+        Returns:
+            List[List[str]]: Cell texts of each `<tr>` (header-only rows give an empty list).
+        """
+        return [
+            [self.text("", strip, td) for td in self._find_all(tr, "td")]
+            for table in self._find_all(self.root, "table")
+            for tr in self._find_all(table, "tr")
+        ]
+
+
+def map_files(func: Callable[[Path], T], files: Iterable[Path], workers: int = os.cpu_count() or 1) -> Iterator[T]:
+    """
+    Apply a per-file function over a process pool, yielding results in input order.
+
+    Args:
+        func (Callable[[Path], T]): Picklable (module-level) function of one file.
+        files (Iterable[Path]): Files to process.
+        workers (int): Number of processes (1 runs in this process).
+
+    Yields:
+        T: Result of each file.
+    """
+    files = list(files)
+    if workers <= 1 or len(files) <= 1:
+        yield from map(func, files)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(func, files, chunksize=max(len(files) // (workers * 4), 1))
+
+
+def synthetic_page(rng: random.Random, paragraphs: int = 60, rows: int = 40) -> str:
+    """
+    Generate a MediaWiki-like page (navigation, scripts, styles, content with paragraphs and a table).
+
+    Args:
+        rng (random.Random): Random generator.
+        paragraphs (int): Number of content paragraphs.
+        rows (int): Number of table rows.
+
+    Returns:
+        str: HTML of the page.
+    """
+    words = "nước nam phong tạp chí học văn quốc ngữ pháp văn chương la civilisation revue langue".split()
+
+    def sentence(n: int) -> str:
+        return " ".join(rng.choice(words) for _ in range(n))
+
+    nav = "".join(f'<li><a href="/wiki/Page_{i}">{sentence(3)}</a></li>' for i in range(300))
+    body = "".join(f"<p>{sentence(40)} <b>{sentence(3)}</b> {sentence(20)}</p>" for _ in range(paragraphs))
+    table = "".join(
+        f"<tr><td>{sentence(1)}.</td><td>— {sentence(2)} = <i>{sentence(3)}</i> — {sentence(4)}</td></tr>"
+        for _ in range(rows)
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>Page</title>"
+        + "".join(f"<script>var x{i} = {i};</script>" for i in range(30))
+        + f"</head><body><nav><ul>{nav}</ul></nav>"
+        + f'<div id="content"><div class="{CONTENT_CLASS}"><style>.x{{color:red}}</style>'
+        + f"{body}<table>{table}</table></div></div>"
+        + f"<footer>{sentence(50)}</footer></body></html>"
+    )
+
+
+def _baseline_parse(html_path: Path) -> int:
+    """Current path: full-page `html.parser` parse, then lookup of the content div."""
+    soup = BeautifulSoup(html_path.read_text(encoding="utf-8"), "html.parser")
+    main_div = soup.find("div", class_=CONTENT_CLASS) or soup
+    return len(main_div.get_text(separator="\n", strip=True))
+
+
+def _extract_text(html_path: Path, backend: str) -> int:
+    """Shared layer: targeted parse of the content div with the given backend."""
+    return len(HTMLContent.from_file(html_path, backend).text())
+
+
+def benchmark(files: List[Path], workers: int = 1) -> List[dict]:
+    """
+    Measure text extraction throughput of the current path and of each installed backend.
+
+    Args:
+        files (List[Path]): HTML files to parse.
+        workers (int): Number of processes.
+
+    Returns:
+        List[dict]: Per path: name, seconds and pages/sec.
+    """
+    paths = [("baseline (bs4 html.parser, full page)", _baseline_parse)]
+    paths += [(backend, partial(_extract_text, backend=backend)) for backend in ("selectolax", "lxml", "bs4")
+              if backend == "bs4" or _has_module(backend)]
+    results = []
+    for name, func in paths:
+        start = time.perf_counter()
+        for _ in map_files(func, files, workers):
+            pass
+        seconds = time.perf_counter() - start
+        results.append({"name": name, "seconds": seconds, "pages_per_s": len(files) / seconds})
+        logger.info(f"{name}: {len(files)} pages in {seconds:.2f}s ({len(files) / seconds:.1f} pages/s)")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark HTML text extraction (pages/sec) per parser backend.")
+    parser.add_argument("--html-dir", default=None, help="Folder of saved HTML pages (searched recursively)")
+    parser.add_argument("--synthetic", type=int, default=200, help="Pages to generate when no --html-dir is given (default: %(default)s)")
+    parser.add_argument("--work-dir", default="data/bench/html", help="Folder of the synthetic pages (default: %(default)s)")
+    parser.add_argument("--workers", "-w", type=int, default=1, help="Number of processes (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.html_dir:
+        html_files = sorted(Path(args.html_dir).rglob("*.html"))
+    else:
+        work_dir = Path(args.work_dir)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        rng = random.Random(0)
+        html_files = []
+        for i in range(args.synthetic):
+            path = work_dir / f"page_{i:05d}.html"
+            if not path.exists():
+                path.write_text(synthetic_page(rng), encoding="utf-8")
+            html_files.append(path)
+
+    results = benchmark(html_files, args.workers)
+    baseline = results[0]["pages_per_s"]
+    print(f"{'parser':<40} {'pages/s':>9} {'speedup':>8}")
+    for r in results:
+        print(f"{r['name']:<40} {r['pages_per_s']:>9.1f} {r['pages_per_s'] / baseline:>7.1f}x")
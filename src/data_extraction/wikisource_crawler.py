@@ -0,0 +1,312 @@
+import argparse
+import json
+import re
+import threading
+import time
+import unicodedata
+import requests
+from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from loguru import logger
+from pathlib import Path
+from pydantic import BaseModel
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import unquote, urldefrag, urljoin, urlsplit
+
+MANIFEST_FILENAME = "crawl_manifest.json"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CrawlConfig(BaseModel):
+    """
+    Crawler parameters.
+
+    Attributes:
+        max_workers: Concurrent requests (also the size of the connection pool).
+        requests_per_second: Request rate allowed per host.
+        max_retries: Retries of a request on connection errors and 429/5xx responses.
+        backoff: Base delay of the exponential backoff between retries, in seconds.
+        timeout: Request timeout, in seconds.
+        max_depth: Link levels followed from the index pages (0 fetches only the index pages).
+        user_agent: User-Agent header (Wikimedia asks for a descriptive one).
+    """
+    max_workers: int = 8
+    requests_per_second: float = 2.0
+    max_retries: int = 4
+    backoff: float = 1.0
+    timeout: float = 30.0
+    max_depth: int = 3
+    user_agent: str = "ragit-crawler/0.1 (digital humanities research; python-requests)"
+
+
+class HostRateLimiter:
+    """
+    Thread-safe limiter spacing the requests to each host.
+
+    Each caller reserves the next free slot of its host under a lock and
+    sleeps outside of it, so requests to different hosts never wait on each other.
+    """
+    def __init__(self, requests_per_second: float):
+        """
+        Initialize the limiter.
+
+        Args:
+            requests_per_second (float): Rate allowed per host (0 disables limiting).
+
+        Returns:
+            None
+        """
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str) -> None:
+        """Block until a request to `host` is allowed."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot.get(host, now), now)
+            self._next_slot[host] = slot + self.interval
+        time.sleep(max(slot - now, 0.0))
+
+
+def page_output_path(url: str, output_dir: Path) -> Path:
+    """
+    Map a wiki page URL to an ASCII file path mirroring the page hierarchy.
+
+    "/wiki/Nam_Phong_tạp_chí/Quyển_I/Số_1" becomes
+    "Nam-Phong-tap-chi/Quyen-I/So-1.html".
+
+    Args:
+        url (str): Page URL.
+        output_dir (Path): Root folder of the crawl.
+
+    Returns:
+        Path: Path of the saved HTML file.
+    """
+    title = unquote(urlsplit(url).path).removeprefix("/wiki/")
+    segments = []
+    for segment in title.split("/"):
+        ascii_segment = unicodedata.normalize("NFKD", segment.replace("đ", "d").replace("Đ", "D"))
+        ascii_segment = ascii_segment.encode("ascii", "ignore").decode("ascii")
+        segments.append(re.sub(r"[^A-Za-z0-9]+", "-", ascii_segment).strip("-") or "_")
+    return output_dir.joinpath(*segments).with_suffix(".html")
+
+
+def extract_links(html: str, page_url: str) -> List[str]:
+    """
+    List the wiki subpages linked from the content of a page.
+
+    Only links below the page itself are kept (an issue's articles from an
+    issue page, the issues of a volume from a volume page, ...).
+
+    Args:
+        html (str): HTML of the page.
+        page_url (str): URL of the page, to resolve relative links.
+
+    Returns:
+        List[str]: Absolute URLs of the subpages, without fragments, in page order.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    content = soup.find("div", class_="mw-parser-output") or soup
+    prefix = unquote(urlsplit(page_url).path).rstrip("/") + "/"
+    host = urlsplit(page_url).netloc
+
+    links: List[str] = []
+    for anchor in content.find_all("a", href=True):
+        url = urldefrag(urljoin(page_url, anchor["href"]))[0]
+        parts = urlsplit(url)
+        if parts.netloc == host and not parts.query and unquote(parts.path).startswith(prefix) and url not in links:
+            links.append(url)
+    return links
+
+
+class WikisourceCrawler:
+    """
+    Concurrent, resumable crawler of Wikisource page hierarchies.
+
+    Pages are fetched breadth-first from index pages over one pooled
+    `requests.Session`, with bounded concurrency, a per-host rate limit and
+    retries with exponential backoff. The manifest records each page's file,
+    ETag and Last-Modified, so later crawls revalidate pages with conditional
+    requests and only download what changed.
+
+    Attributes:
+        output_dir (Path): Root folder of the saved HTML files and of the manifest.
+        config (CrawlConfig): Crawler parameters.
+        manifest (Dict[str, dict]): Crawl state per URL.
+    """
+    def __init__(self, output_dir: Path, config: Optional[CrawlConfig] = None, session: Optional[requests.Session] = None):
+        """
+        Initialize the crawler and load the manifest of previous crawls.
+
+        Args:
+            output_dir (Path): Root folder of the crawl.
+            config (Optional[CrawlConfig]): Crawler parameters (defaults if omitted).
+            session (Optional[requests.Session]): Session to use (a pooled one is created if omitted).
+
+        Returns:
+            None
+        """
+        self.output_dir = output_dir
+        self.config = config or CrawlConfig()
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.config.max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["User-Agent"] = self.config.user_agent
+        self.rate_limiter = HostRateLimiter(self.config.requests_per_second)
+
+        manifest_path = self.output_dir / MANIFEST_FILENAME
+        self.manifest: Dict[str, dict] = (
+            json.loads(manifest_path.read_text(encoding="utf-8")) if manifest_path.exists() else {}
+        )
+
+    def save_manifest(self) -> None:
+        """Write the manifest atomically."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = self.output_dir / MANIFEST_FILENAME
+        tmp_path = manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp_path.replace(manifest_path)
+
+    def _request(self, url: str, headers: Dict[str, str]) -> requests.Response:
+        """
+        GET a URL under the rate limit, retrying transient failures with backoff.
+
+        Args:
+            url (str): URL to fetch.
+            headers (Dict[str, str]): Extra request headers (conditional headers).
+
+        Returns:
+            requests.Response: The final response.
+        """
+        host = urlsplit(url).netloc
+        attempt = 0
+        while True:
+            self.rate_limiter.wait(host)
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.config.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.config.max_retries:
+                    raise
+                delay = self.config.backoff * 2 ** attempt
+                logger.warning(f"{e.__class__.__name__} on {url}, retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.config.max_retries:
+                    return response
+                retry_after = response.headers.get("Retry-After", "")
+                delay = float(retry_after) if retry_after.isdigit() else self.config.backoff * 2 ** attempt
+                logger.warning(f"HTTP {response.status_code} on {url}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+    def fetch(self, url: str) -> Tuple[str, Optional[str], dict]:
+        """
+        Fetch one page, revalidating the saved copy if there is one.
+
+        Args:
+            url (str): Page URL.
+
+        Returns:
+            Tuple[str, Optional[str], dict]: The URL, the page HTML (None on
+                failure) and its new manifest entry.
+        """
+        output_path = page_output_path(url, self.output_dir)
+        entry = dict(self.manifest.get(url, {}))
+        headers: Dict[str, str] = {}
+        if output_path.exists():
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        entry["path"] = output_path.relative_to(self.output_dir).as_posix()
+        entry["fetched_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        try:
+            response = self._request(url, headers)
+            if response.status_code == 304:
+                entry["status"] = "not_modified"
+                return url, output_path.read_text(encoding="utf-8"), entry
+            response.raise_for_status()
+        except Exception as e:
+            entry["status"] = "failed"
+            entry["error"] = str(e)
+            return url, None, entry
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = output_path.with_suffix(".tmp")
+        tmp_path.write_text(response.text, encoding="utf-8")
+        tmp_path.replace(output_path)
+        entry.pop("error", None)
+        entry.update(
+            status="downloaded",
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+        return url, response.text, entry
+
+    def crawl(self, index_urls: List[str]) -> Dict[str, int]:
+        """
+        Crawl the index pages and their subpages, level by level.
+
+        Args:
+            index_urls (List[str]): URLs of the index pages (e.g. a volume or the journal page).
+
+        Returns:
+            Dict[str, int]: Number of pages per status (downloaded, not_modified, failed).
+        """
+        seen: Set[str] = set()
+        frontier = [urldefrag(url)[0] for url in index_urls]
+        counts = {"downloaded": 0, "not_modified": 0, "failed": 0}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
+            for depth in range(self.config.max_depth + 1):
+                frontier = [url for url in dict.fromkeys(frontier) if url not in seen]
+                if not frontier:
+                    break
+                seen.update(frontier)
+                logger.info(f"Crawl depth {depth}: {len(frontier)} page(s)")
+
+                next_frontier: List[str] = []
+                for n, (url, html, entry) in enumerate(executor.map(self.fetch, frontier), start=1):
+                    self.manifest[url] = entry
+                    counts[entry["status"]] += 1
+                    if entry["status"] == "failed":
+                        logger.error(f"Failed to fetch {url}: {entry['error']}")
+                    elif depth < self.config.max_depth:
+                        next_frontier.extend(extract_links(html, url))
+                    if n % 50 == 0:
+                        self.save_manifest()
+                self.save_manifest()
+                frontier = next_frontier
+
+        elapsed = time.perf_counter() - start
+        logger.success(f"Crawl completed in {elapsed:.1f}s: {counts}")
+        return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl Wikisource pages and their subpages.")
+    parser.add_argument(
+        "urls", nargs="*",
+        default=["https://vi.m.wikisource.org/wiki/Nam_Phong_t%E1%BA%A1p_ch%C3%AD"],
+        help="Index page URLs (default: the Nam Phong journal page)"
+    )
+    parser.add_argument("--output-dir", "-o", default="data/wikisource", help="Root folder of the crawl (default: %(default)s)")
+    parser.add_argument("--workers", "-w", type=int, default=8, help="Concurrent requests (default: %(default)s)")
+    parser.add_argument("--rate", type=float, default=2.0, help="Requests per second per host (default: %(default)s)")
+    parser.add_argument("--max-depth", type=int, default=3, help="Link levels followed from the index pages (default: %(default)s)")
+    parser.add_argument("--retries", type=int, default=4, help="Retries on transient failures (default: %(default)s)")
+    args = parser.parse_args()
+
+    config = CrawlConfig(
+        max_workers=args.workers,
+        requests_per_second=args.rate,
+        max_depth=args.max_depth,
+        max_retries=args.retries
+    )
+    WikisourceCrawler(Path(args.output_dir), config).crawl(args.urls)
@@ -1,11 +1,17 @@
+import argparse
 import json
+import os
 import yaml
-from bs4 import BeautifulSoup
 from datetime import date
+from functools import partial
 from loguru import logger
 from pathlib import Path
 from pydantic import BaseModel, ConfigDict
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
+
+from data_extraction.html_parsing import HTMLContent, map_files
+
+METADATA_FILENAME = "metadata.yaml"
 
 
 class Metadata(BaseModel):
@@ -49,12 +55,8 @@ def html_to_json(html_path: Path, metadata: Metadata, output_path: Path) -> None
         metadata (Metadata): Metadata object.
         output_path (Path): Path for the output JSON file.
     """
-    # Parse HTML content
-    with html_path.open('r', encoding='utf-8') as file:
-        soup = BeautifulSoup(file, 'html.parser')
-
-    # Extract paragraphs from HTML
-    text_body = [p.get_text(strip=True) for p in soup.find_all('p')]
+    # Extract paragraphs from the page content
+    text_body = HTMLContent.from_file(html_path).paragraphs()
 
     # Create document object
     document = Document(metadata=metadata, text_body=text_body)
@@ -64,16 +66,110 @@ def html_to_json(html_path: Path, metadata: Metadata, output_path: Path) -> None
         json.dump(document.model_dump(mode="json"), file, ensure_ascii=False, indent=2)
 
 
-if __name__ == "__main__":
-    so1_folder = Path("data/Nam-Phong/Quyen-1/So-1")
-    metadata_path = Path("data/Nam-Phong/Quyen-1/So-1/metadata.yaml")
-    output_folder = Path("data/Nam-Phong/Quyen-1/So-1/output_json")
+def _html_to_json_in_folder(html_path: Path, metadata: Metadata, output_folder: Path) -> None:
+    """Convert one HTML file to `<output_folder>/<stem>.json`."""
+    html_to_json(html_path, metadata, output_folder / f"{html_path.stem}.json")
 
-    metadata = parse_yaml_metadata(metadata_path)
 
+def html_folder_to_json(
+    html_folder: Path,
+    metadata: Metadata,
+    output_folder: Path,
+    workers: int = os.cpu_count() or 1
+) -> None:
+    """Convert every HTML file of a folder to JSON, in parallel.
+
+    Args:
+        html_folder (Path): Folder of the HTML files.
+        metadata (Metadata): Metadata object shared by the files.
+        output_folder (Path): Folder for the output JSON files.
+        workers (int): Number of processes.
+    """
     output_folder.mkdir(parents=True, exist_ok=True)
+    html_files = sorted(html_folder.glob("*.html"))
+    convert = partial(_html_to_json_in_folder, metadata=metadata, output_folder=output_folder)
+    for html_file, _ in zip(html_files, map_files(convert, html_files, workers)):
+        logger.info(f"Processed {html_file.name} -> {html_file.stem}.json")
+
+
+def _extract_paragraphs(html_path: Path) -> List[str]:
+    """Paragraphs of the page content of an HTML file."""
+    return HTMLContent.from_file(html_path).paragraphs()
+
+
+def _nearest_metadata(html_path: Path, html_root: Path, cache: Dict[Path, Optional[Metadata]]) -> Optional[Metadata]:
+    """Metadata of the closest `metadata.yaml` in the file's folder or its parents (up to `html_root`)."""
+    folder = html_path.parent
+    while True:
+        if folder not in cache:
+            yaml_file = folder / METADATA_FILENAME
+            cache[folder] = parse_yaml_metadata(yaml_file) if yaml_file.exists() else None
+        if cache[folder] is not None or folder == html_root or folder == folder.parent:
+            return cache[folder]
+        folder = folder.parent
+
+
+def html_tree_to_corpus(
+    html_root: Path,
+    add_document: Callable[[str, List[str], dict], None],
+    metadata: Optional[Metadata] = None,
+    workers: int = os.cpu_count() or 1
+) -> int:
+    """Convert every HTML file below a folder and hand the documents to a corpus writer (bulk mode).
+
+    The writer is injected by the caller, e.g. the `add` method of a
+    `rag.packed_corpus.PackedCorpusWriter`, which stores the documents in
+    shards with the metadata interned in a separate table instead of one
+    indented JSON file per page. Document ids are the relative paths of the
+    pages without extension, so they are unique even for duplicated pages.
 
-    for html_file in so1_folder.glob("*.html"):
-        output_file = output_folder / f"{html_file.stem}.json"
-        html_to_json(html_file, metadata, output_file)
-        logger.info(f"Processed {html_file.name} -> {output_file.name}")
+    Args:
+        html_root (Path): Root folder of the HTML files (searched recursively).
+        add_document (Callable[[str, List[str], dict], None]): Called with the id,
+            paragraphs and JSON-serializable metadata of each page.
+        metadata (Optional[Metadata]): Metadata of every page; if omitted, each page
+            uses the closest `metadata.yaml` in its folder or a parent folder.
+        workers (int): Number of parsing processes.
+
+    Returns:
+        int: Number of converted documents.
+    """
+    html_files = sorted(html_root.rglob("*.html"))
+    metadata_cache: Dict[Path, Optional[Metadata]] = {}
+    count = 0
+    for html_file, text_body in zip(html_files, map_files(_extract_paragraphs, html_files, workers)):
+        page_metadata = metadata or _nearest_metadata(html_file, html_root, metadata_cache)
+        if page_metadata is None:
+            logger.warning(f"No {METADATA_FILENAME} found for {html_file}, skipping")
+            continue
+        doc_id = html_file.relative_to(html_root).with_suffix("").as_posix()
+        add_document(doc_id, text_body, page_metadata.model_dump(mode="json"))
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert Wikisource HTML pages to the JSON corpus format.")
+    parser.add_argument("--html-dir", default="data/Nam-Phong/Quyen-1/So-1", help="Folder of the HTML files (default: %(default)s)")
+    parser.add_argument("--metadata", default=None, help="Metadata YAML of every page (default: <html-dir>/metadata.yaml, or the closest one per page with --packed)")
+    parser.add_argument("--output", "-o", default=None, help="Output folder (default: <html-dir>/output_json, or <html-dir>/corpus with --packed)")
+    parser.add_argument("--packed", action="store_true", help="Bulk mode: write a sharded corpus of all HTML files below --html-dir")
+    parser.add_argument("--format", choices=["parquet", "jsonl.gz"], default=None, help="Packed corpus format (default: parquet if pyarrow is installed)")
+    parser.add_argument("--shard-size", type=int, default=5000, help="Documents per shard (default: %(default)s)")
+    parser.add_argument("--export-json", default=None, metavar="CORPUS_DIR", help="Export a packed corpus back to per-file JSON in --output")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1, help="Number of processes (default: %(default)s)")
+    args = parser.parse_args()
+
+    html_folder = Path(args.html_dir)
+    if args.export_json or args.packed:
+        # The packed corpus format belongs to the RAG pipeline: only imported by these modes
+        from rag.packed_corpus import PackedCorpusWriter, export_json
+    if args.export_json:
+        export_json(Path(args.export_json), Path(args.output or html_folder / "output_json"))
+    elif args.packed:
+        metadata = parse_yaml_metadata(Path(args.metadata)) if args.metadata else None
+        with PackedCorpusWriter(Path(args.output or html_folder / "corpus"), args.format, args.shard_size) as writer:
+            html_tree_to_corpus(html_folder, writer.add, metadata, workers=args.workers)
+    else:
+        metadata = parse_yaml_metadata(Path(args.metadata or html_folder / METADATA_FILENAME))
+        html_folder_to_json(html_folder, metadata, Path(args.output or html_folder / "output_json"), args.workers)
@@ -1,9 +1,13 @@
+import os
 import pandas as pd
 import re
-from bs4 import BeautifulSoup
 from pathlib import Path
 
 from data_extraction.extract_wikisource_content import download_html
+from data_extraction.html_parsing import HTMLContent, map_files
+
+# "— 漢 = Vietnamese — French" definition cell
+DEFINITION_RE = re.compile(r'—\s*(.+?)\s*(=|＝)\s*(.+?)\s*(—)\s*(.+)')
 
 def extract_trilingual_definitions(html_path: Path) -> pd.DataFrame:
     """
@@ -11,26 +15,18 @@ def extract_trilingual_definitions(html_path: Path) -> pd.DataFrame:
 
     Args:
         html_path (Path): Path to the HTML file to parse.
-        output_folder (Path): Base folder where output text files will be stored.
 
     Returns:
         pd.DataFrame: A DataFrame containing the extracted definitions with columns 'term', 'han', 'vi', and 'fr'.
     """
-    html_content = html_path.read_text(encoding='utf-8')
-    soup = BeautifulSoup(html_content, 'html.parser')
-
-    # Iterate over all tables with <tr> elements inside
-    tables = soup.find_all('table')
-    rows = [row.find_all('td') for table in tables for row in table.find_all('tr')]
+    # Cell texts of every table row of the page content
+    rows = HTMLContent.from_file(html_path).table_rows()
 
     all_data = []
     for row in rows:
         if len(row) == 2:
-            term = row[0].get_text(strip=True).rstrip('.')
-            raw_html = row[1].decode_contents()
-            clean_text = re.sub(r'<.*?>', '', raw_html)
-
-            match = re.match(r'—\s*(.+?)\s*(=|＝)\s*(.+?)\s*(—)\s*(.+)', clean_text)
+            term = row[0].strip().rstrip('.')
+            match = DEFINITION_RE.match(row[1])
             if match:
                 han = match.group(1).strip()
                 vi = f"{match.group(3).strip()}"
@@ -40,6 +36,21 @@ def extract_trilingual_definitions(html_path: Path) -> pd.DataFrame:
     return pd.DataFrame(all_data)
 
 
+def extract_trilingual_definitions_from_directory(html_dir: Path, workers: int = os.cpu_count() or 1) -> pd.DataFrame:
+    """
+    Extracts the trilingual definitions of every HTML file below a folder, in parallel.
+
+    Args:
+        html_dir (Path): Folder of saved HTML files (searched recursively).
+        workers (int): Number of processes.
+
+    Returns:
+        pd.DataFrame: The definitions of all files, with columns 'term', 'han', 'vi', and 'fr'.
+    """
+    frames = list(map_files(extract_trilingual_definitions, sorted(html_dir.rglob("*.html")), workers))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["term", "han", "vi", "fr"])
+
+
 if __name__ == "__main__":
     url = "https://vi.m.wikisource.org/wiki/Nam_Phong_t%E1%BA%A1p_ch%C3%AD/Quy%E1%BB%83n_I/S%E1%BB%91_1/T%E1%BB%B1-v%E1%BB%B1ng"
     output_folder = Path("data/Nam-Phong/Quyen-1/So-1/")
@@ -49,7 +60,7 @@ if __name__ == "__main__":
     download_html(url, html_file)
 
     # Extract trilingual definitions
-    df = extract_trilingual_definitions(html_file, output_folder)
+    df = extract_trilingual_definitions(html_file)
     # Save the DataFrame to a CSV file
     output_csv = output_folder / "trilingual_definitions.csv"
     df.to_csv(output_csv, index=False, encoding='utf-8')
@@ -0,0 +1,315 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from loguru import logger
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ocr.ocr_preprocessing import PreprocessConfig, preprocess_image
+
+MANIFEST_FILENAME = "ocr_manifest.json"
+
+
+def tesseract_backend(image_path: Path, lang: str = "vie+fra", config: str = "") -> str:
+    """
+    OCR a page image with Tesseract.
+
+    Args:
+        image_path (Path): Path to the page image.
+        lang (str): Tesseract languages (e.g. "vie+fra").
+        config (str): Extra Tesseract options (e.g. "--psm 6 --oem 1").
+
+    Returns:
+        str: Recognized text.
+    """
+    import pytesseract
+    from PIL import Image
+
+    with Image.open(image_path) as img:
+        return pytesseract.image_to_string(img, lang=lang, config=config)
+
+
+def fake_backend(image_path: Path, lang: str = "vie+fra", config: str = "") -> str:
+    """
+    Deterministic stand-in for Tesseract, for offline tests of the batch runner.
+
+    The "text" is derived from the image bytes and the OCR settings, and a
+    delay of `FAKE_OCR_SECONDS` (default 0) simulates recognition time.
+
+    Args:
+        image_path (Path): Path to the page image.
+        lang (str): Tesseract languages.
+        config (str): Extra Tesseract options.
+
+    Returns:
+        str: Fake recognized text.
+    """
+    delay = float(os.environ.get("FAKE_OCR_SECONDS", "0"))
+    if delay:
+        time.sleep(delay)
+    digest = hashlib.sha256(image_path.read_bytes()).hexdigest()[:16]
+    return f"{image_path.stem} {digest} lang={lang} {config}".strip() + "\n"
+
+
+OCR_BACKENDS: Dict[str, Callable[[Path, str, str], str]] = {
+    "tesseract": tesseract_backend,
+    "fake": fake_backend,
+}
+
+
+def init_worker() -> None:
+    """Limit Tesseract to one thread per process: the pool provides the parallelism."""
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def ocr_page(
+    image_path: Path,
+    output_path: Path,
+    backend: str = "tesseract",
+    lang: str = "vie+fra",
+    config: str = "",
+    preprocess: Optional[PreprocessConfig] = None,
+    cache_dir: Optional[Path] = None
+) -> Tuple[str, float, float, Optional[str]]:
+    """
+    OCR one page and write its text atomically (an interrupted run never
+    leaves a partial output that looks up to date).
+
+    Args:
+        image_path (Path): Path to the page image.
+        output_path (Path): Path of the output text file.
+        backend (str): Name of the OCR backend (see `OCR_BACKENDS`).
+        lang (str): Tesseract languages.
+        config (str): Extra Tesseract options.
+        preprocess (Optional[PreprocessConfig]): Preprocessing applied before OCR.
+        cache_dir (Optional[Path]): Folder of cached preprocessed images.
+
+    Returns:
+        Tuple[str, float, float, Optional[str]]: Image name, total seconds,
+            preprocessing seconds and error message (None on success).
+    """
+    start = time.perf_counter()
+    preprocess_s = 0.0
+    try:
+        if preprocess is not None:
+            ocr_input = preprocess_image(image_path, preprocess, cache_dir)
+            preprocess_s = time.perf_counter() - start
+        else:
+            ocr_input = image_path
+        text = OCR_BACKENDS[backend](ocr_input, lang, config)
+        tmp_path = output_path.with_suffix(".tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        tmp_path.replace(output_path)
+        return image_path.name, time.perf_counter() - start, preprocess_s, None
+    except Exception as e:
+        return image_path.name, time.perf_counter() - start, preprocess_s, str(e)
+
+
+def load_manifest(output_folder: Path) -> dict:
+    """
+    Load the progress manifest of a batch run.
+
+    Args:
+        output_folder (Path): Folder of the OCR outputs.
+
+    Returns:
+        dict: Manifest with the run settings and, per image, its status and OCR time.
+    """
+    manifest_path = output_folder / MANIFEST_FILENAME
+    if not manifest_path.exists():
+        return {"backend": None, "lang": None, "config": None, "preprocess": None, "pages": {}}
+    return json.loads(manifest_path.read_text(encoding="utf-8"))
+
+
+def save_manifest(output_folder: Path, manifest: dict) -> None:
+    """
+    Write the progress manifest atomically.
+
+    Args:
+        output_folder (Path): Folder of the OCR outputs.
+        manifest (dict): Manifest to save.
+    """
+    manifest_path = output_folder / MANIFEST_FILENAME
+    tmp_path = manifest_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp_path.replace(manifest_path)
+
+
+def is_up_to_date(image_path: Path, output_path: Path) -> bool:
+    """
+    Check whether a page's OCR output is newer than its image.
+
+    Args:
+        image_path (Path): Path to the page image.
+        output_path (Path): Path of the output text file.
+
+    Returns:
+        bool: True if the output exists and is at least as recent as the image.
+    """
+    return output_path.exists() and output_path.stat().st_mtime >= image_path.stat().st_mtime
+
+
+def resume_manifest(output_folder: Path, settings: dict) -> dict:
+    """
+    Load the manifest of a previous run, or start a new one if the OCR settings changed.
+
+    Args:
+        output_folder (Path): Folder of the OCR outputs.
+        settings (dict): Backend, languages, Tesseract options and preprocessing of this run.
+
+    Returns:
+        dict: Manifest to update during the run.
+    """
+    manifest = load_manifest(output_folder)
+    if any(manifest.get(key) != value for key, value in settings.items()):
+        if manifest["pages"]:
+            logger.info(f"OCR settings changed in {output_folder}, re-running every page")
+        manifest = {**settings, "pages": {}}
+    return manifest
+
+
+def pending_images(images: List[Path], output_folder: Path, manifest: dict, force: bool = False) -> List[Path]:
+    """
+    Select the images that still need OCR.
+
+    Args:
+        images (List[Path]): Page images.
+        output_folder (Path): Folder of the OCR outputs.
+        manifest (dict): Manifest of the run (see `resume_manifest`).
+        force (bool): Select every image.
+
+    Returns:
+        List[Path]: Images not recorded as done or whose output is older than the image.
+    """
+    todo: List[Path] = []
+    for image in images:
+        entry = manifest["pages"].get(image.name, {})
+        if force or entry.get("status") != "done" or not is_up_to_date(image, output_folder / f"{image.stem}.txt"):
+            todo.append(image)
+    return todo
+
+
+def ocr_batch(
+    folder_path: Path,
+    output_folder: Path,
+    extension: str = "jpg",
+    workers: int = os.cpu_count() or 1,
+    backend: str = "tesseract",
+    lang: str = "vie+fra",
+    config: str = "",
+    preprocess: Optional[PreprocessConfig] = None,
+    cache_dir: Optional[Path] = None,
+    force: bool = False
+) -> dict:
+    """
+    OCR every image of a folder over a process pool, resuming interrupted runs.
+
+    Pages whose output is newer than the image and recorded as done in the
+    manifest are skipped, unless the OCR settings changed. The manifest is
+    updated as pages complete.
+
+    Args:
+        folder_path (Path): Folder containing the page images.
+        output_folder (Path): Folder of the output text files (one per image).
+        extension (str): File extension of the images.
+        workers (int): Number of OCR processes.
+        backend (str): Name of the OCR backend (see `OCR_BACKENDS`).
+        lang (str): Tesseract languages.
+        config (str): Extra Tesseract options.
+        preprocess (Optional[PreprocessConfig]): Preprocessing applied before OCR.
+        cache_dir (Optional[Path]): Folder of cached preprocessed images (default:
+            a `.preprocessed` folder next to the scans).
+        force (bool): Re-OCR every page.
+
+    Returns:
+        dict: Run summary: pages done, skipped and failed, wall time and pages/min.
+    """
+    output_folder.mkdir(parents=True, exist_ok=True)
+    images = sorted(folder_path.glob(f"*.{extension}"))
+    if not images:
+        logger.warning(f"No images with extension '{extension}' found in {folder_path}.")
+        return {"done": 0, "skipped": 0, "failed": 0, "wall_s": 0.0, "preprocess_s": 0.0, "pages_per_min": 0.0}
+
+    settings = {
+        "backend": backend,
+        "lang": lang,
+        "config": config,
+        "preprocess": preprocess.model_dump() if preprocess else None,
+    }
+    manifest = resume_manifest(output_folder, settings)
+    todo = pending_images(images, output_folder, manifest, force)
+    skipped = len(images) - len(todo)
+    logger.info(f"OCR batch: {len(todo)} page(s) to process, {skipped} up to date, {workers} worker(s)")
+
+    done = failed = 0
+    preprocess_total = 0.0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        futures = [
+            executor.submit(
+                ocr_page, image, output_folder / f"{image.stem}.txt",
+                backend, lang, config, preprocess, cache_dir
+            )
+            for image in todo
+        ]
+        for future in as_completed(futures):
+            name, seconds, preprocess_s, error = future.result()
+            preprocess_total += preprocess_s
+            entry = {"seconds": round(seconds, 3), "preprocess_s": round(preprocess_s, 3)}
+            if error is None:
+                done += 1
+                manifest["pages"][name] = {"status": "done", **entry}
+            else:
+                failed += 1
+                manifest["pages"][name] = {"status": "failed", **entry, "error": error}
+                logger.error(f"OCR failed for {name}: {error}")
+            save_manifest(output_folder, manifest)
+            elapsed = time.perf_counter() - start
+            logger.info(f"[{done + failed}/{len(todo)}] {name} ({seconds:.1f}s), {(done + failed) / elapsed * 60:.1f} pages/min")
+
+    wall_s = time.perf_counter() - start
+    summary = {
+        "done": done,
+        "skipped": skipped,
+        "failed": failed,
+        "wall_s": wall_s,
+        "preprocess_s": preprocess_total,
+        "pages_per_min": (done + failed) / wall_s * 60 if wall_s and todo else 0.0,
+    }
+    logger.success(f"OCR batch completed: {summary}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OCR a folder of page images in parallel, resuming interrupted runs.")
+    parser.add_argument("--input", "-i", default="data/Nam-Phong/Quyen-1/So-1/gold", help="Folder of page images (default: %(default)s)")
+    parser.add_argument("--output", "-o", default=None, help="Folder of OCR text files (default: the input folder)")
+    parser.add_argument("--extension", default="jpg", help="Image file extension (default: %(default)s)")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1, help="Number of OCR processes (default: %(default)s)")
+    parser.add_argument("--backend", choices=sorted(OCR_BACKENDS), default="tesseract", help="OCR backend (default: %(default)s)")
+    parser.add_argument("--lang", default="vie+fra", help="Tesseract languages (default: %(default)s)")
+    parser.add_argument("--config", default="", help="Extra Tesseract options, e.g. '--psm 6'")
+    parser.add_argument("--preprocess", action="store_true", help="Preprocess scans before OCR (grayscale, downscale, binarize, deskew, crop)")
+    parser.add_argument("--target-dpi", type=int, default=300, help="Downscale preprocessed scans to this DPI, 0 to keep (default: %(default)s)")
+    parser.add_argument("--no-binarize", action="store_true", help="Skip binarization when preprocessing")
+    parser.add_argument("--no-deskew", action="store_true", help="Skip deskew when preprocessing")
+    parser.add_argument("--no-crop", action="store_true", help="Skip border cropping when preprocessing")
+    parser.add_argument("--force", action="store_true", help="Re-OCR pages even if their output is up to date")
+    args = parser.parse_args()
+
+    preprocess = PreprocessConfig(
+        target_dpi=args.target_dpi or None,
+        binarize=not args.no_binarize,
+        deskew=not args.no_deskew,
+        crop_borders=not args.no_crop
+    ) if args.preprocess else None
+
+    input_folder = Path(args.input)
+    ocr_batch(
+        input_folder, Path(args.output) if args.output else input_folder,
+        extension=args.extension, workers=args.workers, backend=args.backend,
+        lang=args.lang, config=args.config, preprocess=preprocess, force=args.force
+    )
@@ -1,9 +1,12 @@
 from loguru import logger
 from pathlib import Path
+from typing import Optional
 import pytesseract
 from PIL import Image
 
-def ocr_vi_fr(image_path: Path, output_path: Path) -> None:
+from ocr.ocr_preprocessing import PreprocessConfig, preprocess_image
+
+def ocr_vi_fr(image_path: Path, output_path: Path, preprocess: Optional[PreprocessConfig] = None) -> None:
     """
     Placeholder function for OCR processing.
     This function should implement the OCR logic for Vietnamese and French text.
@@ -11,12 +14,17 @@ def ocr_vi_fr(image_path: Path, output_path: Path) -> None:
     Args:
         image_path (Path): Path to the input image file.
         output_path (Path): Path to save the OCR output text file.
+        preprocess (Optional[PreprocessConfig]): Preprocessing applied to the scan
+            before OCR (the raw scan is used if omitted).
     """
     if not image_path.exists():
         logger.error(f"Image file does not exist: {image_path}")
         return
 
     try:
+        if preprocess is not None:
+            image_path = preprocess_image(image_path, preprocess)
+
         # Open the image file
         with Image.open(image_path) as img:
             # Perform OCR using pytesseract
@@ -29,7 +37,12 @@ def ocr_vi_fr(image_path: Path, output_path: Path) -> None:
     except Exception as e:
         logger.error(f"Error during OCR processing: {e}")
 
-def ocrize_images_in_folder(folder_path: Path, output_folder: Path, extension: str = "jpg") -> None:
+def ocrize_images_in_folder(
+    folder_path: Path,
+    output_folder: Path,
+    extension: str = "jpg",
+    preprocess: Optional[PreprocessConfig] = None
+) -> None:
     """
     Process all images in a folder and save OCR results to text files.
 
@@ -37,6 +50,7 @@ def ocrize_images_in_folder(folder_path: Path, output_folder: Path, extension: s
         folder_path (Path): Path to the folder containing images.
         output_folder (Path): Path to save the OCR output text files.
         extension (str): File extension of images to process (default is 'jpg').
+        preprocess (Optional[PreprocessConfig]): Preprocessing applied before OCR.
     """
     output_folder.mkdir(parents=True, exist_ok=True)
 
@@ -47,7 +61,7 @@ def ocrize_images_in_folder(folder_path: Path, output_folder: Path, extension: s
 
     for image_file in images:  # Adjust the glob pattern as needed
         output_file = output_folder / f"{image_file.stem}.txt"
-        ocr_vi_fr(image_file, output_file)
+        ocr_vi_fr(image_file, output_file, preprocess)
 
 
 if __name__ == "__main__":
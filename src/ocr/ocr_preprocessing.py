@@ -0,0 +1,198 @@
+import hashlib
+import uuid
+import numpy as np
+from loguru import logger
+from pathlib import Path
+from pydantic import BaseModel
+from typing import Optional, Tuple
+
+
+class PreprocessConfig(BaseModel):
+    """
+    Image preprocessing applied before OCR.
+
+    Attributes:
+        grayscale: Convert the scan to 8-bit grayscale.
+        target_dpi: Downscale scans above this resolution (None keeps the resolution).
+        source_dpi: Resolution assumed when the image has no DPI metadata.
+        binarize: Apply a global Otsu threshold.
+        deskew: Estimate and correct the page rotation.
+        max_skew: Largest rotation searched by deskew, in degrees.
+        skew_step: Angle resolution of the deskew search, in degrees.
+        crop_borders: Remove dark scanner borders and blank margins.
+        margin: White margin kept around the text after cropping, in pixels.
+    """
+    grayscale: bool = True
+    target_dpi: Optional[int] = 300
+    source_dpi: int = 400
+    binarize: bool = True
+    deskew: bool = True
+    max_skew: float = 5.0
+    skew_step: float = 0.2
+    crop_borders: bool = True
+    margin: int = 20
+
+    def cache_key(self) -> str:
+        """Short hash of the parameters, used in cached image names."""
+        return hashlib.sha256(self.model_dump_json().encode("utf-8")).hexdigest()[:12]
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """
+    Compute Otsu's threshold from the grayscale histogram.
+
+    Args:
+        gray (np.ndarray): 8-bit grayscale image.
+
+    Returns:
+        int: Threshold maximizing the between-class variance, or 127 if no
+            threshold splits the pixels into two classes (e.g. a blank page).
+    """
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    cum_mean = np.cumsum(hist * levels)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_bg = cum_mean / weight_bg
+        mean_fg = (cum_mean[-1] - cum_mean) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    if not np.nanmax(variance, initial=0.0) > 0:
+        # A single gray level: keep the mid-gray split, so a blank page has no ink
+        return 127
+    return int(np.nanargmax(variance))
+
+
+def estimate_skew(ink: np.ndarray, max_skew: float = 5.0, step: float = 0.2, max_points: int = 200_000) -> float:
+    """
+    Estimate the page rotation with the projection-profile method.
+
+    Ink pixels are projected on the vertical axis for every candidate
+    angle; text lines are horizontal when the profile is sharpest (largest
+    sum of squared row counts).
+
+    Args:
+        ink (np.ndarray): Boolean ink mask.
+        max_skew (float): Largest rotation searched, in degrees.
+        step (float): Angle resolution, in degrees.
+        max_points (int): Ink pixels sampled for the estimate.
+
+    Returns:
+        float: Counter-clockwise rotation (degrees) that straightens the page.
+    """
+    ys, xs = np.nonzero(ink)
+    if len(ys) < 2:
+        return 0.0
+    if len(ys) > max_points:
+        sample = np.random.default_rng(0).choice(len(ys), max_points, replace=False)
+        ys, xs = ys[sample], xs[sample]
+    ys = ys.astype(np.float32)
+    xs = xs.astype(np.float32)
+
+    angles = np.arange(-max_skew, max_skew + step / 2, step)
+    radians = np.deg2rad(angles).astype(np.float32)
+    offset = int(np.ceil(ink.shape[1] * np.sin(np.deg2rad(max_skew)))) + 1
+    scores = np.empty(len(angles))
+    for i, theta in enumerate(radians):
+        rows = np.rint(ys * np.cos(theta) - xs * np.sin(theta)).astype(np.int64) + offset
+        profile = np.bincount(rows).astype(np.float64)
+        scores[i] = np.dot(profile, profile)
+    return round(float(angles[np.argmax(scores)]), 3)
+
+
+def content_box(ink: np.ndarray, margin: int = 20, border_fill: float = 0.5, min_fill: float = 0.002) -> Tuple[int, int, int, int]:
+    """
+    Find the text area of a page, excluding dark scanner borders and blank margins.
+
+    Args:
+        ink (np.ndarray): Boolean ink mask.
+        margin (int): Pixels kept around the text.
+        border_fill (float): Rows/columns at the page edge with more ink than this are borders.
+        min_fill (float): Rows/columns with less ink than this are blank (speckles).
+
+    Returns:
+        Tuple[int, int, int, int]: (top, bottom, left, right) slice bounds.
+    """
+    def bounds(fill: np.ndarray) -> Tuple[int, int]:
+        n = len(fill)
+        start, end = 0, n
+        while start < end and fill[start] > border_fill:
+            start += 1
+        while end > start and fill[end - 1] > border_fill:
+            end -= 1
+        inner = np.flatnonzero(fill[start:end] > min_fill)
+        if len(inner) == 0:
+            return 0, n
+        return max(start + int(inner[0]) - margin, start), min(start + int(inner[-1]) + 1 + margin, end)
+
+    top, bottom = bounds(ink.mean(axis=1))
+    left, right = bounds(ink[top:bottom].mean(axis=0))
+    return top, bottom, left, right
+
+
+def preprocess_image(image_path: Path, config: PreprocessConfig, cache_dir: Optional[Path] = None) -> Path:
+    """
+    Preprocess a scan for OCR, reusing a cached result when available.
+
+    The output is a PNG named after the hash of the source image and of the
+    parameters, so sweeps over OCR settings preprocess each page once and
+    changing a parameter never serves a stale image.
+
+    Args:
+        image_path (Path): Path to the scan.
+        config (PreprocessConfig): Preprocessing parameters.
+        cache_dir (Optional[Path]): Folder of preprocessed images (default:
+            a `.preprocessed` folder next to the scan).
+
+    Returns:
+        Path: Path to the preprocessed PNG image.
+    """
+    from PIL import Image
+
+    cache_dir = cache_dir or image_path.parent / ".preprocessed"
+    source_hash = hashlib.sha256(image_path.read_bytes()).hexdigest()[:16]
+    cached_path = cache_dir / f"{image_path.stem}-{source_hash}-{config.cache_key()}.png"
+    if cached_path.exists():
+        logger.debug(f"Using cached preprocessed image: {cached_path}")
+        return cached_path
+
+    with Image.open(image_path) as img:
+        img.load()
+        dpi = int(round(img.info.get("dpi", (config.source_dpi,))[0])) or config.source_dpi
+        if config.grayscale or config.binarize or config.deskew or config.crop_borders:
+            img = img.convert("L")
+        if config.target_dpi and dpi > config.target_dpi:
+            scale = config.target_dpi / dpi
+            img = img.resize((round(img.width * scale), round(img.height * scale)), Image.Resampling.LANCZOS)
+            dpi = config.target_dpi
+
+    array = np.asarray(img)
+    if array.ndim == 2 and (config.binarize or config.deskew or config.crop_borders):
+        ink = array <= otsu_threshold(array)
+        if config.binarize:
+            array = np.where(ink, 0, 255).astype(np.uint8)
+        if config.deskew:
+            angle = estimate_skew(ink, config.max_skew, config.skew_step)
+            if angle:
+                logger.debug(f"Deskewing {image_path.name} by {angle:.2f} degrees")
+                rotated = Image.fromarray(array).rotate(
+                    angle, resample=Image.Resampling.BILINEAR, expand=True, fillcolor=255
+                )
+                array = np.asarray(rotated)
+                ink = array <= (127 if config.binarize else otsu_threshold(array))
+                if config.binarize:
+                    array = np.where(ink, 0, 255).astype(np.uint8)
+        if config.crop_borders:
+            top, bottom, left, right = content_box(ink, config.margin)
+            array = array[top:bottom, left:right]
+        img = Image.fromarray(array)
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Unique per call: OCR workers preprocessing the same page concurrently must not share a temporary file
+    tmp_path = cached_path.with_name(f"{cached_path.stem}.{uuid.uuid4().hex}.tmp")
+    try:
+        img.save(tmp_path, format="PNG", dpi=(dpi, dpi))
+        tmp_path.replace(cached_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return cached_path
@@ -1,9 +1,19 @@
+import argparse
+import csv
 import json
+import os
 import re
 import unicodedata
-from evaluate import load
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from loguru import logger
 from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Sequence
+
+try:
+    from rapidfuzz.distance import Levenshtein
+except ImportError:  # rapidfuzz ships with jiwer; fall back to the NumPy implementation
+    Levenshtein = None
 
 
 def normalize_text(text: str) -> str:
@@ -59,6 +69,66 @@ def load_ocr_text(ocr_folder: Path, filename: str) -> str:
     return txt_file.read_text(encoding='utf-8')
 
 
+def edit_distance(reference: Sequence[Hashable], hypothesis: Sequence[Hashable]) -> int:
+    """
+    Levenshtein distance between two sequences (of characters or words), in linear memory.
+
+    Uses rapidfuzz when installed; otherwise a two-row dynamic programme
+    vectorized with NumPy: deletions and substitutions are computed for the
+    whole row at once, and insertions with a cumulative minimum.
+
+    Args:
+        reference (Sequence[Hashable]): Reference sequence.
+        hypothesis (Sequence[Hashable]): Hypothesis sequence.
+
+    Returns:
+        int: Minimum number of insertions, deletions and substitutions.
+    """
+    if Levenshtein is not None:
+        return Levenshtein.distance(reference, hypothesis)
+    if not reference or not hypothesis:
+        return max(len(reference), len(hypothesis))
+
+    vocabulary: Dict[Hashable, int] = {}
+    ref = np.fromiter((vocabulary.setdefault(t, len(vocabulary)) for t in reference), dtype=np.int64)
+    hyp = np.fromiter((vocabulary.setdefault(t, len(vocabulary)) for t in hypothesis), dtype=np.int64)
+    if len(hyp) > len(ref):
+        ref, hyp = hyp, ref
+    columns = np.arange(len(hyp) + 1, dtype=np.int64)
+    previous = columns.copy()
+    current = np.empty_like(previous)
+    for i, token in enumerate(ref, start=1):
+        current[0] = i
+        current[1:] = np.minimum(previous[1:] + 1, previous[:-1] + (hyp != token))
+        # current[j] = min(current[j], current[j - 1] + 1), solved for the whole row
+        current[:] = np.minimum.accumulate(current - columns) + columns
+        previous, current = current, previous
+    return int(previous[-1])
+
+
+def score_page(gold_text: str, ocr_text: str) -> dict:
+    """
+    Count the character and word errors of one page.
+
+    Args:
+        gold_text (str): Normalized reference text.
+        ocr_text (str): Normalized OCR output text (may be empty).
+
+    Returns:
+        dict: Error counts and reference lengths, with the page WER and CER.
+    """
+    gold_words, ocr_words = gold_text.split(), ocr_text.split()
+    scores = {
+        "char_errors": edit_distance(gold_text, ocr_text),
+        "chars": len(gold_text),
+        "word_errors": edit_distance(gold_words, ocr_words),
+        "words": len(gold_words),
+    }
+    scores["CER"] = scores["char_errors"] / max(scores["chars"], 1)
+    scores["WER"] = scores["word_errors"] / max(scores["words"], 1)
+    return scores
+
+
 def compute_scores(gold_text: str, ocr_text: str) -> dict:
     """
     Compute evaluation metrics (WER, CER) between gold and OCR texts.
@@ -70,52 +140,124 @@ def compute_scores(gold_text: str, ocr_text: str) -> dict:
     Returns:
         dict: Dictionary with WER and CER scores.
     """
-    wer_metric = load("wer")
-    cer_metric = load("cer")
-
     if not gold_text.strip() or not ocr_text.strip():
         raise ValueError("Reference and hypothesis texts must be non-empty after normalization.")
 
-    scores = {
-        "WER": wer_metric.compute(predictions=[ocr_text], references=[gold_text]),
-        "CER": cer_metric.compute(predictions=[ocr_text], references=[gold_text])
+    scores = score_page(gold_text.strip(), ocr_text.strip())
+    return {"WER": scores["WER"], "CER": scores["CER"]}
+
+
+def aggregate_scores(pages: List[dict]) -> dict:
+    """
+    Corpus-level WER and CER: total errors over total reference length
+    (not the mean of page rates, which would overweight short pages).
+
+    Args:
+        pages (List[dict]): Page scores from `score_page`.
+
+    Returns:
+        dict: Dictionary with WER and CER scores (None if no page was scored).
+    """
+    if not pages:
+        return {"WER": None, "CER": None}
+    return {
+        "WER": sum(p["word_errors"] for p in pages) / max(sum(p["words"] for p in pages), 1),
+        "CER": sum(p["char_errors"] for p in pages) / max(sum(p["chars"] for p in pages), 1),
     }
-    return scores
 
 
-def evaluate_ocr(gold_path: Path, ocr_folder: Path) -> None:
+def score_pages(gold_path: Path, ocr_folder: Path, workers: int = os.cpu_count() or 1) -> List[dict]:
     """
-    Evaluate OCR outputs against gold standard.
+    Score every gold page against its OCR output, in parallel.
 
     Args:
         gold_path (Path): Path to the gold JSON file.
         ocr_folder (Path): Path to the folder containing OCR .txt files.
+        workers (int): Number of scoring processes.
+
+    Returns:
+        List[dict]: Page scores (with the page name), in gold order.
     """
     gold_data = load_gold(gold_path)
-    filenames = gold_data.get("filenames", [])
     content_by_page = gold_data.get("content", {})
 
-    full_gold_text = ""
-    full_ocr_text = ""
-
-    for fname in filenames:
+    names, gold_texts, ocr_texts = [], [], []
+    for fname in gold_data.get("filenames", []):
         page_key = Path(fname).stem
         if page_key not in content_by_page:
             raise ValueError(f"Gold content missing for {page_key}")
+        gold_text = normalize_text(' '.join(content_by_page[page_key]))
+        if not gold_text:
+            raise ValueError(f"Gold content empty for {page_key}")
+        names.append(page_key)
+        gold_texts.append(gold_text)
+        ocr_texts.append(normalize_text(load_ocr_text(ocr_folder, fname)))
 
-        gold_page_lines = content_by_page[page_key]
-        gold_page_text = ' '.join(gold_page_lines)
-        full_gold_text += ' ' + normalize_text(gold_page_text)
+    if workers > 1 and len(names) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(names))) as executor:
+            scores = list(executor.map(score_page, gold_texts, ocr_texts))
+    else:
+        scores = list(map(score_page, gold_texts, ocr_texts))
+    return [{"page": name, **page_scores} for name, page_scores in zip(names, scores)]
 
-        ocr_page_text = load_ocr_text(ocr_folder, fname)
-        full_ocr_text += ' ' + normalize_text(ocr_page_text)
 
-    scores = compute_scores(full_gold_text, full_ocr_text)
-    logger.success(f"WER: {scores['WER']:.2%}, CER: {scores['CER']:.2%}")
+def write_report(pages: List[dict], report_path: Path) -> None:
+    """
+    Write the per-page scores, worst CER first, as JSON or CSV (from the extension).
+
+    Args:
+        pages (List[dict]): Page scores from `score_pages`.
+        report_path (Path): Output .json or .csv file.
+    """
+    rows = sorted(pages, key=lambda p: p["CER"], reverse=True)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    if report_path.suffix == ".csv":
+        with report_path.open("w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        report = {"overall": aggregate_scores(pages), "pages": rows}
+        report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    logger.info(f"Per-page report saved to: {report_path}")
+
+
+def evaluate_ocr(
+    gold_path: Path,
+    ocr_folder: Path,
+    report_path: Optional[Path] = None,
+    workers: int = os.cpu_count() or 1
+) -> dict:
+    """
+    Evaluate OCR outputs against gold standard.
+
+    Args:
+        gold_path (Path): Path to the gold JSON file.
+        ocr_folder (Path): Path to the folder containing OCR .txt files.
+        report_path (Optional[Path]): Per-page report (.json or .csv) to write.
+        workers (int): Number of scoring processes.
+
+    Returns:
+        dict: Dictionary with the overall WER and CER scores (None if no page was evaluated).
+    """
+    pages = score_pages(gold_path, ocr_folder, workers)
+    scores = aggregate_scores(pages)
+    if not pages:
+        logger.warning(f"No pages evaluated: {gold_path} lists no gold pages")
+        return scores
+    worst = max(pages, key=lambda p: p["CER"])
+    logger.success(f"WER: {scores['WER']:.2%}, CER: {scores['CER']:.2%} (worst page: {worst['page']}, CER {worst['CER']:.2%})")
+    if report_path is not None:
+        write_report(pages, report_path)
+    return scores
 
 
 if __name__ == "__main__":
-    gold_path = Path("data/Nam-Phong/Quyen-1/So-1/gold/namphong_so1_gold.json")
-    ocr_folder = Path("data/Nam-Phong/Quyen-1/So-1/gold")
+    parser = argparse.ArgumentParser(description="Score OCR outputs against a gold standard.")
+    parser.add_argument("--gold", default="data/Nam-Phong/Quyen-1/So-1/gold/namphong_so1_gold.json", help="Gold JSON file (default: %(default)s)")
+    parser.add_argument("--ocr-folder", default="data/Nam-Phong/Quyen-1/So-1/gold", help="Folder of OCR .txt files (default: %(default)s)")
+    parser.add_argument("--report", default=None, help="Per-page report to write (.json or .csv)")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1, help="Number of scoring processes (default: %(default)s)")
+    args = parser.parse_args()
 
-    evaluate_ocr(gold_path, ocr_folder)
+    evaluate_ocr(Path(args.gold), Path(args.ocr_folder), Path(args.report) if args.report else None, args.workers)
@@ -0,0 +1,205 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from loguru import logger
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ocr.ocr_batch import (
+    OCR_BACKENDS, init_worker, ocr_page, pending_images, resume_manifest, save_manifest
+)
+from ocr.ocr_preprocessing import PreprocessConfig
+from ocr.ocr_quality_report import aggregate_scores, load_gold, score_pages
+
+DEFAULT_LANGS = ["vie", "vie+fra", "vie+fra+chi_tra"]
+DEFAULT_PSMS = [3, 4, 6]
+DEFAULT_OEMS = [1]
+
+
+def config_grid(langs: List[str], psms: List[int], oems: List[int]) -> List[Dict[str, str]]:
+    """
+    Expand the sweep grid into Tesseract configurations.
+
+    Args:
+        langs (List[str]): Language combinations (e.g. "vie+fra+chi_tra").
+        psms (List[int]): Page segmentation modes.
+        oems (List[int]): OCR engine modes.
+
+    Returns:
+        List[Dict[str, str]]: One dict per configuration with its `name`
+            (used as cache folder), `lang` and Tesseract `config` string.
+    """
+    return [
+        {
+            "name": f"{lang.replace('+', '-')}_psm{psm}_oem{oem}",
+            "lang": lang,
+            "config": f"--oem {oem} --psm {psm}",
+        }
+        for lang, psm, oem in itertools.product(langs, psms, oems)
+    ]
+
+
+def run_sweep(
+    gold_path: Path,
+    image_folder: Path,
+    cache_dir: Path,
+    configs: List[Dict[str, str]],
+    workers: int = os.cpu_count() or 1,
+    backend: str = "tesseract",
+    preprocess: Optional[PreprocessConfig] = None
+) -> List[dict]:
+    """
+    OCR the gold pages with every configuration and score each one.
+
+    All (page, configuration) pairs share one process pool. Outputs are
+    cached in `cache_dir/<config name>/` with the batch runner's manifest,
+    so an extended grid or an interrupted sweep only OCRs the missing pairs.
+
+    Args:
+        gold_path (Path): Path to the gold JSON file.
+        image_folder (Path): Folder of the gold page images.
+        cache_dir (Path): Root folder of the cached OCR outputs.
+        configs (List[Dict[str, str]]): Configurations from `config_grid`.
+        workers (int): Number of OCR processes.
+        backend (str): Name of the OCR backend (see `OCR_BACKENDS`).
+        preprocess (Optional[PreprocessConfig]): Preprocessing applied before OCR.
+
+    Returns:
+        List[dict]: Per configuration: name, lang, Tesseract config, WER, CER
+            and mean OCR seconds per page, preprocessing excluded (None scores
+            if pages failed).
+    """
+    images = [image_folder / fname for fname in load_gold(gold_path).get("filenames", [])]
+    missing = [image.name for image in images if not image.exists()]
+    if missing:
+        raise FileNotFoundError(f"Missing gold page images in {image_folder}: {missing}")
+
+    manifests: Dict[str, dict] = {}
+    tasks = []
+    for cfg in configs:
+        output_folder = cache_dir / cfg["name"]
+        output_folder.mkdir(parents=True, exist_ok=True)
+        settings = {
+            "backend": backend,
+            "lang": cfg["lang"],
+            "config": cfg["config"],
+            "preprocess": preprocess.model_dump() if preprocess else None,
+        }
+        manifests[cfg["name"]] = resume_manifest(output_folder, settings)
+        tasks.extend((cfg, image) for image in pending_images(images, output_folder, manifests[cfg["name"]]))
+    logger.info(f"OCR sweep: {len(configs)} config(s) x {len(images)} page(s), {len(tasks)} to OCR, {workers} worker(s)")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        futures = {
+            executor.submit(
+                ocr_page, image, cache_dir / cfg["name"] / f"{image.stem}.txt",
+                backend, cfg["lang"], cfg["config"], preprocess
+            ): cfg["name"]
+            for cfg, image in tasks
+        }
+        for n, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]
+            page, seconds, preprocess_s, error = future.result()
+            entry = {"seconds": round(seconds, 3), "preprocess_s": round(preprocess_s, 3)}
+            if error is None:
+                manifests[name]["pages"][page] = {"status": "done", **entry}
+            else:
+                manifests[name]["pages"][page] = {"status": "failed", **entry, "error": error}
+                logger.error(f"OCR failed for {page} with {name}: {error}")
+            save_manifest(cache_dir / name, manifests[name])
+            logger.debug(f"[{n}/{len(tasks)}] {name} {page} ({seconds:.1f}s)")
+    if tasks:
+        logger.info(f"OCR sweep ran {len(tasks)} page(s) in {time.perf_counter() - start:.1f}s")
+
+    results = []
+    for cfg in configs:
+        pages = manifests[cfg["name"]]["pages"]
+        # Preprocessed images are cached and shared by all configurations: only the first
+        # configuration to reach a page pays for them, so they are left out of the comparison
+        seconds = [
+            pages[image.name]["seconds"] - pages[image.name].get("preprocess_s", 0.0)
+            for image in images if image.name in pages
+        ]
+        row = {
+            "name": cfg["name"],
+            "lang": cfg["lang"],
+            "config": cfg["config"],
+            "WER": None,
+            "CER": None,
+            "sec_per_page": sum(seconds) / len(seconds) if seconds else None,
+        }
+        if all(pages.get(image.name, {}).get("status") == "done" for image in images):
+            row.update(aggregate_scores(score_pages(gold_path, cache_dir / cfg["name"], workers)))
+        else:
+            logger.warning(f"Not scoring {cfg['name']}: some pages failed")
+        results.append(row)
+    return results
+
+
+def print_table(results: List[dict], max_cer: Optional[float] = None) -> None:
+    """
+    Print the sweep results by speed, flagging the fastest configuration within the CER bar.
+
+    Args:
+        results (List[dict]): Rows from `run_sweep`.
+        max_cer (Optional[float]): Highest acceptable CER (e.g. 0.05).
+    """
+    rows = sorted(results, key=lambda r: (r["sec_per_page"] is None, r["sec_per_page"] or 0.0))
+    chosen = None
+    if max_cer is not None:
+        chosen = next((r for r in rows if r["CER"] is not None and r["CER"] <= max_cer), None)
+
+    print(f"{'config':<32} {'CER':>8} {'WER':>8} {'sec/page':>9}")
+    for r in rows:
+        cer = f"{r['CER']:.2%}" if r["CER"] is not None else "failed"
+        wer = f"{r['WER']:.2%}" if r["WER"] is not None else "failed"
+        sec = f"{r['sec_per_page']:.2f}" if r["sec_per_page"] is not None else "-"
+        marker = "  <- fastest within CER bar" if r is chosen else ""
+        print(f"{r['name']:<32} {cer:>8} {wer:>8} {sec:>9}{marker}")
+    if max_cer is not None and chosen is None:
+        print(f"No configuration reaches CER <= {max_cer:.2%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep Tesseract configurations over the gold pages.")
+    parser.add_argument("--gold", default="data/Nam-Phong/Quyen-1/So-1/gold/namphong_so1_gold.json", help="Gold JSON file (default: %(default)s)")
+    parser.add_argument("--images", default=None, help="Folder of the gold page images (default: the gold file's folder)")
+    parser.add_argument("--cache-dir", default="data/ocr/sweep", help="Root folder of cached OCR outputs (default: %(default)s)")
+    parser.add_argument("--langs", nargs="+", default=DEFAULT_LANGS, help="Language combinations (default: %(default)s)")
+    parser.add_argument("--psm", nargs="+", type=int, default=DEFAULT_PSMS, help="Page segmentation modes (default: %(default)s)")
+    parser.add_argument("--oem", nargs="+", type=int, default=DEFAULT_OEMS, help="OCR engine modes (default: %(default)s)")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1, help="Number of OCR processes (default: %(default)s)")
+    parser.add_argument("--backend", choices=sorted(OCR_BACKENDS), default="tesseract", help="OCR backend (default: %(default)s)")
+    parser.add_argument("--preprocess", action="store_true", help="Preprocess scans before OCR (default parameters)")
+    parser.add_argument("--max-cer", type=float, default=None, help="Accuracy bar, e.g. 0.05, to flag the fastest acceptable config")
+    parser.add_argument("--output", "-o", default=None, help="Write the results table (.json or .csv)")
+    args = parser.parse_args()
+
+    gold_path = Path(args.gold)
+    results = run_sweep(
+        gold_path,
+        Path(args.images) if args.images else gold_path.parent,
+        Path(args.cache_dir),
+        config_grid(args.langs, args.psm, args.oem),
+        workers=args.workers,
+        backend=args.backend,
+        preprocess=PreprocessConfig() if args.preprocess else None
+    )
+    print_table(results, args.max_cer)
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        if output_path.suffix == ".csv":
+            with output_path.open("w", encoding="utf-8", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(results[0]))
+                writer.writeheader()
+                writer.writerows(results)
+        else:
+            output_path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        logger.info(f"Sweep results saved to: {output_path}")
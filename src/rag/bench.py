@@ -0,0 +1,515 @@
+import argparse
+import cProfile
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from rag.chunker import ChunkConfig, TokenChunker, load_tokenizer
+from rag.document_builder import iter_documents
+from rag.glossary import Glossary, load_glossary
+from rag.loader import iter_corpus
+from rag.packed_corpus import FORMATS, PackedCorpusWriter
+from rag.stub_llm import StubLLM
+from rag.vector_indexer import (
+    DEFAULT_BATCH_SIZE, EMBEDDING_MODEL_NAME, IndexConfig, build_vectorstore, load_embedding_model
+)
+from rag.wrapper import SimpleRAG
+
+GOLD_PATH = Path("data/Nam-Phong/Quyen-1/So-1/gold/namphong_so1_gold.json")
+
+# Entry points whose cold import time is tracked: the search-only path and the full pipeline
+IMPORT_TARGETS = ("rag.search_engine", "rag.main_pipeline")
+
+BENCH_QUERIES = [
+    "Văn minh học thuật của nước Pháp được miêu tả như thế nào trong Nam Phong tạp chí?",
+    "Quel est le rôle de l'Académie française selon les articles de la revue Nam Phong ?",
+    "How does Nam Phong magazine discuss the conflict between material and spiritual progress in modern civilization?",
+    "Bản-báo có chương-trình gì?",
+    "La France devant le monde",
+]
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of the current process so far.
+
+    Returns:
+        float: Peak RSS in MiB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def git_commit() -> Optional[str]:
+    """
+    Current git commit, to compare benchmark results across commits.
+
+    Returns:
+        Optional[str]: Commit hash, or None outside a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_gold_entries(gold_path: Path = GOLD_PATH) -> List[Tuple[List[str], dict]]:
+    """
+    Turn the pages of the Nam Phong gold transcription into (chunks, metadata) entries.
+
+    Args:
+        gold_path (Path): Gold JSON file (`content` maps page stems to paragraphs).
+
+    Returns:
+        List[Tuple[List[str], dict]]: One entry per page.
+    """
+    gold = json.loads(gold_path.read_text(encoding="utf-8"))
+    return [
+        ([p.strip() for p in paragraphs if p.strip()], {"title_main": f"{gold['title']} ({page})"})
+        for page, paragraphs in gold["content"].items()
+    ]
+
+
+def write_synthetic_corpus(
+    seed: List[Tuple[List[str], dict]],
+    output_dir: Path,
+    scale: int,
+    fmt: str = "json"
+) -> int:
+    """
+    Scale up a seed corpus by writing `scale` copies of it as JSON files.
+
+    Each copy gets distinct titles and a rotated paragraph order, so copies
+    are not exact duplicates of each other.
+
+    Args:
+        seed (List[Tuple[List[str], dict]]): Seed (chunks, metadata) entries.
+        output_dir (Path): Folder the JSON files are written to.
+        scale (int): Number of copies.
+        fmt (str): "json" for one file per document, or a packed corpus format
+            ("parquet", "jsonl.gz").
+
+    Returns:
+        int: Number of files (documents) written.
+    """
+    writer = PackedCorpusWriter(output_dir, fmt) if fmt != "json" else None
+    n_files = 0
+    for copy in range(scale):
+        copy_dir = output_dir / f"copy_{copy:04d}"
+        for i, (chunks, metadata) in enumerate(seed):
+            shift = copy % len(chunks) if chunks else 0
+            data = {
+                "metadata": {**metadata, "title_main": f"{metadata['title_main']} #{copy}"},
+                "text_body": chunks[shift:] + chunks[:shift],
+            }
+            if writer is not None:
+                writer.add(f"copy_{copy:04d}/{i:05d}", data["text_body"], data["metadata"])
+            else:
+                copy_dir.mkdir(parents=True, exist_ok=True)
+                (copy_dir / f"{i:05d}.json").write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            n_files += 1
+    if writer is not None:
+        writer.close()
+    logger.info(f"Wrote synthetic corpus: {n_files} files ({scale} copies of {len(seed)}) to {output_dir}")
+    return n_files
+
+
+def measure_import_times(modules: Sequence[str] = IMPORT_TARGETS, repeats: int = 3) -> Dict[str, float]:
+    """
+    Cold import time of modules, each in a fresh interpreter.
+
+    The startup time of an interpreter running nothing is subtracted, and
+    the best of `repeats` runs is kept to smooth out disk cache effects.
+
+    Args:
+        modules (Sequence[str]): Dotted module names.
+        repeats (int): Runs per module.
+
+    Returns:
+        Dict[str, float]: Import seconds per module.
+    """
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(Path(__file__).resolve().parents[1]), *sys.path])}
+
+    def best_time(code: str) -> float:
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], env=env, check=True)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    baseline = best_time("pass")
+    import_times = {module: max(best_time(f"import {module}") - baseline, 0.0) for module in modules}
+    logger.info("[bench] import: " + ", ".join(f"{m} {t:.3f}s" for m, t in import_times.items()))
+    return import_times
+
+
+class StageRecorder:
+    """
+    Record wall time, peak RSS and throughput of benchmark stages.
+
+    Attributes:
+        stages (dict): Results per stage name, in execution order.
+        profile_dir (Optional[Path]): Folder of per-stage cProfile dumps, if profiling.
+    """
+    def __init__(self, profile_dir: Optional[Path] = None):
+        """
+        Initialize the recorder.
+
+        Args:
+            profile_dir (Optional[Path]): Write a `<stage>.prof` cProfile dump per
+                stage to this folder (no profiling if omitted).
+
+        Returns:
+            None
+        """
+        self.stages: dict = {}
+        self.profile_dir = profile_dir
+        if profile_dir is not None:
+            profile_dir.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def stage(self, name: str, unit: str = "items") -> Iterator[dict]:
+        """
+        Time a stage; the caller sets `result["count"]` to get a throughput.
+
+        Args:
+            name (str): Stage name.
+            unit (str): Name of the counted items (e.g. "docs", "queries").
+
+        Yields:
+            dict: Result dict of the stage, filled in when the stage ends.
+        """
+        result = {"count": None}
+        profiler = cProfile.Profile() if self.profile_dir is not None else None
+        if profiler is not None:
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield result
+        finally:
+            wall_s = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(str(self.profile_dir / f"{name}.prof"))
+            count = result.pop("count")
+            result.update({"wall_s": wall_s, "peak_rss_mb": peak_rss_mb()})
+            if count is not None:
+                result.update({unit: count, f"{unit}_per_s": count / wall_s if wall_s else float("inf")})
+            self.stages[name] = result
+            logger.info(f"[bench] {name}: {result}")
+
+
+class TimedEmbeddings(Embeddings):
+    """
+    Embedding model wrapper accumulating the time spent embedding documents.
+
+    Lets the build stage, which interleaves embedding and indexing batch by
+    batch, report how its time splits between the two.
+
+    Attributes:
+        embeddings (Embeddings): Wrapped embedding model.
+        embed_s (float): Seconds spent in `embed_documents` so far.
+    """
+    def __init__(self, embeddings: Embeddings):
+        """
+        Wrap an embedding model.
+
+        Args:
+            embeddings (Embeddings): Embedding model to time.
+
+        Returns:
+            None
+        """
+        self.embeddings = embeddings
+        self.embed_s = 0.0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents with the wrapped model, timing the call."""
+        start = time.perf_counter()
+        vectors = self.embeddings.embed_documents(texts)
+        self.embed_s += time.perf_counter() - start
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query with the wrapped model."""
+        return self.embeddings.embed_query(text)
+
+
+def run_bench(
+    corpus_dir: Path,
+    recorder: StageRecorder,
+    embedding_model_name: str = EMBEDDING_MODEL_NAME,
+    fake_embeddings: int = 0,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    read_workers: int = 1,
+    index_config: Optional[IndexConfig] = None,
+    chunk_config: Optional[ChunkConfig] = None,
+    search_type: str = "similarity",
+    queries: Optional[List[str]] = None,
+    n_queries: int = 100,
+    llm_latency: float = 0.0,
+    glossary: Optional[Glossary] = None
+) -> dict:
+    """
+    Run the `main_pipeline` stages over a corpus and record each one.
+
+    Stages: load (JSON files or packed corpus), documents (chunking and
+    `create_documents`), build (`build_vectorstore`: embedding and FAISS
+    indexing, reported separately as `embed_s` and `index_s`), retrieval and
+    generation (context assembly, prompt and stub LLM).
+
+    Args:
+        corpus_dir (Path): Folder of JSON files in the loader format, or a packed corpus.
+        recorder (StageRecorder): Stage recorder.
+        embedding_model_name (str): Sentence-transformers model.
+        fake_embeddings (int): If > 0, use deterministic fake embeddings of this
+            dimension instead of the model, to measure everything else.
+        batch_size (int): Number of documents embedded and indexed per batch.
+        read_workers (int): Number of JSON reader threads.
+        index_config (Optional[IndexConfig]): FAISS index type and parameters.
+        chunk_config (Optional[ChunkConfig]): Token-aware chunking parameters
+            (one chunk per paragraph if omitted).
+        search_type (str): Retrieval mode passed to `SimpleRAG`.
+        queries (Optional[List[str]]): Benchmark queries, cycled (default: `BENCH_QUERIES`).
+        n_queries (int): Number of queries run through retrieval and generation.
+        llm_latency (float): Simulated generation latency of the stub LLM, in seconds.
+        glossary (Optional[Glossary]): Glossary tagging the chunks (documents stage) and
+            expanding the queries (retrieval stage).
+
+    Returns:
+        dict: Corpus size, keyed by "files" and "documents".
+    """
+    index_config = index_config or IndexConfig()
+    queries = queries or BENCH_QUERIES
+    queries = [queries[i % len(queries)] for i in range(n_queries)]
+
+    with recorder.stage("load", unit="files") as result:
+        entries = list(iter_corpus(corpus_dir, max_workers=read_workers))
+        result["count"] = len(entries)
+
+    chunker = None
+    if chunk_config is not None:
+        with recorder.stage("tokenizer_load"):
+            chunker = TokenChunker(chunk_config, tokenizer=load_tokenizer(chunk_config.model_name))
+
+    with recorder.stage("documents", unit="docs") as result:
+        documents = list(iter_documents(entries, chunker, glossary))
+        result["count"] = len(documents)
+    if not documents:
+        raise ValueError(f"No documents to index in {corpus_dir}")
+
+    with recorder.stage("model_load"):
+        if fake_embeddings:
+            from langchain_community.embeddings import DeterministicFakeEmbedding
+            embedding_model = DeterministicFakeEmbedding(size=fake_embeddings)
+        else:
+            embedding_model = load_embedding_model(embedding_model_name)
+
+    timed_model = TimedEmbeddings(embedding_model)
+    with recorder.stage("build", unit="docs") as result:
+        start = time.perf_counter()
+        vectorstore = build_vectorstore(
+            documents, embedding_model=timed_model, batch_size=batch_size, index_config=index_config
+        )
+        result["embed_s"] = timed_model.embed_s
+        result["index_s"] = time.perf_counter() - start - timed_model.embed_s
+        result["count"] = len(documents)
+    vectorstore.embedding_function = embedding_model
+
+    rag = SimpleRAG(vectorstore, search_type=search_type, llm=StubLLM(latency=llm_latency), glossary=glossary)
+
+    with recorder.stage("retrieval", unit="queries") as result:
+        all_sources = [rag.retrieve(q) for q in queries]
+        result["count"] = len(queries)
+
+    with recorder.stage("generation", unit="queries") as result:
+        for query, sources in zip(queries, all_sources):
+            rag.llm.invoke(rag.build_prompt(query, sources)[0])
+        result["count"] = len(queries)
+        result["prompt_tokens_saved"] = rag.context_builder.tokens_saved
+
+    return {"files": len(entries), "documents": len(documents)}
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Register the `rag bench` command-line options.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser (or subparser) to extend.
+    """
+    parser.add_argument(
+        "--data-dir", "-d",
+        default=None,
+        help="Folder of JSON files in the loader format, or a packed corpus (default: the Nam Phong gold pages)"
+    )
+    parser.add_argument(
+        "--corpus-format",
+        choices=("json",) + FORMATS,
+        default="json",
+        help="Storage of the synthetic corpus: one JSON file per document or a packed corpus (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--scale",
+        type=int,
+        default=1,
+        help="Number of synthetic copies of the corpus to index (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--work-dir",
+        default="data/bench/",
+        help="Folder of the synthetic corpus and profiles (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--fake-embeddings",
+        type=int,
+        default=0,
+        metavar="DIM",
+        help="Use deterministic fake embeddings of dimension DIM instead of the model"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Number of documents embedded and indexed per batch (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--read-workers",
+        type=int,
+        default=1,
+        help="Number of JSON reader threads (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--chunk-tokens",
+        type=int,
+        default=0,
+        help=f"Re-chunk paragraphs to this token window (e.g. {ChunkConfig().max_tokens}); "
+             "0 keeps one chunk per paragraph (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--index-type",
+        choices=["flat", "hnsw", "ivf_flat", "ivf_pq"],
+        default="flat",
+        help="FAISS index type (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--vector-dtype",
+        choices=["float32", "float16", "int8"],
+        default="float32",
+        help="Storage of the indexed vectors (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--search-type",
+        choices=["similarity", "mmr", "hybrid"],
+        default="similarity",
+        help="Retrieval mode (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--queries",
+        type=int,
+        default=100,
+        help="Number of benchmark queries (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--llm-latency",
+        type=float,
+        default=0.0,
+        help="Simulated stub LLM latency per query in seconds (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--glossary",
+        default=None,
+        help="Trilingual glossary CSV (term, han, vi, fr) tagging chunks and expanding queries"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write a cProfile dump per stage to <work-dir>/profiles/ (view with snakeviz or pstats)"
+    )
+    parser.add_argument(
+        "--output", "-o",
+        default=None,
+        help="Write results to this JSON file"
+    )
+
+
+def main(args: argparse.Namespace) -> dict:
+    """
+    Run `rag bench`: prepare the corpus, run the stages and report the results.
+
+    Args:
+        args (argparse.Namespace): Options registered by `add_arguments`.
+
+    Returns:
+        dict: Benchmark results (also written to `--output` if given).
+    """
+    work_dir = Path(args.work_dir)
+    if args.data_dir:
+        seed = list(iter_corpus(Path(args.data_dir)))
+        source = args.data_dir
+    else:
+        seed = load_gold_entries()
+        source = str(GOLD_PATH)
+    corpus_dir = work_dir / "corpus"
+    if corpus_dir.exists():
+        shutil.rmtree(corpus_dir)
+    write_synthetic_corpus(seed, corpus_dir, args.scale, args.corpus_format)
+
+    recorder = StageRecorder(work_dir / "profiles" if args.profile else None)
+    import_times = measure_import_times()
+    corpus = run_bench(
+        corpus_dir, recorder,
+        fake_embeddings=args.fake_embeddings,
+        batch_size=args.batch_size,
+        read_workers=args.read_workers,
+        index_config=IndexConfig(index_type=args.index_type, vector_dtype=args.vector_dtype),
+        chunk_config=ChunkConfig(max_tokens=args.chunk_tokens) if args.chunk_tokens else None,
+        search_type=args.search_type,
+        n_queries=args.queries,
+        llm_latency=args.llm_latency,
+        glossary=load_glossary(Path(args.glossary) if args.glossary else None)
+    )
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in {"func", "output", "command"}},
+        "corpus": {"source": source, "scale": args.scale, **corpus},
+        "stages": recorder.stages,
+        "import_s": import_times,
+    }
+
+    print(f"{'stage':<12} {'wall s':>9} {'peak RSS MB':>12} {'throughput':>18}")
+    for name, stage in recorder.stages.items():
+        rate = next((f"{v:.1f} {k.removesuffix('_per_s')}/s" for k, v in stage.items() if k.endswith("_per_s")), "")
+        print(f"{name:<12} {stage['wall_s']:>9.3f} {stage['peak_rss_mb']:>12.1f} {rate:>18}")
+    for module, seconds in import_times.items():
+        print(f"import {module:<24} {seconds:>9.3f} s")
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+        logger.success(f"Benchmark results saved to: {args.output}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the RAG pipeline stage by stage on a (scaled-up) corpus."
+    )
+    add_arguments(parser)
+    main(parser.parse_args())
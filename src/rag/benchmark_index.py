@@ -0,0 +1,187 @@
+import argparse
+import faiss
+import json
+import numpy as np
+import time
+from loguru import logger
+from pathlib import Path
+from typing import List, Sequence
+
+from rag.vector_indexer import IndexConfig, create_faiss_index
+
+
+def load_corpus_vectors(index_dir: Path) -> np.ndarray:
+    """
+    Read back every vector of a persisted flat FAISS index.
+
+    Args:
+        index_dir (Path): Folder of the persisted index (built with the default flat type).
+
+    Returns:
+        np.ndarray: Float32 matrix of shape (n, dim).
+    """
+    index = faiss.read_index(str(index_dir / "index.faiss"))
+    if not isinstance(index, faiss.IndexFlat):
+        raise ValueError(f"Benchmark needs a flat reference index, found {type(index).__name__}")
+    logger.info(f"Loaded {index.ntotal} vectors of dimension {index.d} from {index_dir}")
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """
+    Mean fraction of the exact top-k neighbours returned by an approximate search.
+
+    Args:
+        found (np.ndarray): Ids returned by the index, shape (n_queries, k).
+        truth (np.ndarray): Exact ids from the flat index, shape (n_queries, k).
+
+    Returns:
+        float: Recall@k in [0, 1].
+    """
+    hits = sum(len(np.intersect1d(f, t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def benchmark_index(index: faiss.Index, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    """
+    Measure recall@k and single-query latency of an index.
+
+    Args:
+        index (faiss.Index): Populated index, with search parameters set.
+        queries (np.ndarray): Query vectors.
+        truth (np.ndarray): Exact top-k ids for each query.
+        k (int): Number of neighbours.
+
+    Returns:
+        dict: recall@k, p50/p99 latency in milliseconds and queries per second.
+    """
+    latencies = np.empty(len(queries))
+    found = np.empty((len(queries), k), dtype=np.int64)
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies[i] = time.perf_counter() - start
+        found[i] = ids[0]
+    return {
+        f"recall@{k}": recall_at_k(found, truth),
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "qps": float(len(queries) / latencies.sum()),
+    }
+
+
+def run_benchmark(
+    vectors: np.ndarray,
+    index_types: List[str],
+    k: int = 10,
+    n_queries: int = 500,
+    nprobes: Sequence[int] = (1, 4, 16, 64),
+    ef_searches: Sequence[int] = (16, 64, 256),
+    nlist: int = IndexConfig().nlist,
+    seed: int = 0
+) -> List[dict]:
+    """
+    Build each index type on the corpus vectors and compare it with exact search.
+
+    Query vectors are held out from the indexed vectors.
+
+    Args:
+        vectors (np.ndarray): Corpus vectors.
+        index_types (List[str]): Index types to benchmark (see `IndexConfig`).
+        k (int): Number of neighbours for recall@k.
+        n_queries (int): Number of held-out query vectors.
+        nprobes (Sequence[int]): nprobe values swept for IVF indexes.
+        ef_searches (Sequence[int]): efSearch values swept for HNSW indexes.
+        nlist (int): Number of IVF clusters.
+        seed (int): Random seed for the query split.
+
+    Returns:
+        List[dict]: One result row per (index type, search parameter).
+    """
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(vectors))
+    queries = np.ascontiguousarray(vectors[order[:n_queries]])
+    database = np.ascontiguousarray(vectors[order[n_queries:]])
+    dim = database.shape[1]
+
+    exact = faiss.IndexFlatL2(dim)
+    exact.add(database)
+    _, truth = exact.search(queries, k)
+
+    results = []
+    for index_type in index_types:
+        config = IndexConfig(index_type=index_type, nlist=nlist)
+        start = time.perf_counter()
+        index = create_faiss_index(config, dim, n_train=len(database))
+        if not index.is_trained:
+            sample = database[rng.choice(len(database), min(config.train_size, len(database)), replace=False)]
+            index.train(sample)
+        index.add(database)
+        build_s = time.perf_counter() - start
+        memory_mb = len(faiss.serialize_index(index)) / 2**20
+
+        if isinstance(index, faiss.IndexHNSW):
+            sweep = [("ef_search", ef) for ef in ef_searches]
+        elif isinstance(index, faiss.IndexIVF):
+            sweep = [("nprobe", nprobe) for nprobe in nprobes]
+        else:
+            sweep = [(None, None)]
+
+        for param, value in sweep:
+            if param == "ef_search":
+                index.hnsw.efSearch = value
+            elif param == "nprobe":
+                index.nprobe = value
+            row = {
+                "index_type": index_type,
+                "param": f"{param}={value}" if param else "",
+                "build_s": build_s,
+                "memory_mb": memory_mb,
+                **benchmark_index(index, queries, truth, k),
+            }
+            logger.info(row)
+            results.append(row)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare FAISS index types against exact search on a persisted corpus index."
+    )
+    parser.add_argument(
+        "--index-dir", "-i",
+        required=True,
+        help="Folder of a persisted flat index (built with main_pipeline --index-dir)"
+    )
+    parser.add_argument(
+        "--types",
+        nargs="+",
+        default=["flat", "hnsw", "ivf_flat", "ivf_pq"],
+        choices=["flat", "hnsw", "ivf_flat", "ivf_pq"],
+        help="Index types to benchmark (default: all)"
+    )
+    parser.add_argument("--k", type=int, default=10, help="Neighbours for recall@k (default: %(default)s)")
+    parser.add_argument("--queries", type=int, default=500, help="Held-out queries (default: %(default)s)")
+    parser.add_argument("--nlist", type=int, default=IndexConfig().nlist, help="IVF clusters (default: %(default)s)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64], help="nprobe values to sweep")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256], help="efSearch values to sweep")
+    parser.add_argument("--threads", type=int, default=1, help="FAISS OpenMP threads (default: %(default)s)")
+    parser.add_argument("--output", "-o", default=None, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+    corpus_vectors = load_corpus_vectors(Path(args.index_dir))
+    rows = run_benchmark(
+        corpus_vectors, args.types, k=args.k, n_queries=args.queries,
+        nprobes=args.nprobe, ef_searches=args.ef_search, nlist=args.nlist
+    )
+
+    print(f"{'index':<10} {'param':<14} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p99 ms':>8} {'MB':>8} {'build s':>8}")
+    for row in rows:
+        print(
+            f"{row['index_type']:<10} {row['param']:<14} {row[f'recall@{args.k}']:>10.3f} "
+            f"{row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f} {row['memory_mb']:>8.1f} {row['build_s']:>8.2f}"
+        )
+    if args.output:
+        Path(args.output).write_text(json.dumps(rows, indent=2), encoding="utf-8")
+        logger.success(f"Benchmark results saved to: {args.output}")
@@ -0,0 +1,137 @@
+import numpy as np
+from loguru import logger
+from pydantic import BaseModel
+from typing import Any, List, Optional
+
+from rag.config import EMBEDDING_MODEL_NAME
+
+
+class ChunkConfig(BaseModel):
+    """
+    Token-aware chunking parameters.
+
+    Attributes:
+        max_tokens: Token window of the embedding model, special tokens and
+            the metadata header included (paraphrase-multilingual-MiniLM truncates at 128).
+        overlap_tokens: Tokens shared by consecutive windows of a split paragraph.
+        min_tokens: Paragraphs shorter than this are merged with their neighbours.
+        model_name: Model whose tokenizer counts the tokens.
+    """
+    max_tokens: int = 128
+    overlap_tokens: int = 16
+    min_tokens: int = 32
+    model_name: str = EMBEDDING_MODEL_NAME
+
+
+def load_tokenizer(model_name: str = EMBEDDING_MODEL_NAME) -> Any:
+    """
+    Load the (fast) tokenizer of a sentence-transformers model.
+
+    Args:
+        model_name (str): Hugging Face identifier of the model.
+
+    Returns:
+        Any: Hugging Face tokenizer supporting `return_offsets_mapping`.
+    """
+    from transformers import AutoTokenizer
+    logger.info(f"Loading tokenizer: {model_name}")
+    return AutoTokenizer.from_pretrained(model_name, use_fast=True)
+
+
+class TokenChunker:
+    """
+    Split a document's paragraphs into chunks that fit the embedding window.
+
+    All paragraphs of a file are tokenized in one batch call. Paragraphs that
+    fit are kept whole, short ones are merged with their neighbours, and
+    paragraphs longer than the window are split into overlapping windows
+    cut at token boundaries. The window accounts for the metadata header
+    prefixed to every chunk and for the model's special tokens.
+
+    Attributes:
+        config (ChunkConfig): Chunking parameters.
+    """
+    def __init__(self, config: Optional[ChunkConfig] = None, tokenizer: Any = None):
+        """
+        Initialize the chunker.
+
+        Args:
+            config (Optional[ChunkConfig]): Chunking parameters (defaults if omitted).
+            tokenizer (Any): Preloaded Hugging Face fast tokenizer (loaded on first
+                use from `config.model_name` if omitted).
+
+        Returns:
+            None
+        """
+        self.config = config or ChunkConfig()
+        self._tokenizer = tokenizer
+
+    @property
+    def tokenizer(self) -> Any:
+        """The Hugging Face tokenizer, loaded on first use."""
+        if self._tokenizer is None:
+            self._tokenizer = load_tokenizer(self.config.model_name)
+        return self._tokenizer
+
+    def _windows(self, text: str, offsets: np.ndarray, budget: int) -> List[str]:
+        """
+        Cut a long paragraph into overlapping windows of at most `budget` tokens.
+
+        Args:
+            text (str): Paragraph text.
+            offsets (np.ndarray): (start, end) character offsets of its tokens, shape (n, 2).
+            budget (int): Maximum number of tokens per window.
+
+        Returns:
+            List[str]: Window texts.
+        """
+        n = len(offsets)
+        step = max(budget - self.config.overlap_tokens, 1)
+        starts = np.append(np.arange(0, n - budget, step), n - budget)
+        ends = starts + budget
+        char_starts = offsets[starts, 0]
+        char_ends = offsets[ends - 1, 1]
+        return [text[s:e].strip() for s, e in zip(char_starts.tolist(), char_ends.tolist())]
+
+    def split(self, paragraphs: List[str], header: str = "") -> List[str]:
+        """
+        Chunk the paragraphs of one document.
+
+        Args:
+            paragraphs (List[str]): Non-empty paragraphs, in order.
+            header (str): Metadata header that will prefix every chunk.
+
+        Returns:
+            List[str]: Chunk texts (without the header), in document order.
+        """
+        if not paragraphs:
+            return []
+        encoded = self.tokenizer(
+            [header] + paragraphs, add_special_tokens=False, return_offsets_mapping=True
+        )
+        lengths = np.fromiter(map(len, encoded["input_ids"]), dtype=np.int64, count=len(paragraphs) + 1)
+        budget = max(
+            self.config.max_tokens - self.tokenizer.num_special_tokens_to_add() - int(lengths[0]),
+            self.config.overlap_tokens + 1
+        )
+
+        chunks: List[str] = []
+        current: List[str] = []
+        current_len = 0
+        for i, (text, n) in enumerate(zip(paragraphs, lengths[1:].tolist()), start=1):
+            if n > budget:
+                if current:
+                    chunks.append("\n".join(current))
+                    current, current_len = [], 0
+                chunks.extend(self._windows(text, np.asarray(encoded["offset_mapping"][i]), budget))
+                continue
+            # Start a new chunk when the paragraph does not fit, or when both are long enough alone
+            if current and (current_len + n > budget
+                            or (current_len >= self.config.min_tokens and n >= self.config.min_tokens)):
+                chunks.append("\n".join(current))
+                current, current_len = [], 0
+            current.append(text)
+            current_len += n
+        if current:
+            chunks.append("\n".join(current))
+        return chunks
@@ -0,0 +1,37 @@
+import argparse
+import importlib
+import sys
+
+# Subcommand -> (module, help). Only the module of the invoked subcommand is
+# imported, so `rag search` does not pay for the indexing and serving stacks.
+COMMANDS = {
+    "bench": ("rag.bench", "Benchmark the RAG pipeline stage by stage on a (scaled-up) corpus"),
+    "serve": ("rag.server", "Serve /ask, /search and /health over HTTP from a persisted index"),
+    "search": ("rag.search_engine", "Search a persisted index without loading the RAG pipeline"),
+    "quantize": ("rag.quantization", "Export the int8 ONNX query encoder and check quantized retrieval accuracy"),
+}
+
+
+def main() -> None:
+    """
+    Entry point of the `rag` command: dispatch to the subcommand's module.
+    """
+    parser = argparse.ArgumentParser(prog="rag", description="Rag'it command-line tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # Register the options of the invoked subcommand only (all of them for `rag --help`)
+    invoked = next((arg for arg in sys.argv[1:] if not arg.startswith("-")), None)
+    for name, (module_name, help_text) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text)
+        if invoked in COMMANDS and name != invoked:
+            continue
+        module = importlib.import_module(module_name)
+        module.add_arguments(subparser)
+        subparser.set_defaults(func=module.main)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
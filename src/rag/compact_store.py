@@ -0,0 +1,198 @@
+import json
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+from typing import Dict, List, Tuple, Union
+
+from rag.document_builder import build_header
+from rag.glossary import GLOSSARY_METADATA_KEY
+
+# Metadata keys that vary from chunk to chunk of a source, stored per chunk instead of interned
+CHUNK_METADATA_KEYS = (GLOSSARY_METADATA_KEY,)
+
+
+class CompactDocstore(Docstore, AddableMixin):
+    """
+    Memory-compact docstore for the FAISS vector store.
+
+    Each source document's metadata dict and text header are interned once
+    and referenced by a source id. Chunk bodies are kept, without the
+    header, in one contiguous UTF-8 buffer addressed by (offset, length).
+    Documents are rebuilt on lookup with the same `page_content` and
+    `metadata` as produced by `create_documents`. Chunk-level metadata
+    (`CHUNK_METADATA_KEYS`, e.g. glossary tags) is kept per chunk, so it does
+    not split the interned source metadata.
+
+    Attributes:
+        sources (List[dict]): Interned metadata dicts, indexed by source id.
+    """
+    def __init__(self):
+        """
+        Initialize an empty docstore.
+
+        Returns:
+            None
+        """
+        self.sources: List[dict] = []
+        self._headers: List[str] = []
+        self._source_ids: Dict[str, int] = {}
+        self._buffer = bytearray()
+        # doc id -> (offset, length, source id, has header)
+        self._entries: Dict[str, Tuple[int, int, int, bool]] = {}
+        # doc id -> chunk-level metadata, for chunks that have any
+        self._chunk_metadata: Dict[str, dict] = {}
+
+    def _intern(self, metadata: dict) -> int:
+        """
+        Return the source id of a metadata dict, registering it if unseen.
+
+        Args:
+            metadata (dict): Document metadata.
+
+        Returns:
+            int: Source id.
+        """
+        key = json.dumps(metadata, sort_keys=True, ensure_ascii=False, default=str)
+        source_id = self._source_ids.get(key)
+        if source_id is None:
+            source_id = len(self.sources)
+            self._source_ids[key] = source_id
+            self.sources.append(metadata)
+            self._headers.append(build_header(metadata) if "title_main" in metadata else "")
+        return source_id
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        """
+        Add documents, storing their header-free body in the text buffer.
+
+        Args:
+            texts (Dict[str, Document]): Mapping of doc id to document.
+
+        Returns:
+            None
+        """
+        overlapping = set(texts).intersection(self._entries)
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        for doc_id, doc in texts.items():
+            metadata = doc.metadata
+            if any(key in metadata for key in CHUNK_METADATA_KEYS):
+                chunk_metadata = {key: metadata[key] for key in CHUNK_METADATA_KEYS if key in metadata}
+                metadata = {key: value for key, value in metadata.items() if key not in chunk_metadata}
+                self._chunk_metadata[doc_id] = chunk_metadata
+            source_id = self._intern(metadata)
+            header = self._headers[source_id]
+            content = doc.page_content
+            has_header = bool(header) and content.startswith(header)
+            body = content[len(header):] if has_header else content
+            encoded = body.encode("utf-8")
+            self._entries[doc_id] = (len(self._buffer), len(encoded), source_id, has_header)
+            self._buffer += encoded
+
+    def delete(self, ids: List) -> None:
+        """
+        Delete documents (buffer space is reclaimed when the store is saved).
+
+        Args:
+            ids (List): Doc ids to delete.
+
+        Returns:
+            None
+        """
+        overlapping = set(ids).intersection(self._entries)
+        if not overlapping:
+            raise ValueError(f"Tried to delete ids that does not exist: {ids}")
+        for doc_id in ids:
+            self._entries.pop(doc_id)
+            self._chunk_metadata.pop(doc_id, None)
+
+    def search(self, search: str) -> Union[str, Document]:
+        """
+        Rebuild a document from the buffer.
+
+        Args:
+            search (str): Id of the document to look up.
+
+        Returns:
+            Union[str, Document]: The document if found, else an error message.
+        """
+        entry = self._entries.get(search)
+        if entry is None:
+            return f"ID {search} not found."
+        offset, length, source_id, has_header = entry
+        body = self._buffer[offset:offset + length].decode("utf-8")
+        header = self._headers[source_id] if has_header else ""
+        # A copy, so that callers editing the metadata do not alter every chunk of the source
+        metadata = {**self.sources[source_id], **self._chunk_metadata.get(search, {})}
+        return Document(id=search, page_content=header + body, metadata=metadata)
+
+    def source_ids(self, ids: List[str]) -> np.ndarray:
+        """
+        Look up the source id (index in `sources`) of documents.
+
+        Args:
+            ids (List[str]): Doc ids.
+
+        Returns:
+            np.ndarray: Source id of each document (int32).
+        """
+        return np.fromiter((self._entries[i][2] for i in ids), dtype=np.int32, count=len(ids))
+
+    def __len__(self) -> int:
+        """Number of documents in the store."""
+        return len(self._entries)
+
+    def __getstate__(self) -> dict:
+        """
+        Compact the buffer and sources, and store entries as NumPy arrays for pickling.
+
+        Returns:
+            dict: Picklable state.
+        """
+        ids = list(self._entries)
+        used_sources = sorted({self._entries[i][2] for i in ids})
+        remap = {old: new for new, old in enumerate(used_sources)}
+
+        buffer = bytearray()
+        offsets = np.empty(len(ids), dtype=np.int64)
+        lengths = np.empty(len(ids), dtype=np.int64)
+        source_ids = np.empty(len(ids), dtype=np.int32)
+        has_header = np.empty(len(ids), dtype=bool)
+        for n, doc_id in enumerate(ids):
+            offset, length, source_id, with_header = self._entries[doc_id]
+            offsets[n] = len(buffer)
+            lengths[n] = length
+            source_ids[n] = remap[source_id]
+            has_header[n] = with_header
+            buffer += self._buffer[offset:offset + length]
+
+        return {
+            "sources": [self.sources[s] for s in used_sources],
+            "buffer": bytes(buffer),
+            "ids": ids,
+            "offsets": offsets,
+            "lengths": lengths,
+            "source_ids": source_ids,
+            "has_header": has_header,
+            "chunk_metadata": {i: self._chunk_metadata[i] for i in ids if i in self._chunk_metadata},
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        Restore the docstore from its pickled state.
+
+        Args:
+            state (dict): State produced by `__getstate__`.
+        """
+        self.__init__()
+        for metadata in state["sources"]:
+            self._intern(metadata)
+        self._buffer = bytearray(state["buffer"])
+        self._entries = {
+            doc_id: (int(offset), int(length), int(source_id), bool(with_header))
+            for doc_id, offset, length, source_id, with_header in zip(
+                state["ids"], state["offsets"], state["lengths"], state["source_ids"], state["has_header"]
+            )
+        }
+        # Missing from docstores saved before chunk-level metadata existed
+        self._chunk_metadata = state.get("chunk_metadata", {})
@@ -0,0 +1,4 @@
+# Shared settings, importable without loading LangChain, torch or FAISS
+
+# Sentence-transformers model embedding the chunks and queries
+EMBEDDING_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
@@ -0,0 +1,174 @@
+import re
+import threading
+from langchain_core.documents import Document
+from loguru import logger
+from pydantic import BaseModel
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from rag.document_builder import build_header
+from rag.sparse_index import tokenize
+
+# Syllables, words and punctuation marks: a rough stand-in for LLM tokens
+_APPROX_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def approx_token_count(text: str) -> int:
+    """
+    Approximate the number of LLM tokens in a text without loading a tokenizer.
+
+    Args:
+        text (str): Input text.
+
+    Returns:
+        int: Number of syllables, words and punctuation marks.
+    """
+    return len(_APPROX_TOKEN_RE.findall(text))
+
+
+class ContextConfig(BaseModel):
+    """
+    Settings of the context assembly stage run before the "stuff" prompt.
+
+    Attributes:
+        max_tokens (int): Token budget of the stuffed context (0 for no limit).
+        dedup_threshold (float): Word-shingle Jaccard similarity above which a
+            chunk is dropped as a near-duplicate of a better-ranked one (1.0 keeps
+            all but exact duplicates).
+        shingle_size (int): Number of consecutive tokens per shingle.
+        merge_sources (bool): Put chunks of the same source under a single header.
+    """
+    max_tokens: int = 2048
+    dedup_threshold: float = 0.8
+    shingle_size: int = 3
+    merge_sources: bool = True
+
+
+class ContextBuilder:
+    """
+    Assemble retrieved chunks into a compact prompt context.
+
+    Chunks are taken in rank order: near-duplicates of already kept chunks
+    are dropped, chunks are kept while they fit the token budget (the best
+    one is always kept), and the kept chunks of each source are merged under
+    one metadata header instead of repeating it per chunk.
+
+    Attributes:
+        config (ContextConfig): Assembly settings.
+        count_tokens (Callable[[str], int]): Token counter used for the budget.
+        tokens_saved (int): Total prompt tokens saved over all built contexts.
+    """
+    def __init__(self,
+        config: Optional[ContextConfig] = None,
+        count_tokens: Callable[[str], int] = approx_token_count):
+        """
+        Initialize the context builder.
+
+        Args:
+            config (Optional[ContextConfig]): Assembly settings (defaults if omitted).
+            count_tokens (Callable[[str], int]): Token counter, e.g. the LLM tokenizer's;
+                defaults to `approx_token_count`.
+
+        Returns:
+            None
+        """
+        self.config = config or ContextConfig()
+        self.count_tokens = count_tokens
+        self.tokens_saved = 0
+        # Contexts are assembled concurrently by `SimpleRAG.ask_batch` threads
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def split_header(doc: Document) -> Tuple[str, str]:
+        """
+        Split a chunk into the metadata header added by `create_documents` and its body.
+
+        Args:
+            doc (Document): Retrieved document.
+
+        Returns:
+            Tuple[str, str]: (header, body); the header is empty if the chunk has none.
+        """
+        if "title_main" in doc.metadata:
+            header = build_header(doc.metadata)
+            if doc.page_content.startswith(header):
+                return header, doc.page_content[len(header):]
+        return "", doc.page_content
+
+    def _shingles(self, text: str) -> FrozenSet[Tuple[str, ...]]:
+        """Set of consecutive token n-grams of a chunk body, used for near-duplicate detection."""
+        tokens = tokenize(text)
+        n = min(self.config.shingle_size, len(tokens)) or 1
+        return frozenset(tuple(tokens[i:i + n]) for i in range(max(len(tokens) - n + 1, 1)))
+
+    def _is_duplicate(self, shingles: FrozenSet, kept: List[FrozenSet]) -> bool:
+        """Whether a chunk's shingles are too similar to those of a kept chunk."""
+        for other in kept:
+            union = len(shingles | other)
+            if union and len(shingles & other) / union >= self.config.dedup_threshold:
+                return True
+        return False
+
+    def build(self, sources: List[Document]) -> str:
+        """
+        Build the context stuffed into the QA prompt.
+
+        Args:
+            sources (List[Document]): Retrieved documents, best first.
+
+        Returns:
+            str: Context text, one block per source: header, then its kept chunk bodies.
+        """
+        return self.assemble(sources)[0]
+
+    def assemble(self, sources: List[Document]) -> Tuple[str, List[Document]]:
+        """
+        Build the context stuffed into the QA prompt, and report which chunks it contains.
+
+        Args:
+            sources (List[Document]): Retrieved documents, best first.
+
+        Returns:
+            Tuple[str, List[Document]]: Context text (see `build`) and the kept
+                documents, in rank order (without near-duplicates and chunks over budget).
+        """
+        baseline = self.count_tokens("\n\n".join(doc.page_content for doc in sources))
+        budget = self.config.max_tokens or float("inf")
+        used = 0
+        kept_shingles: List[FrozenSet] = []
+        # header -> kept bodies, in order of first appearance (i.e. best rank)
+        blocks: Dict[str, List[str]] = {}
+        kept: List[Document] = []
+        duplicates = over_budget = 0
+
+        for n, doc in enumerate(sources):
+            header, body = self.split_header(doc)
+            shingles = self._shingles(body)
+            if self._is_duplicate(shingles, kept_shingles):
+                duplicates += 1
+                continue
+
+            # Without merging, every chunk keeps its own header
+            key = header if self.config.merge_sources else f"{n}\0{header}"
+            cost = self.count_tokens(body) + (self.count_tokens(header) if key not in blocks else 0)
+            # The best chunk is always kept, so the context is never empty
+            if blocks and used + cost > budget:
+                over_budget += 1
+                continue
+
+            used += cost
+            kept_shingles.append(shingles)
+            blocks.setdefault(key, []).append(body.strip())
+            kept.append(doc)
+
+        context = "\n\n".join(
+            key.split("\0", 1)[-1] + "\n\n".join(bodies) for key, bodies in blocks.items()
+        )
+        saved = baseline - self.count_tokens(context)
+        with self._lock:
+            self.tokens_saved += saved
+        logger.info(
+            f"Context: {len(sources)} chunks -> {len(blocks)} blocks "
+            f"({duplicates} near-duplicates, {over_budget} over budget), "
+            f"{baseline} -> {baseline - saved} tokens ({saved} saved)"
+        )
+        return context, kept
@@ -1,6 +1,11 @@
-from langchain.schema import Document
+from langchain_core.documents import Document
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple
+
+from rag.glossary import GLOSSARY_METADATA_KEY, Glossary
+
+if TYPE_CHECKING:
+    from rag.chunker import TokenChunker
 
 class Metadata(BaseModel):
     title_main: str
@@ -15,7 +20,34 @@ class Metadata(BaseModel):
     identifiers: dict = {}
 
 
-def create_documents(chunks: List[str], metadata: dict) -> List[Document]:
+def build_header(parsed: dict) -> str:
+    """
+    Build the metadata header prefixed to every chunk of a source document.
+
+    Args:
+        parsed (dict): Validated metadata dictionary (see `Metadata`).
+
+    Returns:
+        str: Header lines (title, authors, date, publisher, genres) followed by a blank line.
+    """
+    header_lines = [f"Title: {parsed['title_main']}"]
+    if parsed.get('authors'):
+        header_lines.append(f"Authors: {', '.join(parsed['authors'])}")
+    if parsed.get('publication_date'):
+        header_lines.append(f"Publication Date: {parsed['publication_date']}")
+    if parsed.get('publisher'):
+        header_lines.append(f"Publisher: {parsed['publisher']}")
+    if parsed.get('genres'):
+        header_lines.append(f"Genres: {', '.join(parsed['genres'])}")
+    return "\n".join(header_lines) + "\n\n"
+
+
+def create_documents(
+    chunks: List[str],
+    metadata: dict,
+    chunker: Optional["TokenChunker"] = None,
+    glossary: Optional[Glossary] = None
+) -> List[Document]:
     """
     Convert raw text chunks and metadata into Document objects,
     embedding metadata into the content header so it's both searchable
@@ -25,6 +57,10 @@ def create_documents(chunks: List[str], metadata: dict) -> List[Document]:
         chunks (List[str]): List of text segments to be indexed.
         metadata (dict): Metadata dictionary containing fields like
             title_main, authors, publication_date, publisher, genres, etc.
+        chunker (Optional[TokenChunker]): If given, the text segments (paragraphs)
+            are first re-chunked to fit the embedding model's token window.
+        glossary (Optional[Glossary]): If given, each chunk is tagged with the glossary
+            terms it contains (metadata key `glossary_terms`).
 
     Returns:
         List[Document]: A list of LangChain Document objects with metadata
@@ -34,23 +70,38 @@ def create_documents(chunks: List[str], metadata: dict) -> List[Document]:
     docs: List[Document] = []
 
     # Build metadata header
-    header_lines = [f"Title: {parsed['title_main']}"]
-    if parsed.get('authors'):
-        header_lines.append(f"Authors: {', '.join(parsed['authors'])}")
-    if parsed.get('publication_date'):
-        header_lines.append(f"Publication Date: {parsed['publication_date']}")
-    if parsed.get('publisher'):
-        header_lines.append(f"Publisher: {parsed['publisher']}")
-    if parsed.get('genres'):
-        header_lines.append(f"Genres: {', '.join(parsed['genres'])}")
-    header = "\n".join(header_lines) + "\n\n"
+    header = build_header(parsed)
+    if chunker is not None:
+        chunks = chunker.split(chunks, header)
 
     # Prefix each chunk with header
     for chunk in chunks:
         docs.append(
             Document(
                 page_content=header + chunk,
-                metadata=parsed
+                metadata=parsed if glossary is None else {**parsed, GLOSSARY_METADATA_KEY: glossary.tag(chunk)}
             )
         )
     return docs
+
+
+def iter_documents(
+    entries: Iterable[Tuple[List[str], dict]],
+    chunker: Optional["TokenChunker"] = None,
+    glossary: Optional[Glossary] = None
+) -> Iterator[Document]:
+    """
+    Lazily convert (chunks, metadata) pairs into Document objects.
+
+    Args:
+        entries (Iterable[Tuple[List[str], dict]]): (chunks, metadata) pairs,
+            typically streamed from the loader.
+        chunker (Optional[TokenChunker]): Token-aware chunker applied to each entry
+            (one chunk per paragraph if omitted).
+        glossary (Optional[Glossary]): Glossary whose terms are tagged on each chunk.
+
+    Yields:
+        Document: One LangChain Document per chunk.
+    """
+    for chunks, metadata in entries:
+        yield from create_documents(chunks, metadata, chunker, glossary)
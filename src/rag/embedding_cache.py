@@ -0,0 +1,194 @@
+import hashlib
+import re
+import sqlite3
+import time
+import unicodedata
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+from pathlib import Path
+from typing import Dict, List
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+def text_hash(text: str) -> str:
+    """
+    Hash a text after Unicode (NFC) and whitespace normalization.
+
+    Args:
+        text (str): Text to hash.
+
+    Returns:
+        str: Hexadecimal SHA-256 digest of the normalized text.
+    """
+    normalized = re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed embedding cache in front of another embedding model.
+
+    Vectors are stored as float32 blobs in a local SQLite database keyed by
+    (model name, normalized text hash), so that rebuilding an index only
+    embeds text that has never been seen. The cache is bounded in size and
+    evicts the least recently used entries first.
+
+    Attributes:
+        embeddings (Embeddings): Underlying embedding model.
+        model_name (str): Name of the embedding model, part of the cache key.
+        max_entries (int): Maximum number of cached vectors across all models.
+        hits (int): Number of texts served from the cache.
+        misses (int): Number of texts sent to the underlying model.
+    """
+    def __init__(self,
+        embeddings: Embeddings,
+        model_name: str,
+        cache_path: Path,
+        max_entries: int = 200_000):
+        """
+        Open (or create) the embedding cache.
+
+        Args:
+            embeddings (Embeddings): Underlying embedding model.
+            model_name (str): Name of the embedding model, part of the cache key.
+            cache_path (Path): Path to the SQLite database file.
+            max_entries (int): Maximum number of cached vectors before eviction.
+
+        Returns:
+            None
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(cache_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        # Row count kept in memory: COUNT(*) scans the whole table
+        (self._size,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+    def _lookup(self, hashes: List[str]) -> Dict[str, List[float]]:
+        """
+        Fetch cached vectors for the given hashes and refresh their LRU stamp.
+
+        Args:
+            hashes (List[str]): Unique text hashes to look up.
+
+        Returns:
+            Dict[str, List[float]]: Cached vectors keyed by text hash.
+        """
+        found: Dict[str, List[float]] = {}
+        for start in range(0, len(hashes), _SQL_BATCH):
+            batch = hashes[start:start + _SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                [self.model_name, *batch]
+            ).fetchall()
+            for h, blob in rows:
+                found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+        if found:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                [(now, self.model_name, h) for h in found]
+            )
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]) -> None:
+        """
+        Insert new vectors, then evict least recently used entries above the size bound.
+
+        Args:
+            vectors (Dict[str, List[float]]): Vectors keyed by text hash.
+        """
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+            [(self.model_name, h, np.asarray(v, dtype=np.float32).tobytes(), now) for h, v in vectors.items()]
+        )
+        # The hashes were just looked up and missed, so every row is new
+        self._size += len(vectors)
+        if self._size > self.max_entries:
+            evicted = self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (self._size - self.max_entries,)
+            ).rowcount
+            self._size -= evicted
+            logger.debug(f"Embedding cache evicted {evicted} least recently used entries")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed documents, computing only the vectors missing from the cache.
+
+        Args:
+            texts (List[str]): Texts to embed.
+
+        Returns:
+            List[List[float]]: One embedding per input text.
+        """
+        hashes = [text_hash(t) for t in texts]
+        unique = list(dict.fromkeys(hashes))
+        vectors = self._lookup(unique)
+
+        # Embed each missing text once, even if it appears several times
+        missing = {h: t for h, t in zip(hashes, texts) if h not in vectors}
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            computed = self.embeddings.embed_documents(list(missing.values()))
+            # Round through float32 so fresh and cached vectors are identical
+            new_vectors = {h: np.asarray(v, dtype=np.float32).tolist() for h, v in zip(missing, computed)}
+            self._store(new_vectors)
+            vectors.update(new_vectors)
+        self._conn.commit()
+
+        logger.debug(f"Embedding cache: {len(texts) - len(missing)} hit(s), {len(missing)} miss(es)")
+        return [vectors[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query with the underlying model (queries are not cached).
+
+        Args:
+            text (str): Query text.
+
+        Returns:
+            List[float]: Query embedding.
+        """
+        return self.embeddings.embed_query(text)
+
+    def stats(self) -> dict:
+        """
+        Report cache counters.
+
+        Returns:
+            dict: Hits, misses, hit rate and current number of cached entries.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": self._size,
+        }
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+        self._conn.close()
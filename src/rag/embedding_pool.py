@@ -0,0 +1,131 @@
+import atexit
+import multiprocessing
+import os
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+from typing import Any, List, Optional, Tuple
+
+# Sentence-transformers model of a worker process, loaded by `_init_worker`
+_worker_model: Any = None
+
+
+def _init_worker(model_name: str, threads: int) -> None:
+    """
+    Load the encoder in a worker process.
+
+    The thread count is set before torch is imported in the worker, so the
+    OpenMP / MKL runtimes pick it up and the workers do not oversubscribe
+    the cores.
+
+    Args:
+        model_name (str): Hugging Face identifier of the embedding model.
+        threads (int): Torch threads of the worker.
+    """
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    import torch
+    from sentence_transformers import SentenceTransformer
+    torch.set_num_threads(threads)
+    global _worker_model
+    _worker_model = SentenceTransformer(model_name, device="cpu")
+
+
+def _encode_batch(args: Tuple[List[str], int]) -> np.ndarray:
+    """Encode one batch of texts in a worker process."""
+    texts, batch_size = args
+    return _worker_model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+
+
+class MultiProcessEmbeddings(Embeddings):
+    """
+    Sentence-transformers embeddings fanned out over a pool of worker processes.
+
+    The pool is started once and reused for every call to `embed_documents`,
+    so that streaming batches through it keeps all CPU cores busy. Once
+    closed (explicitly, as a context manager or at interpreter exit),
+    documents are embedded in the main process.
+
+    Attributes:
+        model_name (str): Hugging Face identifier of the embedding model.
+        model (SentenceTransformer): Encoder used for queries, and for documents once the pool is closed.
+        num_workers (int): Number of worker processes.
+        batch_size (int): Encoding batch size inside each worker.
+    """
+    def __init__(self,
+        model_name: str,
+        num_workers: int,
+        batch_size: int = 64,
+        threads_per_worker: Optional[int] = None):
+        """
+        Load the encoder and start the worker pool.
+
+        Args:
+            model_name (str): Hugging Face identifier of the embedding model.
+            num_workers (int): Number of worker processes.
+            batch_size (int): Encoding batch size inside each worker.
+            threads_per_worker (Optional[int]): Torch threads per worker
+                (default: CPU count divided by the number of workers).
+
+        Returns:
+            None
+        """
+        from sentence_transformers import SentenceTransformer
+
+        threads = threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+        logger.info(f"Starting {num_workers} embedding worker(s) with {threads} thread(s) each")
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.num_workers = num_workers
+        self.batch_size = batch_size
+        # Spawned (not forked) workers import torch afresh, after `_init_worker` set their thread count
+        self._pool = multiprocessing.get_context("spawn").Pool(
+            num_workers, initializer=_init_worker, initargs=(model_name, threads)
+        )
+        atexit.register(self.close)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed documents across the worker pool.
+
+        Args:
+            texts (List[str]): Texts to embed.
+
+        Returns:
+            List[List[float]]: One embedding per input text.
+        """
+        if not texts:
+            return []
+        texts = [t.replace("\n", " ") for t in texts]
+        if self._pool is None:
+            return self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True).tolist()
+        batches = [(texts[i:i + self.batch_size], self.batch_size) for i in range(0, len(texts), self.batch_size)]
+        return np.concatenate(self._pool.map(_encode_batch, batches)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query in the main process.
+
+        Args:
+            text (str): Query text.
+
+        Returns:
+            List[float]: Query embedding.
+        """
+        return self.model.encode(text.replace("\n", " ")).tolist()
+
+    def close(self) -> None:
+        """Stop the worker pool (idempotent)."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+            atexit.unregister(self.close)
+
+    def __enter__(self) -> "MultiProcessEmbeddings":
+        """Use the pool as a context manager, closed on exit."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Stop the worker pool."""
+        self.close()
@@ -0,0 +1,228 @@
+import faiss
+import numpy as np
+import pickle
+from loguru import logger
+from pathlib import Path
+from pydantic import BaseModel
+from typing import Any, Dict, Literal, Optional, Tuple
+
+# FAISS recommends at least this many training points per IVF centroid
+_MIN_POINTS_PER_CENTROID = 39
+
+# Scalar quantizer and index factory code of each stored vector type
+_SQ_TYPES = {"float16": faiss.ScalarQuantizer.QT_fp16, "int8": faiss.ScalarQuantizer.QT_8bit}
+_SQ_CODES = {"float32": "Flat", "float16": "SQfp16", "int8": "SQ8"}
+
+
+class IndexConfig(BaseModel):
+    """
+    FAISS index type and its build and search parameters.
+
+    Attributes:
+        index_type: "flat" (exact), "hnsw", "ivf_flat" or "ivf_pq".
+        nlist: Number of IVF clusters (capped by the training sample size).
+        pq_m: Number of PQ sub-quantizers (must divide the embedding dimension).
+        pq_bits: Bits per PQ code.
+        hnsw_m: Number of HNSW neighbours per node.
+        ef_construction: HNSW build-time search depth.
+        train_size: Number of vectors sampled to train IVF indexes.
+        nprobe: Number of IVF clusters visited per query.
+        ef_search: HNSW query-time search depth.
+        vector_dtype: Storage of the vectors in flat, HNSW and IVF-flat indexes:
+            "float32", "float16" (half the memory) or "int8" (FAISS scalar
+            quantizer, a quarter of the memory, trained on the sample).
+    """
+    index_type: Literal["flat", "hnsw", "ivf_flat", "ivf_pq"] = "flat"
+    nlist: int = 1024
+    pq_m: int = 16
+    pq_bits: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    train_size: int = 50_000
+    nprobe: int = 16
+    ef_search: int = 64
+    vector_dtype: Literal["float32", "float16", "int8"] = "float32"
+
+    @property
+    def requires_training(self) -> bool:
+        """Whether the index must be trained on a sample before adding vectors."""
+        return self.index_type in {"ivf_flat", "ivf_pq"} or self.vector_dtype == "int8"
+
+    def build_params(self) -> dict:
+        """
+        Parameters that require rebuilding the index when they change.
+
+        Returns:
+            dict: Configuration without the query-time parameters.
+        """
+        params = self.model_dump(exclude={"nprobe", "ef_search"})
+        if self.vector_dtype == "float32":
+            # Keep manifests of indexes built before the option existed valid
+            params.pop("vector_dtype")
+        return params
+
+
+def _flat_index(config: IndexConfig, dim: int) -> faiss.Index:
+    """Exact index storing vectors as `config.vector_dtype`."""
+    if config.vector_dtype == "float32":
+        return faiss.IndexFlatL2(dim)
+    return faiss.IndexScalarQuantizer(dim, _SQ_TYPES[config.vector_dtype], faiss.METRIC_L2)
+
+
+def create_faiss_index(config: IndexConfig, dim: int, n_train: int = 0) -> faiss.Index:
+    """
+    Create an empty FAISS index from a configuration.
+
+    IVF indexes fall back to a flat index when the training sample is too
+    small for even one cluster per PQ code. `vector_dtype` does not apply to
+    IVF-PQ, whose vectors are already compressed to PQ codes.
+
+    Args:
+        config (IndexConfig): Index type and parameters.
+        dim (int): Embedding dimension.
+        n_train (int): Number of vectors available to train IVF indexes and scalar quantizers.
+
+    Returns:
+        faiss.Index: Untrained index (L2 metric).
+    """
+    if config.index_type == "hnsw":
+        if config.vector_dtype == "float32":
+            index = faiss.IndexHNSWFlat(dim, config.hnsw_m)
+        else:
+            index = faiss.IndexHNSWSQ(dim, _SQ_TYPES[config.vector_dtype], config.hnsw_m)
+        index.hnsw.efConstruction = config.ef_construction
+        return index
+
+    if config.index_type in {"ivf_flat", "ivf_pq"}:
+        nlist = min(config.nlist, max(1, n_train // _MIN_POINTS_PER_CENTROID))
+        min_train = 2 ** config.pq_bits if config.index_type == "ivf_pq" else nlist
+        if n_train < min_train:
+            logger.warning(f"Only {n_train} training vectors for {config.index_type}, using a flat index")
+            return _flat_index(config, dim)
+        if nlist < config.nlist:
+            logger.warning(f"Reducing nlist from {config.nlist} to {nlist} for {n_train} training vectors")
+        if config.index_type == "ivf_flat":
+            return faiss.index_factory(dim, f"IVF{nlist},{_SQ_CODES[config.vector_dtype]}")
+        if config.vector_dtype != "float32":
+            logger.warning(f"vector_dtype={config.vector_dtype} does not apply to ivf_pq, ignoring it")
+        return faiss.index_factory(dim, f"IVF{nlist},PQ{config.pq_m}x{config.pq_bits}")
+
+    return _flat_index(config, dim)
+
+
+def supports_removal(index: faiss.Index) -> bool:
+    """
+    Whether vectors can be removed from an index while keeping its row ids contiguous.
+
+    Flat (and scalar-quantized flat) indexes shift the remaining vectors down
+    on `remove_ids`, as LangChain's FAISS wrapper and the metadata bitmaps
+    assume. IVF indexes keep the original ids of the remaining vectors
+    (leaving gaps), and HNSW indexes cannot remove vectors at all.
+
+    Args:
+        index (faiss.Index): Index to check.
+
+    Returns:
+        bool: True for flat indexes.
+    """
+    return isinstance(index, faiss.IndexFlatCodes)
+
+
+def configure_index(index: faiss.Index, config: IndexConfig) -> None:
+    """
+    Apply query-time parameters (nprobe, efSearch) to a FAISS index.
+
+    Args:
+        index (faiss.Index): Index configured in place.
+        config (IndexConfig): Index configuration.
+    """
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = config.ef_search
+    else:
+        try:
+            faiss.extract_index_ivf(index).nprobe = config.nprobe
+        except RuntimeError:
+            pass  # not an IVF index
+
+
+def search_index(
+    index: faiss.Index,
+    vectors: np.ndarray,
+    k: int,
+    row_mask: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Search a FAISS index, optionally only the rows selected by a mask (e.g. from a metadata filter).
+
+    The mask is passed to FAISS as an `IDSelectorBitmap`, so excluded vectors
+    are skipped during the search instead of being filtered out afterwards.
+    The index's nprobe / efSearch settings are kept.
+
+    Args:
+        index (faiss.Index): Index to search.
+        vectors (np.ndarray): Query vectors, shape (n_queries, dim).
+        k (int): Number of results per query.
+        row_mask (Optional[np.ndarray]): Boolean mask over FAISS row ids.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Distances and row ids, shape (n_queries, k),
+            best first; missing results have row id -1.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if row_mask is None:
+        return index.search(vectors, k)
+    bitmap = np.packbits(row_mask, bitorder="little")
+    selector = faiss.IDSelectorBitmap(len(row_mask), faiss.swig_ptr(bitmap))
+    if isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    else:
+        try:
+            params = faiss.SearchParametersIVF(sel=selector, nprobe=faiss.extract_index_ivf(index).nprobe)
+        except RuntimeError:  # not an IVF index
+            params = faiss.SearchParameters(sel=selector)
+    return index.search(vectors, k, params=params)
+
+
+def read_index(index_dir: Path, mmap: bool = False) -> faiss.Index:
+    """
+    Read the FAISS index persisted in a folder (`index.faiss`).
+
+    With `mmap`, the index file is memory-mapped instead of read into memory,
+    so several processes loading the same index share its pages through the
+    OS page cache, and opening a large index is almost free.
+
+    Args:
+        index_dir (Path): Folder holding the index.
+        mmap (bool): Memory-map the index file (the index must then not be modified).
+
+    Returns:
+        faiss.Index: The index.
+    """
+    path = str(index_dir / "index.faiss")
+    if not mmap:
+        return faiss.read_index(path)
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    mmap_ifc = getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+    try:
+        # IO_FLAG_MMAP_IFC maps the codes of flat (and scalar-quantized) indexes in place
+        return faiss.read_index(path, flags | mmap_ifc)
+    except RuntimeError:
+        if not mmap_ifc:
+            raise
+        # IVF indexes reject it: their inverted lists are mapped with IO_FLAG_MMAP alone
+        return faiss.read_index(path, flags)
+
+
+def read_docstore(index_dir: Path) -> Tuple[Any, Dict[int, str]]:
+    """
+    Read the docstore saved by LangChain's `FAISS.save_local` (`index.pkl`).
+
+    Args:
+        index_dir (Path): Folder holding the docstore.
+
+    Returns:
+        Tuple[Any, Dict[int, str]]: The docstore and the FAISS row -> doc id mapping.
+    """
+    with (index_dir / "index.pkl").open("rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return docstore, index_to_docstore_id
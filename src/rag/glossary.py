@@ -0,0 +1,316 @@
+import csv
+import hashlib
+import json
+import re
+import unicodedata
+from array import array
+from collections import deque
+from loguru import logger
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Columns of the table written by `ocr.extract_trilingual_ocr_training_data`
+GLOSSARY_COLUMNS = ("term", "han", "vi", "fr")
+# Chunk metadata key listing the glossary terms found in the chunk
+GLOSSARY_METADATA_KEY = "glossary_terms"
+
+_HAN = r"\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+# Hán characters are matched one by one (Hán text has no spaces), other scripts by word
+_TOKEN_RE = re.compile(rf"[{_HAN}]|[^\W{_HAN}]+")
+# Alternative translations in a cell ("Civilisation, progrès") and parenthesized notes
+_VARIANT_SEP_RE = re.compile(r"[,;/]")
+_NOTE_RE = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+# Longer variants are explanations rather than terms, and are not matched
+MAX_PATTERN_TOKENS = 6
+# Transition keys are `state << _STATE_SHIFT | token id`
+_STATE_SHIFT = 32
+# Part of the glossary version: indexes tagged with another matching rule are re-tagged
+_MATCHING = "leftmost-longest"
+
+
+def glossary_tokens(text: str) -> List[str]:
+    """
+    Split text into NFC-normalized, lowercased words and single Hán characters.
+
+    Hyphens and punctuation are separators, so "Văn-minh" matches "văn minh".
+
+    Args:
+        text (str): Input text (Vietnamese, French or Hán).
+
+    Returns:
+        List[str]: Tokens in order of appearance.
+    """
+    return _TOKEN_RE.findall(unicodedata.normalize("NFC", text).lower())
+
+
+class Glossary:
+    """
+    Trilingual (Hán / Việt / French) glossary compiled into an Aho-Corasick automaton.
+
+    Every variant of every column of an entry is a pattern of tokens (see
+    `glossary_tokens`). The automaton runs over the tokens of a text, so all
+    occurrences of all patterns, on word boundaries, are found in one pass
+    whose cost is linear in the text length plus the number of matches,
+    independent of the glossary size. Tokens absent from every pattern reset
+    the automaton without a transition lookup. Of overlapping occurrences,
+    only the leftmost-longest are kept, so "Minh" is not matched inside
+    "văn minh".
+
+    The automaton is stored as flat lookup tables: one dict of transitions
+    keyed by (state, token id), a direct table of the root transitions, and
+    `array`s of failure links, output links (nearest suffix state ending a
+    pattern), depths (pattern lengths) and, per state, the (entry, column)
+    pairs it completes.
+
+    Attributes:
+        entries (List[Dict[str, str]]): Glossary entries, with the `GLOSSARY_COLUMNS` keys.
+        version (str): Hash of the entries and the matching rule, recorded in index manifests.
+    """
+    def __init__(self, entries: Iterable[Dict[str, str]]):
+        """
+        Compile the automaton of a glossary.
+
+        Args:
+            entries (Iterable[Dict[str, str]]): Rows with (some of) the `GLOSSARY_COLUMNS`
+                keys; missing or empty cells are ignored.
+
+        Returns:
+            None
+        """
+        self.entries: List[Dict[str, str]] = []
+        for row in entries:
+            entry = {c: _clean(row.get(c)) for c in GLOSSARY_COLUMNS}
+            if any(entry.values()):
+                self.entries.append(entry)
+        self.version = hashlib.sha256(
+            json.dumps([_MATCHING, self.entries], ensure_ascii=False, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+
+        self._vocabulary: Dict[str, int] = {}
+        self._goto: Dict[int, int] = {}
+        children: List[List[tuple]] = [[]]
+        outputs: List[List[int]] = [[]]
+        depth = array("i", [0])
+        for entry_id, entry in enumerate(self.entries):
+            for column, form in enumerate(entry[c] for c in GLOSSARY_COLUMNS):
+                for variant in _variants(form):
+                    tokens = glossary_tokens(variant)
+                    if not tokens or len(tokens) > MAX_PATTERN_TOKENS:
+                        continue
+                    state = 0
+                    for token in tokens:
+                        token_id = self._vocabulary.setdefault(token, len(self._vocabulary))
+                        key = state << _STATE_SHIFT | token_id
+                        next_state = self._goto.get(key)
+                        if next_state is None:
+                            next_state = self._goto[key] = len(outputs)
+                            children[state].append((token_id, next_state))
+                            children.append([])
+                            outputs.append([])
+                            depth.append(depth[state] + 1)
+                        state = next_state
+                    code = entry_id * len(GLOSSARY_COLUMNS) + column
+                    if code not in outputs[state]:
+                        outputs[state].append(code)
+
+        # Breadth-first: failure links of a state are set before those of its children
+        n_states = len(outputs)
+        self._fail = array("i", bytes(4 * n_states))
+        self._output_link = array("i", bytes(4 * n_states))
+        queue = deque(child for _, child in children[0])
+        while queue:
+            state = queue.popleft()
+            for token_id, child in children[state]:
+                fallback = self._fail[state]
+                while fallback and (fallback << _STATE_SHIFT | token_id) not in self._goto:
+                    fallback = self._fail[fallback]
+                target = self._goto.get(fallback << _STATE_SHIFT | token_id, 0)
+                self._fail[child] = target
+                self._output_link[child] = target if outputs[target] else self._output_link[target]
+                queue.append(child)
+
+        self._depth = depth
+        self._output_ptr = array("i", [0])
+        self._output_codes = array("i")
+        for codes in outputs:
+            self._output_codes.extend(codes)
+            self._output_ptr.append(len(self._output_codes))
+        # First state reporting matches when a state is reached (itself or its output link), 0 if none
+        self._emit = array("i", (
+            state if outputs[state] else self._output_link[state] for state in range(n_states)
+        ))
+        # Transitions from the root, by token id (most tokens are read from the root)
+        self._root = array("i", bytes(4 * len(self._vocabulary)))
+        for token_id, child in children[0]:
+            self._root[token_id] = child
+        logger.info(
+            f"Compiled glossary of {len(self.entries)} entries: {n_states} states, {len(self._vocabulary)} tokens"
+        )
+
+    @classmethod
+    def from_csv(cls, path: Path) -> "Glossary":
+        """
+        Load the CSV written by `ocr.extract_trilingual_ocr_training_data` (term, han, vi, fr).
+
+        Args:
+            path (Path): Path to the CSV file.
+
+        Returns:
+            Glossary: The compiled glossary.
+        """
+        with path.open("r", encoding="utf-8", newline="") as f:
+            return cls(csv.DictReader(f))
+
+    def __len__(self) -> int:
+        """Number of entries."""
+        return len(self.entries)
+
+    def _scan(self, text: str) -> List[Tuple[int, int, int]]:
+        """
+        Run the automaton over a text.
+
+        Args:
+            text (str): Text to scan.
+
+        Returns:
+            List[Tuple[int, int, int]]: (start token, end token, `entry id * 4 + column`)
+                of every pattern occurrence, in order of end position.
+        """
+        vocabulary, goto, root, fail = self._vocabulary, self._goto, self._root, self._fail
+        emit, output_ptr, output_codes, output_link = self._emit, self._output_ptr, self._output_codes, self._output_link
+        depth = self._depth
+        found: List[Tuple[int, int, int]] = []
+        state = 0
+        for end, token in enumerate(glossary_tokens(text), 1):
+            token_id = vocabulary.get(token)
+            if token_id is None:
+                state = 0
+                continue
+            if state:
+                while True:
+                    next_state = goto.get(state << _STATE_SHIFT | token_id)
+                    if next_state is not None:
+                        break
+                    state = fail[state]
+                    if not state:
+                        next_state = root[token_id]
+                        break
+                state = next_state
+            else:
+                state = root[token_id]
+            match = emit[state]
+            while match:
+                start = end - depth[match]
+                found.extend((start, end, code) for code in output_codes[output_ptr[match]:output_ptr[match + 1]])
+                match = output_link[match]
+        return found
+
+    def _longest_matches(self, text: str) -> List[int]:
+        """
+        Keep the leftmost-longest, non-overlapping pattern occurrences of a text.
+
+        Occurrences nested in or overlapping a longer one starting earlier (or
+        at the same token) are dropped; entries sharing the kept span are all kept.
+
+        Args:
+            text (str): Text to scan.
+
+        Returns:
+            List[int]: `entry id * 4 + column` of the kept occurrences, in text order.
+        """
+        codes: List[int] = []
+        span, covered = None, 0
+        for start, end, code in sorted(self._scan(text), key=lambda m: (m[0], -m[1])):
+            if (start, end) == span:
+                codes.append(code)
+            elif start >= covered:
+                span, covered = (start, end), end
+                codes.append(code)
+        return codes
+
+    def match_entries(self, text: str) -> List[int]:
+        """
+        Find the glossary entries occurring in a text.
+
+        Args:
+            text (str): Text to scan.
+
+        Returns:
+            List[int]: Ids of the matched entries, in order of first occurrence.
+        """
+        n_columns = len(GLOSSARY_COLUMNS)
+        return list(dict.fromkeys(code // n_columns for code in self._longest_matches(text)))
+
+    def tag(self, text: str) -> List[str]:
+        """
+        Glossary terms occurring in a text, in any of the three languages.
+
+        Args:
+            text (str): Text to scan (e.g. a chunk).
+
+        Returns:
+            List[str]: Headword (or Hán form if no headword) of each matched entry.
+        """
+        return list(dict.fromkeys(
+            self.entries[i]["term"] or self.entries[i]["han"] for i in self.match_entries(text)
+        ))
+
+    def expand(self, query: str, max_entries: int = 8) -> str:
+        """
+        Append the other-language forms of the glossary terms found in a query.
+
+        A query mentioning "văn minh" is extended with "文明", "Civilisation"
+        and the Vietnamese gloss, so that both dense and BM25 retrieval reach
+        chunks written in any of the three languages.
+
+        Args:
+            query (str): User query.
+            max_entries (int): Maximum number of matched entries expanded.
+
+        Returns:
+            str: The query followed by the added forms, or the query unchanged if no term matched.
+        """
+        n_columns = len(GLOSSARY_COLUMNS)
+        matched: Dict[int, set] = {}
+        for code in self._longest_matches(query):
+            entry_id, column = divmod(code, n_columns)
+            if entry_id in matched or len(matched) < max_entries:
+                matched.setdefault(entry_id, set()).add(column)
+        additions = [
+            self.entries[entry_id][name]
+            for entry_id, columns in matched.items()
+            for column, name in enumerate(GLOSSARY_COLUMNS)
+            if column not in columns and self.entries[entry_id][name]
+        ]
+        if not additions:
+            return query
+        return f"{query} ({'; '.join(dict.fromkeys(additions))})"
+
+
+def _clean(value: Optional[str]) -> str:
+    """Strip a glossary cell, mapping missing values (None, NaN) to ""."""
+    if not isinstance(value, str):
+        return ""
+    return " ".join(value.split()).strip(" .")
+
+
+def _variants(form: str) -> List[str]:
+    """Alternatives of a glossary cell, without parenthesized notes."""
+    return [v.strip() for v in _VARIANT_SEP_RE.split(_NOTE_RE.sub(" ", form)) if v.strip()]
+
+
+def load_glossary(path: Optional[Path]) -> Optional[Glossary]:
+    """
+    Load a glossary CSV if a path is given.
+
+    Args:
+        path (Optional[Path]): Path to the CSV file, or None.
+
+    Returns:
+        Optional[Glossary]: The compiled glossary, or None.
+    """
+    if path is None:
+        return None
+    if not path.exists():
+        raise FileNotFoundError(f"Glossary file not found: {path}")
+    return Glossary.from_csv(path)
@@ -0,0 +1,97 @@
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.documents import Document
+from pydantic import PrivateAttr
+from typing import Any, Dict, List, Optional
+
+from rag.vector_indexer import filtered_search
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense + sparse retriever merging FAISS and BM25 rankings with reciprocal rank fusion.
+
+    Each candidate scores `sum(1 / (rrf_k + rank))` over the rankings it
+    appears in, which favours documents found by both retrievers without
+    having to calibrate their scores against each other.
+
+    Attributes:
+        vectorstore (FAISS): Dense vector store (also provides the documents).
+        sparse_index (BM25Index): Sparse index over the same docstore ids.
+        k (int): Number of documents returned.
+        fetch_k (int): Number of candidates taken from each retriever.
+        rrf_k (int): Reciprocal rank fusion smoothing constant.
+    """
+    vectorstore: Any
+    sparse_index: Any
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+    search_kwargs: Dict[str, Any] = {}
+    _sparse_rows: Optional[np.ndarray] = PrivateAttr(default=None)
+
+    def _sparse_mask(self, row_mask: np.ndarray) -> np.ndarray:
+        """
+        Map a mask over FAISS rows to a mask over the BM25 documents.
+
+        Args:
+            row_mask (np.ndarray): Boolean mask over FAISS row ids.
+
+        Returns:
+            np.ndarray: Boolean mask in BM25 `doc_ids` order.
+        """
+        if self._sparse_rows is None:
+            row_of = {doc_id: row for row, doc_id in self.vectorstore.index_to_docstore_id.items()}
+            # Documents missing from FAISS map to -1, i.e. the appended False below
+            self._sparse_rows = np.array([row_of.get(i, -1) for i in self.sparse_index.doc_ids], dtype=np.int64)
+        return np.append(row_mask, False)[self._sparse_rows]
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+        row_mask: Optional[np.ndarray] = None,
+        k: Optional[int] = None
+    ) -> List[Document]:
+        """
+        Retrieve the top-k documents by reciprocal rank fusion.
+
+        Args:
+            query (str): The user's question.
+            run_manager (CallbackManagerForRetrieverRun): LangChain callback manager.
+            row_mask (Optional[np.ndarray]): Boolean mask over FAISS row ids restricting
+                both retrievers (e.g. from a metadata filter).
+            k (Optional[int]): Number of documents (default: `self.k`).
+
+        Returns:
+            List[Document]: Fused top-k documents.
+        """
+        k = k or self.k
+        fetch_k = max(self.fetch_k, k)
+        if row_mask is None:
+            dense = self.vectorstore.similarity_search_with_score(query, k=fetch_k, **self.search_kwargs)
+            sparse = self.sparse_index.search(query, k=fetch_k)
+        else:
+            vector = np.asarray([self.vectorstore.embeddings.embed_query(query)], dtype=np.float32)
+            dense = filtered_search(self.vectorstore, vector, fetch_k, row_mask)[0]
+            sparse = self.sparse_index.search(query, k=fetch_k, mask=self._sparse_mask(row_mask))
+        dense_ids = [doc.id for doc, _ in dense]
+        sparse_ids = [doc_id for doc_id, _ in sparse]
+
+        fused: Dict[str, float] = {}
+        for ranking in (dense_ids, sparse_ids):
+            for rank, doc_id in enumerate(ranking):
+                fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+
+        docs_by_id = {doc.id: doc for doc, _ in dense}
+        docs = []
+        for doc_id in sorted(fused, key=fused.get, reverse=True):
+            doc = docs_by_id.get(doc_id) or self.vectorstore.docstore.search(doc_id)
+            # The docstore returns an error string for ids it no longer holds (e.g. a stale BM25 index)
+            if isinstance(doc, Document):
+                docs.append(doc)
+                if len(docs) == k:
+                    break
+        return docs
@@ -0,0 +1,325 @@
+import hashlib
+import json
+from langchain_core.embeddings import Embeddings
+from langchain_community.vectorstores import FAISS
+from loguru import logger
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from langchain_core.documents import Document
+from rag.chunker import TokenChunker
+from rag.document_builder import build_header, create_documents
+from rag.faiss_index import read_docstore, read_index, supports_removal
+from rag.glossary import GLOSSARY_METADATA_KEY, Glossary
+from rag.loader import iter_json_files
+from rag.packed_corpus import is_packed_corpus, iter_packed_corpus, scan_packed_sources
+from rag.sparse_index import SPARSE_INDEX_FILENAME, BM25Index
+from rag.vector_indexer import (
+    DEFAULT_BATCH_SIZE,
+    EMBEDDING_MODEL_NAME,
+    IndexConfig,
+    add_documents_in_batches,
+    configure_search,
+)
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+def file_sha256(filepath: Path) -> str:
+    """
+    Compute the SHA-256 digest of a file's content.
+
+    Args:
+        filepath (Path): Path to the file.
+
+    Returns:
+        str: Hexadecimal SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    with filepath.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(index_dir: Path) -> dict:
+    """
+    Load the manifest describing which source files are in the persisted index.
+
+    Args:
+        index_dir (Path): Path to the index directory.
+
+    Returns:
+        dict: Manifest with the embedding model name, the index build
+            parameters, the chunking parameters, the glossary version and, per
+            source file (relative path), its content hash and docstore ids.
+    """
+    manifest_path = index_dir / MANIFEST_FILENAME
+    if not manifest_path.exists():
+        return {"embedding_model": None, "index_config": None, "chunking": None, "glossary": None, "files": {}}
+    with manifest_path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(index_dir: Path, manifest: dict) -> None:
+    """
+    Write the manifest next to the persisted FAISS index.
+
+    Args:
+        index_dir (Path): Path to the index directory.
+        manifest (dict): Manifest to save.
+    """
+    manifest_path = index_dir / MANIFEST_FILENAME
+    tmp_path = manifest_path.with_suffix(".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    tmp_path.replace(manifest_path)
+
+
+def scan_sources(data_dir: Path) -> Dict[str, str]:
+    """
+    Hash every JSON source file under a data directory.
+
+    For a packed corpus, the document ids and hashes stored in the shards
+    are read instead (without loading the texts).
+
+    Args:
+        data_dir (Path): Root folder containing JSON files, or a packed corpus.
+
+    Returns:
+        Dict[str, str]: Mapping of relative POSIX path (document id for a
+            packed corpus) to SHA-256 digest.
+    """
+    if is_packed_corpus(data_dir):
+        return scan_packed_sources(data_dir)
+    return {
+        file.relative_to(data_dir).as_posix(): file_sha256(file)
+        for file in sorted(data_dir.rglob("*.json"))
+    }
+
+
+def corpus_version(data_dir: Path, index_dir: Optional[Path] = None) -> str:
+    """
+    Identify the indexed corpus, e.g. to invalidate caches when it changes.
+
+    Args:
+        data_dir (Path): Root folder containing JSON files.
+        index_dir (Optional[Path]): Persisted index folder; its manifest is used when present.
+
+    Returns:
+        str: SHA-256 of the manifest, or of the source file hashes if there is no manifest.
+    """
+    if index_dir is not None and (index_dir / MANIFEST_FILENAME).exists():
+        return file_sha256(index_dir / MANIFEST_FILENAME)
+    sources = json.dumps(scan_sources(data_dir), sort_keys=True)
+    return hashlib.sha256(sources.encode("utf-8")).hexdigest()
+
+
+def load_persisted_vectorstore(
+    index_dir: Path,
+    embedding_model: Embeddings,
+    index_config: Optional[IndexConfig] = None,
+    mmap: bool = False
+) -> FAISS:
+    """
+    Load a persisted FAISS index read-only, without syncing it with the data directory.
+
+    With `mmap`, the index file is memory-mapped instead of read into memory,
+    so several server processes loading the same index share its pages
+    through the OS page cache.
+
+    Args:
+        index_dir (Path): Folder holding the FAISS index and docstore.
+        embedding_model (Embeddings): Embedding model used for queries.
+        index_config (Optional[IndexConfig]): Query-time parameters (nprobe, efSearch).
+        mmap (bool): Memory-map the index file.
+
+    Returns:
+        FAISS: LangChain-compatible FAISS index (must not be modified when memory-mapped).
+    """
+    logger.info(f"Loading persisted vector store from: {index_dir}" + (" (memory-mapped)" if mmap else ""))
+    index = read_index(index_dir, mmap)
+    docstore, index_to_docstore_id = read_docstore(index_dir)
+    vectorstore = FAISS(embedding_model, index, docstore, index_to_docstore_id)
+    configure_search(vectorstore, index_config or IndexConfig())
+    return vectorstore
+
+
+def _iter_file_documents(
+    data_dir: Path,
+    paths: List[str],
+    hashes: Dict[str, str],
+    indexed: Dict[str, dict],
+    read_workers: int,
+    chunker: Optional[TokenChunker] = None,
+    glossary: Optional[Glossary] = None
+) -> Iterator[Document]:
+    """
+    Lazily load source files and yield their documents with stable ids,
+    recording each file's docstore ids in the manifest as it goes. Files
+    that fail to load are left out of the manifest, so they are retried.
+
+    Args:
+        data_dir (Path): Root folder containing JSON files, or a packed corpus.
+        paths (List[str]): Relative paths of the files (document ids of a packed corpus) to load.
+        hashes (Dict[str, str]): Current content hash of each file.
+        indexed (Dict[str, dict]): Manifest entries, updated in place.
+        read_workers (int): Number of reader threads.
+        chunker (Optional[TokenChunker]): Token-aware chunker (one chunk per paragraph if omitted).
+        glossary (Optional[Glossary]): Glossary whose terms are tagged on each chunk.
+
+    Yields:
+        Document: Documents with `id` set to "<hash of path and content>-<chunk number>".
+    """
+    if is_packed_corpus(data_dir):
+        entries = iter_packed_corpus(data_dir, ids=set(paths))
+    else:
+        files = [data_dir / path for path in paths]
+        entries = ((path, entry) for path, (_, entry) in zip(paths, iter_json_files(files, max_workers=read_workers)))
+    for path, entry in entries:
+        if entry is None:
+            # Left out of the manifest, so the file is retried on the next sync
+            indexed.pop(path, None)
+            continue
+        # Files with identical content (e.g. duplicated OCR pages) must not share ids
+        prefix = hashlib.sha256(f"{path}\0{hashes[path]}".encode("utf-8")).hexdigest()[:16]
+        doc_ids: List[str] = []
+        for i, doc in enumerate(create_documents(*entry, chunker=chunker, glossary=glossary)):
+            doc.id = f"{prefix}-{i}"
+            doc_ids.append(doc.id)
+            yield doc
+        indexed[path] = {"sha256": hashes[path], "doc_ids": doc_ids}
+
+
+def retag_documents(vectorstore: FAISS, glossary: Optional[Glossary]) -> None:
+    """
+    Replace the glossary tags of every indexed chunk (or remove them), keeping its vector.
+
+    Args:
+        vectorstore (FAISS): Vector store whose docstore is updated in place.
+        glossary (Optional[Glossary]): New glossary, or None to drop the tags.
+    """
+    logger.info(f"Re-tagging {len(vectorstore.index_to_docstore_id)} chunks with the glossary")
+    docstore = vectorstore.docstore
+    doc_ids = list(vectorstore.index_to_docstore_id.values())
+    documents = {}
+    for doc_id in doc_ids:
+        doc = docstore.search(doc_id)
+        metadata = {k: v for k, v in doc.metadata.items() if k != GLOSSARY_METADATA_KEY}
+        if glossary is not None:
+            # Tag the chunk body, as `create_documents` does
+            header = build_header(metadata) if "title_main" in metadata else ""
+            body = doc.page_content[len(header):] if header and doc.page_content.startswith(header) else doc.page_content
+            metadata[GLOSSARY_METADATA_KEY] = glossary.tag(body)
+        documents[doc_id] = Document(id=doc_id, page_content=doc.page_content, metadata=metadata)
+    if doc_ids:
+        docstore.delete(doc_ids)
+        docstore.add(documents)
+
+
+def load_or_build_vectorstore(
+    data_dir: Path,
+    index_dir: Path,
+    embedding_model: Embeddings,
+    model_name: str = EMBEDDING_MODEL_NAME,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    read_workers: int = 1,
+    index_config: Optional[IndexConfig] = None,
+    chunker: Optional[TokenChunker] = None,
+    glossary: Optional[Glossary] = None
+) -> FAISS:
+    """
+    Load the persisted FAISS index and bring it in sync with the data directory.
+
+    Only new or changed JSON files are embedded; vectors belonging to changed
+    or removed files are deleted. The whole index is rebuilt if it is missing,
+    was built with a different embedding model, index configuration or
+    chunking, or if vectors must be removed from an index that is not flat
+    (IVF, HNSW, see `supports_removal`). If only the glossary changed, the
+    chunks are re-tagged without re-embedding.
+
+    Args:
+        data_dir (Path): Root folder containing JSON files.
+        index_dir (Path): Folder holding the FAISS index, docstore, BM25 index and manifest.
+        embedding_model (Embeddings): Embedding model used for new or changed files.
+        model_name (str): Hugging Face identifier of the embedding model.
+        batch_size (int): Number of documents embedded and added per batch.
+        read_workers (int): Number of threads reading JSON files ahead of the indexer.
+        index_config (Optional[IndexConfig]): FAISS index type and parameters (default: flat).
+        chunker (Optional[TokenChunker]): Token-aware chunker (one chunk per paragraph if omitted).
+        glossary (Optional[Glossary]): Glossary whose terms are tagged on each chunk.
+
+    Returns:
+        FAISS: LangChain-compatible FAISS index, saved back to `index_dir`.
+    """
+    index_config = index_config or IndexConfig()
+    manifest = load_manifest(index_dir)
+    vectorstore: Optional[FAISS] = None
+    chunking = chunker.config.model_dump() if chunker is not None else None
+    glossary_version = glossary.version if glossary is not None else None
+    retagged = False
+
+    index_exists = (index_dir / "index.faiss").exists()
+    if (index_exists
+            and manifest.get("embedding_model") == model_name
+            and manifest.get("index_config") == index_config.build_params()
+            and manifest.get("chunking") == chunking):
+        logger.info(f"Loading persisted vector store from: {index_dir}")
+        vectorstore = FAISS.load_local(
+            str(index_dir), embedding_model, allow_dangerous_deserialization=True
+        )
+        configure_search(vectorstore, index_config)
+        if manifest.get("glossary") != glossary_version:
+            retag_documents(vectorstore, glossary)
+            retagged = True
+    elif manifest["files"]:
+        logger.warning(f"Index in {index_dir} is missing or stale, rebuilding from scratch")
+        manifest["files"] = {}
+
+    current = scan_sources(data_dir)
+    indexed: Dict[str, dict] = manifest["files"]
+    removed = [path for path in indexed if path not in current]
+    changed = [path for path in current if path in indexed and indexed[path]["sha256"] != current[path]]
+    added = [path for path in current if path not in indexed]
+    logger.info(f"Index sync: {len(added)} new, {len(changed)} changed, {len(removed)} removed file(s)")
+
+    # Drop vectors of files that disappeared or must be re-embedded
+    stale_ids = [doc_id for path in removed + changed for doc_id in indexed[path]["doc_ids"]]
+    to_embed = changed + added
+    if vectorstore is not None and stale_ids:
+        if supports_removal(vectorstore.index):
+            vectorstore.delete(stale_ids)
+        else:
+            # IVF removals leave gaps in the row ids, which LangChain's FAISS wrapper maps contiguously
+            logger.warning(f"{index_config.index_type} index cannot remove vectors in place, rebuilding")
+            vectorstore = None
+            indexed.clear()
+            to_embed = list(current)
+    for path in removed:
+        indexed.pop(path, None)
+
+    # Embed only new or changed files, streaming them through the indexer
+    logger.info(f"Embedding {len(to_embed)} file(s) into the vector store")
+    vectorstore = add_documents_in_batches(
+        vectorstore,
+        _iter_file_documents(data_dir, to_embed, current, indexed, read_workers, chunker, glossary),
+        embedding_model,
+        batch_size=batch_size,
+        index_config=index_config
+    )
+
+    if vectorstore is None:
+        raise ValueError(f"No documents could be indexed from: {data_dir}")
+
+    index_dir.mkdir(parents=True, exist_ok=True)
+    if to_embed or stale_ids or retagged or not index_exists:
+        vectorstore.save_local(str(index_dir))
+    if to_embed or stale_ids or not (index_dir / SPARSE_INDEX_FILENAME).exists():
+        # Keep the BM25 index for hybrid search in sync with the docstore
+        BM25Index.from_vectorstore(vectorstore).save(index_dir)
+    manifest["embedding_model"] = model_name
+    manifest["index_config"] = index_config.build_params()
+    manifest["chunking"] = chunking
+    manifest["glossary"] = glossary_version
+    save_manifest(index_dir, manifest)
+    return vectorstore
@@ -1,8 +1,19 @@
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Tuple
+from typing import Iterable, Iterator, List, Optional, Tuple
 from loguru import logger
 
+from rag.packed_corpus import is_packed_corpus, iter_packed_corpus
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional, fall back to the standard library
+    _json_loads = json.loads
+
+
 def load_json_file(filepath: Path) -> Tuple[List[str], dict]:
     """
     Load a single JSON file containing Vietnamese/French mixed text and metadata.
@@ -14,14 +25,99 @@ def load_json_file(filepath: Path) -> Tuple[List[str], dict]:
         Tuple[List[str], dict]: List of cleaned text chunks and metadata.
     """
     logger.info(f"Loading JSON file: {filepath}")
-    with filepath.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = _json_loads(filepath.read_bytes())
 
     metadata = data["metadata"]
     chunks = [para.strip() for para in data["text_body"] if para.strip()]
     return chunks, metadata
 
 
+def _try_load_json_file(filepath: Path) -> Optional[Tuple[List[str], dict]]:
+    """
+    Load a JSON file, logging a warning instead of raising on failure.
+
+    Args:
+        filepath (Path): Path to the JSON file.
+
+    Returns:
+        Optional[Tuple[List[str], dict]]: Chunks and metadata, or None if loading failed.
+    """
+    try:
+        return load_json_file(filepath)
+    except Exception as e:
+        logger.warning(f"Failed to load {filepath.name}: {e}")
+        return None
+
+
+def iter_json_files(
+    files: Iterable[Path],
+    max_workers: int = 1
+) -> Iterator[Tuple[Path, Optional[Tuple[List[str], dict]]]]:
+    """
+    Lazily load JSON files in order, optionally reading ahead with a thread pool.
+
+    At most `2 * max_workers` files are held in memory ahead of the consumer.
+
+    Args:
+        files (Iterable[Path]): Paths of the JSON files to load.
+        max_workers (int): Number of reader threads (1 reads sequentially).
+
+    Yields:
+        Tuple[Path, Optional[Tuple[List[str], dict]]]: Each path with its
+            (chunks, metadata) pair, or None if the file could not be loaded.
+    """
+    if max_workers <= 1:
+        for file in files:
+            yield file, _try_load_json_file(file)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for file in files:
+            pending.append((file, executor.submit(_try_load_json_file, file)))
+            if len(pending) >= 2 * max_workers:
+                path, future = pending.popleft()
+                yield path, future.result()
+        while pending:
+            path, future = pending.popleft()
+            yield path, future.result()
+
+
+def iter_json_directory(directory: Path, max_workers: int = 1) -> Iterator[Tuple[List[str], dict]]:
+    """
+    Lazily load and parse all JSON files in a given directory.
+
+    Args:
+        directory (Path): Path to the folder containing JSON files.
+        max_workers (int): Number of reader threads (1 reads sequentially).
+
+    Yields:
+        Tuple[List[str], dict]: (chunks, metadata) pair for each loadable file.
+    """
+    logger.info(f"Scanning directory for JSON files: {directory}")
+    for _, entry in iter_json_files(directory.rglob("*.json"), max_workers=max_workers):
+        if entry is not None:
+            yield entry
+
+
+def iter_corpus(directory: Path, max_workers: int = 1) -> Iterator[Tuple[List[str], dict]]:
+    """
+    Lazily load a corpus, either packed (see `rag.packed_corpus`) or one JSON file per document.
+
+    Args:
+        directory (Path): Folder of the packed corpus or of the JSON files.
+        max_workers (int): Number of reader threads for JSON files.
+
+    Yields:
+        Tuple[List[str], dict]: (chunks, metadata) pair for each document.
+    """
+    if is_packed_corpus(directory):
+        for _, entry in iter_packed_corpus(directory):
+            yield entry
+    else:
+        yield from iter_json_directory(directory, max_workers=max_workers)
+
+
 def load_all_json_files(directory: Path) -> List[Tuple[List[str], dict]]:
     """
     Load and parse all JSON files in a given directory.
@@ -32,12 +128,4 @@ def load_all_json_files(directory: Path) -> List[Tuple[List[str], dict]]:
     Returns:
         List[Tuple[List[str], dict]]: List of (chunks, metadata) pairs for each file.
     """
-    logger.info(f"Scanning directory for JSON files: {directory}")
-    all_data = []
-    for file in directory.rglob("*.json"):
-        try:
-            chunks, metadata = load_json_file(file)
-            all_data.append((chunks, metadata))
-        except Exception as e:
-            logger.warning(f"Failed to load {file.name}: {e}")
-    return all_data
+    return list(iter_json_directory(directory))
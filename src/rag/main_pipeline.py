@@ -1,34 +1,59 @@
 import argparse
+import hashlib
+import json
+from loguru import logger
 from pathlib import Path
-from rag.document_builder import create_documents
-from rag.loader import load_all_json_files
-from rag.vector_indexer import build_vectorstore
+from typing import Optional
+from rag.chunker import ChunkConfig, TokenChunker
+from rag.context_builder import ContextConfig
+from rag.document_builder import iter_documents
+from rag.glossary import load_glossary
+from rag.index_store import corpus_version, load_or_build_vectorstore
+from rag.loader import iter_corpus
+from rag.metadata_filter import MetadataFilter
+from rag.query_cache import QueryCache
+from rag.query_encoder import OnnxQueryEncoder
+from rag.sparse_index import SPARSE_INDEX_FILENAME, BM25Index
+from rag.stub_llm import StubLLM
+from rag.vector_indexer import (
+    DEFAULT_BATCH_SIZE,
+    EncoderEmbeddings,
+    IndexConfig,
+    build_vectorstore,
+    close_embedding_workers,
+    load_embedding_model,
+)
 from rag.wrapper import SimpleRAG
 
 
-def run_test_queries(rag: SimpleRAG):
+def run_test_queries(rag: SimpleRAG, metadata_filter: Optional[MetadataFilter] = None):
     """
     Run predefined test queries against the RAG system.
 
     Args:
         rag (SimpleRAG): The RAG system instance.
+        metadata_filter (Optional[MetadataFilter]): Restrict retrieval to matching documents.
     """
     queries = [
         "Văn minh học thuật của nước Pháp được miêu tả như thế nào trong Nam Phong tạp chí?",
         "Quel est le rôle de l'Académie française selon les articles de la revue Nam Phong ?",
         "How does Nam Phong magazine discuss the conflict between material and spiritual progress in modern civilization?"
     ]
-    for q in queries:
+    # Batched: one embedding pass for retrieval, concurrent LLM calls
+    for q, response in zip(queries, rag.ask_batch(queries, metadata_filter=metadata_filter)):
         print(f"\nQuery: {q}")
-        print("Answer:", rag.ask(q))
+        print("Answer:", response["result"])
 
 
-def interactive_loop(rag: SimpleRAG):
+def interactive_loop(rag: SimpleRAG, metadata_filter: Optional[MetadataFilter] = None):
     """
     Interactive command-line interface for querying the RAG system.
+    Sources are printed as soon as they are retrieved, then the answer
+    is printed token by token as it is generated.
 
     Args:
         rag (SimpleRAG): The RAG system instance.
+        metadata_filter (Optional[MetadataFilter]): Restrict retrieval to matching documents.
     """
     print("Enter your query (type 'q' or 'exit' to leave):")
     while True:
@@ -37,10 +62,18 @@ def interactive_loop(rag: SimpleRAG):
             break
         if not query:
             continue
-        print("Answer:")
-        # print(f"{rag.ask(query)}\n")
-        print(f"{rag.ask(query)["result"]}\n")
-
+        for event in rag.ask_stream(query, metadata_filter):
+            if event["type"] == "sources":
+                print(event["content"].lstrip("\n"))
+                print("\nAnswer:")
+            elif event["type"] == "token":
+                print(event["content"], end="", flush=True)
+            else:
+                timings = event["timings"]
+                print(
+                    f"\n\n(retrieval {timings['retrieval_s']:.2f}s, first token "
+                    f"{timings['first_token_s']:.2f}s, generation {timings['generation_s']:.2f}s)\n"
+                )
 
 
 if __name__ == "__main__":
@@ -50,13 +83,180 @@ if __name__ == "__main__":
     parser.add_argument(
         "--data-dir", "-d",
         default="data/Nam-Phong/",
-        help="Path to the root folder containing JSON files (default: %(default)s)"
+        help="Path to the root folder containing JSON files, or a packed corpus (default: %(default)s)"
     )
     parser.add_argument(
         "--test", "-t",
         action="store_true",
         help="Run predefined test queries instead of interactive mode."
     )
+    parser.add_argument(
+        "--index-dir", "-i",
+        default=None,
+        help="Folder of the persisted FAISS index; only new or changed files are re-embedded "
+             "(default: rebuild the index in memory on every start)"
+    )
+    parser.add_argument(
+        "--embedding-cache",
+        default=None,
+        help="SQLite file caching chunk embeddings by (model, text hash) across rebuilds"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Number of documents embedded and added to the index per batch (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--embed-workers",
+        type=int,
+        default=1,
+        help="Number of embedding processes (default: %(default)s, embed in-process)"
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="Torch threads for in-process embedding, or per worker with --embed-workers"
+    )
+    parser.add_argument(
+        "--read-workers",
+        type=int,
+        default=1,
+        help="Number of threads reading JSON files ahead of the indexer (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--chunk-tokens",
+        type=int,
+        default=0,
+        help=f"Re-chunk paragraphs to this token window, header included (e.g. {ChunkConfig().max_tokens}, "
+             "the embedding model's); 0 keeps one chunk per paragraph (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--chunk-overlap",
+        type=int,
+        default=ChunkConfig().overlap_tokens,
+        help="Tokens shared by consecutive windows of a long paragraph (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--min-chunk-tokens",
+        type=int,
+        default=ChunkConfig().min_tokens,
+        help="Paragraphs shorter than this are merged with their neighbours (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--index-type",
+        choices=["flat", "hnsw", "ivf_flat", "ivf_pq"],
+        default="flat",
+        help="FAISS index type (default: %(default)s, exact search)"
+    )
+    parser.add_argument(
+        "--vector-dtype",
+        choices=["float32", "float16", "int8"],
+        default="float32",
+        help="Storage of the vectors in flat, HNSW and IVF-flat indexes (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--nlist",
+        type=int,
+        default=IndexConfig().nlist,
+        help="Number of IVF clusters for ivf_flat/ivf_pq (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--nprobe",
+        type=int,
+        default=IndexConfig().nprobe,
+        help="Number of IVF clusters visited per query (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--ef-search",
+        type=int,
+        default=IndexConfig().ef_search,
+        help="HNSW query-time search depth (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--onnx-encoder",
+        default=None,
+        help="Embed queries with this ONNX export of the embedding model (see `rag quantize`)"
+    )
+    parser.add_argument(
+        "--search-type",
+        choices=["similarity", "mmr", "hybrid"],
+        default="similarity",
+        help="Retrieval mode; 'hybrid' fuses dense and BM25 results (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--publication",
+        default=None,
+        help="Only retrieve from documents whose title contains this text (e.g. 'Nam Phong')"
+    )
+    parser.add_argument(
+        "--date-from",
+        default=None,
+        help="Only retrieve from documents published on or after this date (e.g. 1917)"
+    )
+    parser.add_argument(
+        "--date-to",
+        default=None,
+        help="Only retrieve from documents published on or before this date (e.g. 1920)"
+    )
+    parser.add_argument(
+        "--author",
+        action="append",
+        default=[],
+        help="Only retrieve from documents by this author (repeatable)"
+    )
+    parser.add_argument(
+        "--genre",
+        action="append",
+        default=[],
+        help="Only retrieve from documents of this genre (repeatable)"
+    )
+    parser.add_argument(
+        "--query-cache",
+        default=None,
+        help="SQLite file caching answers by exact and semantically similar queries"
+    )
+    parser.add_argument(
+        "--cache-threshold",
+        type=float,
+        default=0.95,
+        help="Minimum cosine similarity for a semantic cache hit (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=7 * 24 * 3600,
+        help="Lifetime of cached answers in seconds (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=4,
+        help="Maximum number of concurrent LLM calls for batched queries (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--context-tokens",
+        type=int,
+        default=ContextConfig().max_tokens,
+        help="Token budget of the retrieved context stuffed into the prompt, 0 for no limit (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=ContextConfig().dedup_threshold,
+        help="Similarity above which a retrieved chunk is dropped as a near-duplicate (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--glossary",
+        default=None,
+        help="Trilingual glossary CSV (term, han, vi, fr) tagging chunks and expanding queries across languages"
+    )
+    parser.add_argument(
+        "--stub-llm",
+        action="store_true",
+        help="Answer with a deterministic offline stub instead of Ollama (for testing)"
+    )
     args = parser.parse_args()
 
     # JSON root path, config via --data-dir
@@ -64,20 +264,96 @@ if __name__ == "__main__":
     if not folder_path.exists():
         raise FileNotFoundError(f"Data directory not found: {folder_path}")
 
-    # Load and prepare documents
-    all_entries = load_all_json_files(folder_path)
-    all_documents = []
-    for chunks, metadata in all_entries:
-        all_documents.extend(create_documents(chunks, metadata))
+    index_config = IndexConfig(
+        index_type=args.index_type, nlist=args.nlist, nprobe=args.nprobe, ef_search=args.ef_search,
+        vector_dtype=args.vector_dtype
+    )
+    chunker = None
+    if args.chunk_tokens:
+        chunker = TokenChunker(ChunkConfig(
+            max_tokens=args.chunk_tokens, overlap_tokens=args.chunk_overlap, min_tokens=args.min_chunk_tokens
+        ))
+    glossary = load_glossary(Path(args.glossary) if args.glossary else None)
+    embedding_model = load_embedding_model(
+        cache_path=Path(args.embedding_cache) if args.embedding_cache else None,
+        num_workers=args.embed_workers,
+        num_threads=args.threads
+    )
+    try:
+        if args.index_dir:
+            # Load the persisted index and sync it with the data directory
+            vectorstore = load_or_build_vectorstore(
+                folder_path, Path(args.index_dir), embedding_model,
+                batch_size=args.batch_size, read_workers=args.read_workers, index_config=index_config,
+                chunker=chunker, glossary=glossary
+            )
+        else:
+            # Stream files -> documents -> embedding batches, never holding the whole corpus
+            entries = iter_corpus(folder_path, max_workers=args.read_workers)
+            documents = iter_documents(entries, chunker, glossary)
 
-    # Build vector index
-    vectorstore = build_vectorstore(all_documents)
+            # Build vector index
+            vectorstore = build_vectorstore(
+                documents, embedding_model=embedding_model, batch_size=args.batch_size, index_config=index_config
+            )
+    finally:
+        # Queries are embedded in-process: the embedding workers are only needed for indexing
+        close_embedding_workers(embedding_model)
+
+    # Documents are embedded by the float32 model above, queries by the quantized export
+    if args.onnx_encoder:
+        embedding_model = EncoderEmbeddings(OnnxQueryEncoder(Path(args.onnx_encoder)))
+        vectorstore.embedding_function = embedding_model
+
+    # Load the persisted BM25 index for hybrid search (built in memory otherwise)
+    sparse_index = None
+    if args.search_type == "hybrid" and args.index_dir and (Path(args.index_dir) / SPARSE_INDEX_FILENAME).exists():
+        sparse_index = BM25Index.load(Path(args.index_dir))
+
+    context_config = ContextConfig(max_tokens=args.context_tokens, dedup_threshold=args.dedup_threshold)
+
+    # Answers are invalidated when the indexed corpus, the chunking, the glossary, the index,
+    # the retrieval mode or the context settings change
+    cache = None
+    if args.query_cache:
+        index_dir = Path(args.index_dir) if args.index_dir else None
+        # Without a persisted manifest, the corpus version only covers the source files
+        settings = json.dumps({
+            "chunking": chunker.config.model_dump() if chunker is not None else None,
+            "glossary": glossary.version if glossary is not None else None,
+            "index_config": index_config.model_dump(),
+        }, sort_keys=True)
+        cache = QueryCache(
+            Path(args.query_cache),
+            embedding_model,
+            index_version=(
+                f"{corpus_version(folder_path, index_dir)}:"
+                f"{hashlib.sha256(settings.encode('utf-8')).hexdigest()[:16]}:{args.search_type}:"
+                f"{context_config.max_tokens}:{context_config.dedup_threshold}"
+            ),
+            threshold=args.cache_threshold,
+            ttl=args.cache_ttl
+        )
 
     # Initialize RAG system
-    rag = SimpleRAG(vectorstore, model_name="mistral")
+    rag = SimpleRAG(
+        vectorstore, model_name="mistral", search_type=args.search_type,
+        sparse_index=sparse_index, cache=cache,
+        llm=StubLLM() if args.stub_llm else None, max_concurrency=args.max_concurrency,
+        context_config=context_config, glossary=glossary
+    )
+
+    metadata_filter = MetadataFilter(
+        publication=args.publication, date_from=args.date_from, date_to=args.date_to,
+        authors=args.author, genres=args.genre
+    )
 
     # Choose mode
     if args.test:
-        run_test_queries(rag)
+        run_test_queries(rag, metadata_filter)
     else:
-        interactive_loop(rag)
+        interactive_loop(rag, metadata_filter)
+
+    logger.info(f"Prompt tokens saved by context assembly: {rag.context_builder.tokens_saved}")
+    if cache is not None:
+        logger.info(f"Query cache stats: {cache.stats()}")
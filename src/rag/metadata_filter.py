@@ -0,0 +1,236 @@
+import json
+import re
+import unicodedata
+import numpy as np
+from loguru import logger
+from pydantic import BaseModel, ConfigDict
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from rag.compact_store import CompactDocstore
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+_DATE_RE = re.compile(r"(\d{4})(?:-(\d{1,2}))?(?:-(\d{1,2}))?")
+
+# Multi-valued and categorical metadata fields indexed as bitmaps
+BITMAP_FIELDS = ("authors", "genres", "publisher", "issn")
+
+
+def _normalize(value: str) -> str:
+    """NFC-normalize, lowercase and strip a metadata value for matching."""
+    return unicodedata.normalize("NFC", str(value)).lower().strip()
+
+
+def parse_date(value: Optional[str], end: bool = False) -> int:
+    """
+    Convert a (possibly partial) ISO date to a sortable YYYYMMDD integer.
+
+    Args:
+        value (Optional[str]): Date such as "1917", "1917-07" or "1917-07-01".
+        end (bool): Complete a partial date to the end of its period instead
+            of the start (for the upper bound of a range).
+
+    Returns:
+        int: YYYYMMDD, or 0 if the value has no year.
+    """
+    match = _DATE_RE.search(str(value)) if value else None
+    if match is None:
+        return 0
+    year, month, day = match.groups()
+    month = int(month) if month else (12 if end else 1)
+    day = int(day) if day else (31 if end else 1)
+    return int(year) * 10000 + month * 100 + day
+
+
+class MetadataFilter(BaseModel):
+    """
+    Restriction of retrieval to documents matching metadata conditions.
+
+    All given conditions must hold; list conditions match if any value matches.
+
+    Attributes:
+        publication: Case-insensitive substring of the main or alternative title
+            (e.g. "Nam Phong").
+        date_from: Earliest publication date, possibly partial (e.g. "1917").
+        date_to: Latest publication date, possibly partial (e.g. "1920").
+        authors: Accepted authors (e.g. ["Phạm Quỳnh"]).
+        genres: Accepted genres.
+        publisher: Accepted publisher.
+        issn: Accepted ISSN.
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    publication: Optional[str] = None
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    authors: List[str] = []
+    genres: List[str] = []
+    publisher: Optional[str] = None
+    issn: Optional[str] = None
+
+    def is_empty(self) -> bool:
+        """Whether the filter has no condition (matches every document)."""
+        return not any(self.model_dump().values())
+
+    def cache_key(self) -> str:
+        """Canonical JSON of the set conditions, identifying the filter e.g. in answer cache namespaces."""
+        conditions = {field: value for field, value in self.model_dump().items() if value}
+        return json.dumps(conditions, sort_keys=True, ensure_ascii=False)
+
+    def matches(self, metadata: dict) -> bool:
+        """
+        Check one document's metadata (for post-filtering, e.g. with MMR search).
+
+        Args:
+            metadata (dict): Document metadata.
+
+        Returns:
+            bool: True if every condition holds.
+        """
+        if self.publication:
+            titles = _normalize(f"{metadata.get('title_main', '')}\n{metadata.get('title_alt', '')}")
+            if _normalize(self.publication) not in titles:
+                return False
+        if self.date_from or self.date_to:
+            date = parse_date(metadata.get("publication_date"))
+            if not date or date < parse_date(self.date_from):
+                return False
+            if self.date_to and date > parse_date(self.date_to, end=True):
+                return False
+        for field, accepted in (("authors", self.authors), ("genres", self.genres)):
+            values = {_normalize(v) for v in metadata.get(field) or []}
+            if accepted and not values & {_normalize(v) for v in accepted}:
+                return False
+        for field, accepted in (("publisher", self.publisher), ("issn", self.issn)):
+            if accepted and _normalize(metadata.get(field) or "") != _normalize(accepted):
+                return False
+        return True
+
+
+class MetadataIndex:
+    """
+    Columnar metadata index of a FAISS vector store, for pre-filtered search.
+
+    Metadata is stored per source document: a YYYYMMDD date array, a title
+    list and, for each value of the categorical fields, a boolean bitmap
+    over sources. A filter is evaluated on sources, then mapped to FAISS
+    rows through `row_source`, giving the row mask used to build a FAISS
+    `IDSelector`. Rows are the ids in the store's `index_to_docstore_id`,
+    which need not be contiguous.
+
+    Attributes:
+        row_source (np.ndarray): Source id of each FAISS row, -1 for ids not in the store (int32).
+        dates (np.ndarray): Publication date of each source as YYYYMMDD, 0 if unknown (int32).
+        titles (List[str]): Normalized main and alternative titles of each source.
+        bitmaps (Dict[str, Dict[str, np.ndarray]]): Field -> normalized value -> source bitmap.
+    """
+    def __init__(self, sources: List[dict], row_source: np.ndarray):
+        """
+        Build the columns from the distinct metadata dicts.
+
+        Args:
+            sources (List[dict]): Metadata of each source, indexed by source id.
+            row_source (np.ndarray): Source id of each FAISS row, -1 for ids not in the store.
+
+        Returns:
+            None
+        """
+        n = len(sources)
+        self.row_source = row_source
+        self.dates = np.fromiter(
+            (parse_date(m.get("publication_date")) for m in sources), dtype=np.int32, count=n
+        )
+        self.titles = [_normalize(f"{m.get('title_main', '')}\n{m.get('title_alt', '')}") for m in sources]
+        self.bitmaps: Dict[str, Dict[str, np.ndarray]] = {field: {} for field in BITMAP_FIELDS}
+        for source_id, metadata in enumerate(sources):
+            for field in BITMAP_FIELDS:
+                values = metadata.get(field) or []
+                for value in values if isinstance(values, list) else [values]:
+                    bitmap = self.bitmaps[field].setdefault(_normalize(value), np.zeros(n, dtype=bool))
+                    bitmap[source_id] = True
+        logger.info(f"Built metadata index: {int((row_source >= 0).sum())} vectors, {n} sources")
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore: "FAISS") -> "MetadataIndex":
+        """
+        Index the metadata of every document of a FAISS vector store.
+
+        With a `CompactDocstore`, the interned sources are read directly;
+        other docstores are scanned document by document.
+
+        Args:
+            vectorstore (FAISS): Vector store to index.
+
+        Returns:
+            MetadataIndex: The built index.
+        """
+        id_map = vectorstore.index_to_docstore_id
+        rows = np.fromiter(id_map.keys(), dtype=np.int64, count=len(id_map))
+        doc_ids = list(id_map.values())
+        # Sized by the largest row id rather than the row count, in case the ids have gaps
+        row_source = np.full(int(rows.max()) + 1 if len(rows) else 0, -1, dtype=np.int32)
+        docstore = vectorstore.docstore
+        if isinstance(docstore, CompactDocstore):
+            row_source[rows] = docstore.source_ids(doc_ids)
+            return cls(docstore.sources, row_source)
+
+        sources: List[dict] = []
+        interned: Dict[str, int] = {}
+        for row, doc_id in zip(rows.tolist(), doc_ids):
+            metadata = docstore.search(doc_id).metadata
+            key = json.dumps(metadata, sort_keys=True, ensure_ascii=False, default=str)
+            row_source[row] = interned.setdefault(key, len(interned))
+            if row_source[row] == len(sources):
+                sources.append(metadata)
+        return cls(sources, row_source)
+
+    def _field_mask(self, field: str, accepted: List[str]) -> np.ndarray:
+        """Union of the source bitmaps of the accepted values of a field."""
+        mask = np.zeros(len(self.dates), dtype=bool)
+        for value in accepted:
+            bitmap = self.bitmaps[field].get(_normalize(value))
+            if bitmap is not None:
+                mask |= bitmap
+        return mask
+
+    def source_mask(self, metadata_filter: MetadataFilter) -> np.ndarray:
+        """
+        Evaluate a filter on the sources.
+
+        Args:
+            metadata_filter (MetadataFilter): Conditions to apply.
+
+        Returns:
+            np.ndarray: Boolean mask over source ids.
+        """
+        mask = np.ones(len(self.dates), dtype=bool)
+        if metadata_filter.publication:
+            needle = _normalize(metadata_filter.publication)
+            mask &= np.fromiter((needle in t for t in self.titles), dtype=bool, count=len(self.titles))
+        if metadata_filter.date_from or metadata_filter.date_to:
+            mask &= self.dates > 0
+            if metadata_filter.date_from:
+                mask &= self.dates >= parse_date(metadata_filter.date_from)
+            if metadata_filter.date_to:
+                mask &= self.dates <= parse_date(metadata_filter.date_to, end=True)
+        for field in BITMAP_FIELDS:
+            accepted = getattr(metadata_filter, field)
+            if accepted:
+                mask &= self._field_mask(field, accepted if isinstance(accepted, list) else [accepted])
+        return mask
+
+    def row_mask(self, metadata_filter: MetadataFilter) -> np.ndarray:
+        """
+        Evaluate a filter on the FAISS rows.
+
+        Args:
+            metadata_filter (MetadataFilter): Conditions to apply.
+
+        Returns:
+            np.ndarray: Boolean mask over FAISS row ids.
+        """
+        # Ids not in the store (-1) pick the appended False
+        mask = np.append(self.source_mask(metadata_filter), False)[self.row_source]
+        logger.debug(f"Metadata filter keeps {int(mask.sum())}/{len(mask)} vectors")
+        return mask
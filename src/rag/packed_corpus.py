@@ -0,0 +1,278 @@
+import gzip
+import hashlib
+import json
+from loguru import logger
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+except ImportError:  # orjson is optional, fall back to the standard library
+    _json_loads = json.loads
+
+    def _json_dumps(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+CORPUS_MANIFEST = "corpus.json"
+FORMATS = ("parquet", "jsonl.gz")
+DOCUMENT_COLUMNS = ("id", "sha256", "metadata_id", "text_body")
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def default_format() -> str:
+    """Parquet when pyarrow is installed, gzip-compressed JSON Lines otherwise."""
+    return "parquet" if _has_pyarrow() else "jsonl.gz"
+
+
+def is_packed_corpus(directory: Path) -> bool:
+    """Whether a folder holds a packed corpus (rather than one JSON file per document)."""
+    return (directory / CORPUS_MANIFEST).exists()
+
+
+def document_sha256(text_body: Sequence[str], metadata: dict) -> str:
+    """Content hash of a document, used for incremental indexing."""
+    payload = json.dumps({"metadata": metadata, "text_body": list(text_body)}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _write_rows(path: Path, rows: Dict[str, list], fmt: str) -> None:
+    """Write a table given as columns, atomically."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.table(rows), tmp_path, compression="zstd")
+    else:
+        names = list(rows)
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            for values in zip(*rows.values()):
+                f.write(_json_dumps(dict(zip(names, values))))
+                f.write("\n")
+    tmp_path.replace(path)
+
+
+def _read_rows(path: Path, fmt: str, columns: Optional[Sequence[str]] = None) -> Iterator[dict]:
+    """
+    Stream the rows of a table, reading only the requested columns.
+
+    With Parquet, unrequested columns are never decoded; with JSON Lines
+    they are parsed and dropped.
+    """
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path, memory_map=True)
+        for batch in parquet_file.iter_batches(columns=list(columns) if columns else None):
+            yield from batch.to_pylist()
+        return
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            row = _json_loads(line)
+            yield {c: row[c] for c in columns} if columns else row
+
+
+class PackedCorpusWriter:
+    """
+    Write documents to a sharded corpus with a separate metadata table.
+
+    Documents are buffered and written in shards of `shard_size` rows
+    (`documents-00000.parquet`, ...). Metadata dicts, shared by every
+    article of an issue, are interned in `metadata.<ext>` and referenced by
+    `metadata_id`. `corpus.json` lists the shards and is written last, so a
+    partially written corpus is never picked up by the loader.
+
+    Attributes:
+        output_dir (Path): Folder of the corpus.
+        fmt (str): "parquet" or "jsonl.gz".
+        shard_size (int): Documents per shard.
+    """
+    def __init__(self, output_dir: Path, fmt: Optional[str] = None, shard_size: int = 5000):
+        """
+        Initialize the writer.
+
+        Args:
+            output_dir (Path): Folder of the corpus (created if needed).
+            fmt (Optional[str]): "parquet" or "jsonl.gz" (see `default_format`).
+            shard_size (int): Documents per shard.
+
+        Returns:
+            None
+        """
+        self.output_dir = output_dir
+        self.fmt = fmt or default_format()
+        if self.fmt not in FORMATS:
+            raise ValueError(f"Unknown corpus format: {self.fmt} (expected one of {FORMATS})")
+        if self.fmt == "parquet" and not _has_pyarrow():
+            raise ImportError("pyarrow is required for the parquet corpus format")
+        self.shard_size = shard_size
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._metadata_ids: Dict[str, int] = {}
+        self._metadata: List[str] = []
+        self._buffer: Dict[str, list] = {column: [] for column in DOCUMENT_COLUMNS}
+        self._shards: List[str] = []
+        self._documents = 0
+        self._ids: Set[str] = set()
+
+    def add(self, doc_id: str, text_body: Sequence[str], metadata: dict) -> None:
+        """
+        Add one document.
+
+        Args:
+            doc_id (str): Unique document id (e.g. the relative path of the source page).
+            text_body (Sequence[str]): Paragraphs of the document.
+            metadata (dict): JSON-serializable metadata.
+
+        Raises:
+            ValueError: If a document with the same id was already added.
+        """
+        # Ids key the incremental index sync: a duplicate would silently shadow another document
+        if doc_id in self._ids:
+            raise ValueError(f"Duplicate document id in packed corpus: {doc_id}")
+        self._ids.add(doc_id)
+        key = json.dumps(metadata, sort_keys=True, ensure_ascii=False)
+        metadata_id = self._metadata_ids.setdefault(key, len(self._metadata_ids))
+        if metadata_id == len(self._metadata):
+            self._metadata.append(json.dumps(metadata, ensure_ascii=False))
+        self._buffer["id"].append(doc_id)
+        self._buffer["sha256"].append(document_sha256(text_body, metadata))
+        self._buffer["metadata_id"].append(metadata_id)
+        self._buffer["text_body"].append(list(text_body))
+        self._documents += 1
+        if len(self._buffer["id"]) >= self.shard_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Write the buffered documents as a new shard."""
+        if not self._buffer["id"]:
+            return
+        name = f"documents-{len(self._shards):05d}.{self.fmt}"
+        _write_rows(self.output_dir / name, self._buffer, self.fmt)
+        self._shards.append(name)
+        self._buffer = {column: [] for column in DOCUMENT_COLUMNS}
+
+    def close(self) -> None:
+        """Write the last shard, the metadata table and the corpus manifest."""
+        self._flush()
+        metadata_name = f"metadata.{self.fmt}"
+        _write_rows(
+            self.output_dir / metadata_name,
+            {"metadata_id": list(range(len(self._metadata))), "metadata": self._metadata},
+            self.fmt
+        )
+        manifest = {
+            "format": self.fmt,
+            "documents": self._documents,
+            "shards": self._shards,
+            "metadata": metadata_name,
+        }
+        manifest_path = self.output_dir / CORPUS_MANIFEST
+        tmp_path = manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        tmp_path.replace(manifest_path)
+        logger.success(
+            f"Packed {self._documents} documents into {len(self._shards)} {self.fmt} shard(s), "
+            f"{len(self._metadata)} metadata record(s): {self.output_dir}"
+        )
+
+    def __enter__(self) -> "PackedCorpusWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+
+
+def load_corpus_manifest(corpus_dir: Path) -> dict:
+    """Read the `corpus.json` of a packed corpus."""
+    return json.loads((corpus_dir / CORPUS_MANIFEST).read_text(encoding="utf-8"))
+
+
+def load_metadata_table(corpus_dir: Path) -> List[dict]:
+    """
+    Load the metadata table of a packed corpus.
+
+    Args:
+        corpus_dir (Path): Folder of the corpus.
+
+    Returns:
+        List[dict]: Metadata dicts indexed by `metadata_id`.
+    """
+    manifest = load_corpus_manifest(corpus_dir)
+    rows = sorted(_read_rows(corpus_dir / manifest["metadata"], manifest["format"]), key=lambda r: r["metadata_id"])
+    return [_json_loads(row["metadata"]) for row in rows]
+
+
+def scan_packed_sources(corpus_dir: Path) -> Dict[str, str]:
+    """
+    Read the id and content hash of every document, without loading the texts.
+
+    Args:
+        corpus_dir (Path): Folder of the corpus.
+
+    Returns:
+        Dict[str, str]: Mapping of document id to SHA-256 digest.
+    """
+    manifest = load_corpus_manifest(corpus_dir)
+    return {
+        row["id"]: row["sha256"]
+        for shard in manifest["shards"]
+        for row in _read_rows(corpus_dir / shard, manifest["format"], ("id", "sha256"))
+    }
+
+
+def iter_packed_corpus(corpus_dir: Path, ids: Optional[Set[str]] = None) -> Iterator[Tuple[str, Tuple[List[str], dict]]]:
+    """
+    Stream the documents of a packed corpus in the loader's (chunks, metadata) format.
+
+    Args:
+        corpus_dir (Path): Folder of the corpus.
+        ids (Optional[Set[str]]): Only yield these documents (all if omitted).
+
+    Yields:
+        Tuple[str, Tuple[List[str], dict]]: Document id with its cleaned
+            paragraphs and metadata.
+    """
+    manifest = load_corpus_manifest(corpus_dir)
+    metadata_table = load_metadata_table(corpus_dir)
+    logger.info(f"Reading packed corpus: {corpus_dir} ({manifest['documents']} documents)")
+    for shard in manifest["shards"]:
+        for row in _read_rows(corpus_dir / shard, manifest["format"], ("id", "metadata_id", "text_body")):
+            if ids is not None and row["id"] not in ids:
+                continue
+            chunks = [para.strip() for para in row["text_body"] if para.strip()]
+            yield row["id"], (chunks, metadata_table[row["metadata_id"]])
+
+
+def export_json(corpus_dir: Path, output_dir: Path) -> int:
+    """
+    Export a packed corpus back to one JSON file per document (`<id>.json`).
+
+    Args:
+        corpus_dir (Path): Folder of the corpus.
+        output_dir (Path): Folder of the JSON files.
+
+    Returns:
+        int: Number of exported documents.
+    """
+    manifest = load_corpus_manifest(corpus_dir)
+    metadata_table = load_metadata_table(corpus_dir)
+    count = 0
+    for shard in manifest["shards"]:
+        for row in _read_rows(corpus_dir / shard, manifest["format"], ("id", "metadata_id", "text_body")):
+            output_path = output_dir / f"{row['id']}.json"
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            document = {"metadata": metadata_table[row["metadata_id"]], "text_body": row["text_body"]}
+            output_path.write_text(json.dumps(document, ensure_ascii=False, indent=2), encoding="utf-8")
+            count += 1
+    logger.success(f"Exported {count} JSON files to: {output_dir}")
+    return count
@@ -0,0 +1,289 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.documents import Document
+from loguru import logger
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query for exact cache lookups: NFC, lowercase, collapsed whitespace.
+
+    Args:
+        query (str): The user's question.
+
+    Returns:
+        str: Normalized query.
+    """
+    query = unicodedata.normalize("NFC", query).lower()
+    return re.sub(r"\s+", " ", query).strip(" ?!.")
+
+
+class QueryCache:
+    """
+    Two-level answer cache in front of `SimpleRAG.ask`.
+
+    A query first hits on its normalized text, then on the nearest cached
+    query embedding if the cosine similarity reaches `threshold`. Entries
+    are persisted in SQLite, expire after `ttl` seconds, are evicted least
+    recently used first above `max_entries`, and are all dropped when the
+    index version (e.g. the manifest hash) changes.
+
+    Answers are stored under a namespace identifying how they were generated
+    (e.g. LLM, prompt, k and metadata filter, see `SimpleRAG.cache_namespace`):
+    a query only hits answers of its own namespace. The cache can be shared
+    by threads.
+
+    Attributes:
+        embeddings (Embeddings): Model used to embed queries.
+        threshold (float): Minimum cosine similarity for a semantic hit.
+        ttl (float): Entry lifetime in seconds.
+        max_entries (int): Maximum number of cached answers.
+        exact_hits (int): Number of exact normalized-query hits.
+        semantic_hits (int): Number of nearest-neighbour hits.
+        misses (int): Number of queries not found in the cache.
+    """
+    def __init__(self,
+        cache_path: Path,
+        embeddings: Embeddings,
+        index_version: str = "",
+        threshold: float = 0.95,
+        ttl: float = 7 * 24 * 3600,
+        max_entries: int = 10_000):
+        """
+        Open (or create) the query cache.
+
+        Args:
+            cache_path (Path): Path to the SQLite database file.
+            embeddings (Embeddings): Model used to embed queries.
+            index_version (str): Version of the index the answers were computed on;
+                the cache is cleared when it changes.
+            threshold (float): Minimum cosine similarity for a semantic hit.
+            ttl (float): Entry lifetime in seconds.
+            max_entries (int): Maximum number of cached answers.
+
+        Returns:
+            None
+        """
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        # Last (query, embedding) of each thread: a miss embeds the query in `get`, then in `put`
+        self._local = threading.local()
+        # Guards the SQLite connection and the in-memory embedding matrices
+        self._lock = threading.Lock()
+
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(cache_path), check_same_thread=False)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(answers)")]
+        if columns and "namespace" not in columns:
+            logger.info("Query cache predates answer namespaces, clearing it")
+            self._conn.execute("DROP TABLE answers")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " namespace TEXT NOT NULL,"
+            " query TEXT NOT NULL,"
+            " embedding BLOB NOT NULL,"
+            " response TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (namespace, query))"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'index_version'").fetchone()
+        if row is None or row[0] != index_version:
+            if row is not None:
+                logger.info("Index changed, clearing the query cache")
+            self._conn.execute("DELETE FROM answers")
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('index_version', ?)", (index_version,))
+        self._conn.execute("DELETE FROM answers WHERE created < ?", (time.time() - ttl,))
+        self._conn.commit()
+        self._load_matrix()
+
+    def _load_matrix(self) -> None:
+        """
+        Load the normalized embeddings of all cached queries, per namespace, for nearest-neighbour lookups.
+
+        The matrix of a namespace is a buffer grown by doubling: only its first
+        `len(self._keys[namespace])` rows hold embeddings.
+        """
+        rows: Dict[str, list] = {}
+        for namespace, query, embedding in self._conn.execute("SELECT namespace, query, embedding FROM answers"):
+            rows.setdefault(namespace, []).append((query, embedding))
+        self._keys: Dict[str, List[str]] = {ns: [q for q, _ in r] for ns, r in rows.items()}
+        self._rows: Dict[str, Dict[str, int]] = {ns: {q: i for i, q in enumerate(k)} for ns, k in self._keys.items()}
+        self._matrix: Dict[str, np.ndarray] = {
+            ns: np.stack([np.frombuffer(e, dtype=np.float32) for _, e in r]) for ns, r in rows.items()
+        }
+
+    @staticmethod
+    def _encode(response: Dict[str, Any]) -> str:
+        """Serialize an `ask` response, including its source documents, to JSON."""
+        docs = [
+            {"id": d.id, "page_content": d.page_content, "metadata": d.metadata}
+            for d in response.get("source_documents", [])
+        ]
+        return json.dumps({**response, "source_documents": docs}, ensure_ascii=False, default=str)
+
+    @staticmethod
+    def _decode(payload: str) -> Dict[str, Any]:
+        """Rebuild an `ask` response from its JSON serialization."""
+        response = json.loads(payload)
+        response["source_documents"] = [Document(**d) for d in response["source_documents"]]
+        return response
+
+    def _embed(self, query: str) -> np.ndarray:
+        """Embed a query and L2-normalize it so dot products are cosine similarities."""
+        last_query, last_vector = getattr(self._local, "last_embedding", (None, None))
+        if last_query == query:
+            return last_vector
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+        self._local.last_embedding = (query, vector)
+        return vector
+
+    def _append(self, namespace: str, key: str, vector: np.ndarray) -> None:
+        """Add a query embedding to the matrix of its namespace (called with the lock held)."""
+        keys = self._keys.setdefault(namespace, [])
+        self._rows.setdefault(namespace, {})[key] = len(keys)
+        matrix = self._matrix.get(namespace)
+        if matrix is None or len(keys) == len(matrix):
+            # Double the capacity, so inserts cost amortized O(1) copies
+            grown = np.empty((max(16, 2 * len(keys)), len(vector)), dtype=np.float32)
+            if matrix is not None:
+                grown[:len(keys)] = matrix
+            matrix = self._matrix[namespace] = grown
+        matrix[len(keys)] = vector
+        keys.append(key)
+
+    def _fetch(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a live cached response and refresh its LRU stamp (called with the lock held).
+
+        Args:
+            namespace (str): Answer namespace.
+            key (str): Normalized query.
+
+        Returns:
+            Optional[Dict[str, Any]]: Cached response, or None if absent or expired.
+        """
+        row = self._conn.execute(
+            "SELECT response, created FROM answers WHERE namespace = ? AND query = ?", (namespace, key)
+        ).fetchone()
+        if row is None or row[1] < time.time() - self.ttl:
+            return None
+        self._conn.execute(
+            "UPDATE answers SET last_used = ? WHERE namespace = ? AND query = ?", (time.time(), namespace, key)
+        )
+        self._conn.commit()
+        return self._decode(row[0])
+
+    def get(self, query: str, namespace: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Look up a query: exact normalized match first, then nearest cached query.
+
+        Args:
+            query (str): The user's question.
+            namespace (str): Namespace of the answers that may be returned.
+
+        Returns:
+            Optional[Dict[str, Any]]: Cached `ask` response, or None on a miss.
+        """
+        key = normalize_query(query)
+        with self._lock:
+            response = self._fetch(namespace, key)
+            if response is not None:
+                self.exact_hits += 1
+                logger.debug(f"Query cache exact hit: '{key}'")
+                return response
+            has_neighbours = namespace in self._keys
+
+        if has_neighbours:
+            # Embedded outside the lock, so other threads' lookups are not held up by the model
+            vector = self._embed(query)
+            with self._lock:
+                keys, matrix = self._keys.get(namespace), self._matrix.get(namespace)
+                if keys:
+                    similarities = matrix[:len(keys)] @ vector
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.threshold:
+                        response = self._fetch(namespace, keys[best])
+                        if response is not None:
+                            self.semantic_hits += 1
+                            logger.debug(f"Query cache semantic hit: '{keys[best]}' ({similarities[best]:.3f})")
+                            return response
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, query: str, response: Dict[str, Any], namespace: str = "") -> None:
+        """
+        Store a response, evicting least recently used entries above the size bound.
+
+        Args:
+            query (str): The user's question.
+            response (Dict[str, Any]): `ask` response to cache.
+            namespace (str): Namespace of the answer.
+        """
+        key = normalize_query(query)
+        vector = self._embed(query)
+        payload = self._encode(response)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, vector.tobytes(), payload, now, now)
+            )
+            # Every live row has its embedding in memory: count them there instead of scanning the table
+            rows = self._rows.get(namespace, {})
+            count = sum(len(keys) for keys in self._keys.values()) + (key not in rows)
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM answers WHERE rowid IN (SELECT rowid FROM answers ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+                self._conn.commit()
+                self._load_matrix()
+                return
+            self._conn.commit()
+
+            if key in rows:
+                self._matrix[namespace][rows[key]] = vector
+            else:
+                self._append(namespace, key, vector)
+
+    def stats(self) -> dict:
+        """
+        Report cache counters.
+
+        Returns:
+            dict: Exact hits, semantic hits, misses, hit rate and number of entries.
+        """
+        with self._lock:
+            entries = sum(len(keys) for keys in self._keys.values())
+        total = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / total if total else 0.0,
+            "entries": entries,
+        }
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
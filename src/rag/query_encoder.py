@@ -0,0 +1,173 @@
+import json
+import time
+import numpy as np
+from loguru import logger
+from pathlib import Path
+from typing import Any, List, Optional
+
+from rag.config import EMBEDDING_MODEL_NAME
+
+# Written next to the ONNX model by `rag.quantization.export_onnx_encoder`
+ONNX_ENCODER_CONFIG = "encoder.json"
+
+
+class QueryEncoder:
+    """
+    Sentence-transformers query encoder, imported and loaded on first use.
+
+    Encodes like LangChain's `HuggingFaceEmbeddings` (newlines replaced by
+    spaces, no normalization), so its vectors match the ones the index was
+    built with, without importing LangChain.
+
+    Attributes:
+        model_name (str): Hugging Face identifier of the embedding model.
+        device (str): Torch device.
+        batch_size (int): Number of texts per forward pass.
+    """
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, device: str = "cpu", batch_size: int = 64):
+        """
+        Initialize the encoder without loading the model.
+
+        Args:
+            model_name (str): Hugging Face identifier of the embedding model.
+            device (str): Torch device (e.g. "cpu", "cuda").
+            batch_size (int): Number of texts per forward pass.
+
+        Returns:
+            None
+        """
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self._model = None
+
+    @property
+    def cache_key(self) -> str:
+        """Identity of the encoder's vectors, part of the query cache namespaces."""
+        return self.model_name
+
+    @property
+    def model(self) -> Any:
+        """The `SentenceTransformer`, loaded on first access."""
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            start = time.perf_counter()
+            self._model = SentenceTransformer(self.model_name, device=self.device)
+            logger.info(f"Loaded query encoder {self.model_name} in {time.perf_counter() - start:.2f}s")
+        return self._model
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts.
+
+        Args:
+            texts (List[str]): Texts to embed.
+
+        Returns:
+            np.ndarray: Embeddings, shape (n_texts, dim), float32.
+        """
+        vectors = self.model.encode(
+            [t.replace("\n", " ") for t in texts], batch_size=self.batch_size, convert_to_numpy=True
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class OnnxQueryEncoder:
+    """
+    Query encoder running an ONNX export of the sentence-transformers model with onnxruntime.
+
+    The export (see `rag.quantization.export_onnx_encoder`) holds the
+    transformer, usually with int8 dynamically quantized weights, its
+    `tokenizer.json` and an `encoder.json` describing the pooling. Encoding
+    reproduces sentence-transformers (strip, truncation, mean pooling over
+    the attention mask, optional normalization) with only onnxruntime and
+    the `tokenizers` library: neither torch nor sentence-transformers is
+    imported.
+
+    Attributes:
+        model_dir (Path): Folder of the export.
+        config (dict): Content of `encoder.json`.
+        model_name (str): Hugging Face identifier of the exported model.
+        batch_size (int): Number of texts per forward pass.
+        num_threads (Optional[int]): onnxruntime intra-op threads (its default if None).
+    """
+    def __init__(self, model_dir: Path, batch_size: int = 64, num_threads: Optional[int] = None):
+        """
+        Read the export configuration without loading the model.
+
+        Args:
+            model_dir (Path): Folder of the export.
+            batch_size (int): Number of texts per forward pass.
+            num_threads (Optional[int]): onnxruntime intra-op threads.
+
+        Returns:
+            None
+        """
+        config_path = model_dir / ONNX_ENCODER_CONFIG
+        if not config_path.exists():
+            raise FileNotFoundError(f"No ONNX encoder export in {model_dir} (missing {ONNX_ENCODER_CONFIG})")
+        self.model_dir = model_dir
+        self.config = json.loads(config_path.read_text(encoding="utf-8"))
+        self.model_name = self.config["model_name"]
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self._session = None
+        self._tokenizer = None
+
+    @property
+    def cache_key(self) -> str:
+        """Identity of the encoder's vectors: the quantized export differs from the model it was exported from."""
+        return f"onnx:{self.model_name}:{(self.model_dir / self.config['model_file']).resolve()}"
+
+    @property
+    def session(self) -> Any:
+        """The onnxruntime `InferenceSession`, created on first access."""
+        if self._session is None:
+            import onnxruntime
+            options = onnxruntime.SessionOptions()
+            if self.num_threads:
+                options.intra_op_num_threads = self.num_threads
+            start = time.perf_counter()
+            self._session = onnxruntime.InferenceSession(
+                str(self.model_dir / self.config["model_file"]), options, providers=["CPUExecutionProvider"]
+            )
+            logger.info(f"Loaded ONNX query encoder {self.config['model_file']} in {time.perf_counter() - start:.2f}s")
+        return self._session
+
+    @property
+    def tokenizer(self) -> Any:
+        """The fast tokenizer, with the model's truncation and padding settings."""
+        if self._tokenizer is None:
+            from tokenizers import Tokenizer
+            tokenizer = Tokenizer.from_file(str(self.model_dir / "tokenizer.json"))
+            tokenizer.enable_truncation(self.config["max_length"])
+            tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+            self._tokenizer = tokenizer
+        return self._tokenizer
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts.
+
+        Args:
+            texts (List[str]): Texts to embed.
+
+        Returns:
+            np.ndarray: Embeddings, shape (n_texts, dim), float32.
+        """
+        texts = [t.replace("\n", " ").strip() for t in texts]
+        if self.config.get("do_lower_case"):
+            texts = [t.lower() for t in texts]
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + self.batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            hidden = self.session.run(None, {"input_ids": input_ids, "attention_mask": mask})[0]
+            # Mean pooling over the non-padding tokens, as in sentence-transformers
+            weights = mask[..., None].astype(np.float32)
+            vectors = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+            if self.config.get("normalize"):
+                vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            batches.append(vectors.astype(np.float32))
+        return np.concatenate(batches) if batches else np.empty((0, 0), dtype=np.float32)
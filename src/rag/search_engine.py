@@ -0,0 +1,260 @@
+import argparse
+import json
+import sys
+import time
+import numpy as np
+from langchain_core.documents import Document
+from loguru import logger
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
+
+from rag.faiss_index import IndexConfig, configure_index, read_docstore, read_index, search_index
+from rag.glossary import Glossary, load_glossary
+from rag.metadata_filter import MetadataFilter, MetadataIndex
+from rag.query_encoder import EMBEDDING_MODEL_NAME, OnnxQueryEncoder, QueryEncoder
+
+if TYPE_CHECKING:
+    # Only imported by the LangChain adapter: `langchain_core.embeddings` alone pulls in langsmith
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.embeddings import Embeddings
+
+# Written by `rag.index_store` next to the index; read directly to avoid importing the build pipeline
+INDEX_MANIFEST_FILENAME = "manifest.json"
+
+
+def indexed_embedding_model(index_dir: Path) -> str:
+    """
+    Embedding model a persisted index was built with, as recorded in its manifest.
+
+    Args:
+        index_dir (Path): Folder of the index.
+
+    Returns:
+        str: Model name, or `EMBEDDING_MODEL_NAME` if the index has no manifest entry.
+    """
+    manifest_path = index_dir / INDEX_MANIFEST_FILENAME
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8")) if manifest_path.exists() else {}
+    return manifest.get("embedding_model") or EMBEDDING_MODEL_NAME
+
+
+class SearchEngine:
+    """
+    Retrieval-only engine over a persisted index, without LangChain on the query path.
+
+    The FAISS index (memory-mapped by default) and the docstore are read
+    directly from `index_dir`; queries are embedded by a `QueryEncoder` and
+    searched with raw FAISS calls, pre-filtered by metadata through an
+    `IDSelectorBitmap` like `SimpleRAG`. Only the modules needed to read the
+    index are imported up front: sentence-transformers is loaded with the
+    first query, and LangChain's FAISS wrapper only by `as_vectorstore`.
+
+    Attributes:
+        index_dir (Path): Folder of the persisted index.
+        index (faiss.Index): FAISS index.
+        docstore (Any): Docstore of the indexed chunks.
+        index_to_docstore_id (Dict[int, str]): FAISS row -> doc id.
+        encoder (Any): Query encoder (`encode(texts) -> np.ndarray`).
+        glossary (Optional[Glossary]): Trilingual glossary expanding queries before they are embedded.
+    """
+    def __init__(
+        self,
+        index_dir: Path,
+        encoder: Optional[Any] = None,
+        index_config: Optional[IndexConfig] = None,
+        mmap: bool = True,
+        glossary: Optional[Glossary] = None
+    ):
+        """
+        Open a persisted index.
+
+        Args:
+            index_dir (Path): Folder of the persisted FAISS index and docstore.
+            encoder (Optional[Any]): Query encoder (default: a `QueryEncoder` for the
+                embedding model recorded in the index manifest).
+            index_config (Optional[IndexConfig]): Query-time parameters (nprobe, efSearch).
+            mmap (bool): Memory-map the index file.
+            glossary (Optional[Glossary]): Trilingual glossary expanding queries across languages.
+
+        Returns:
+            None
+        """
+        start = time.perf_counter()
+        self.index_dir = index_dir
+        self.index = read_index(index_dir, mmap)
+        configure_index(self.index, index_config or IndexConfig())
+        self.docstore, self.index_to_docstore_id = read_docstore(index_dir)
+        if encoder is None:
+            encoder = QueryEncoder(indexed_embedding_model(index_dir))
+        self.encoder = encoder
+        self.glossary = glossary
+        self._metadata_index: Optional[MetadataIndex] = None
+        logger.info(
+            f"Opened index {index_dir} ({self.index.ntotal} vectors"
+            + (", memory-mapped" if mmap else "") + f") in {time.perf_counter() - start:.3f}s"
+        )
+
+    @property
+    def metadata_index(self) -> MetadataIndex:
+        """Columnar metadata index of the docstore, built on first filtered query."""
+        if self._metadata_index is None:
+            self._metadata_index = MetadataIndex.from_vectorstore(self)
+        return self._metadata_index
+
+    def search_by_vectors(
+        self,
+        vectors: np.ndarray,
+        k: int = 5,
+        metadata_filter: Optional[MetadataFilter] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Search already embedded queries with one FAISS call.
+
+        Args:
+            vectors (np.ndarray): Query embeddings, shape (n_queries, dim).
+            k (int): Number of documents per query.
+            metadata_filter (Optional[MetadataFilter]): Only retrieve documents matching it.
+
+        Returns:
+            List[List[Tuple[Document, float]]]: (document, distance) pairs per query, best first.
+        """
+        row_mask = None
+        if metadata_filter is not None and not metadata_filter.is_empty():
+            row_mask = self.metadata_index.row_mask(metadata_filter)
+        distances, rows = search_index(self.index, vectors, k, row_mask)
+        id_map = self.index_to_docstore_id
+        return [
+            [(self.docstore.search(id_map[row]), float(d)) for row, d in zip(row_ids, dists) if row != -1]
+            for row_ids, dists in zip(rows.tolist(), distances.tolist())
+        ]
+
+    def search_batch(
+        self,
+        queries: List[str],
+        k: int = 5,
+        metadata_filter: Optional[MetadataFilter] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Embed queries in one batch and search them.
+
+        Args:
+            queries (List[str]): Query texts.
+            k (int): Number of documents per query.
+            metadata_filter (Optional[MetadataFilter]): Only retrieve documents matching it.
+
+        Returns:
+            List[List[Tuple[Document, float]]]: (document, distance) pairs per query, best first.
+        """
+        if not queries:
+            return []
+        if self.glossary is not None:
+            queries = [self.glossary.expand(q) for q in queries]
+        return self.search_by_vectors(self.encoder.encode(queries), k, metadata_filter)
+
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        metadata_filter: Optional[MetadataFilter] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Retrieve the top-k documents for a query.
+
+        Args:
+            query (str): Query text.
+            k (int): Number of documents.
+            metadata_filter (Optional[MetadataFilter]): Only retrieve documents matching it.
+
+        Returns:
+            List[Tuple[Document, float]]: (document, distance) pairs, best first.
+        """
+        return self.search_batch([query], k, metadata_filter)[0]
+
+    def as_vectorstore(self, embedding_model: Optional["Embeddings"] = None) -> "FAISS":
+        """
+        LangChain-compatible FAISS vector store sharing this engine's index and docstore.
+
+        Lets the engine back `SimpleRAG`, retrievers or chains; LangChain's FAISS
+        wrapper is only imported here.
+
+        Args:
+            embedding_model (Optional[Embeddings]): Query embedding model (default: the
+                engine's encoder, wrapped in `EncoderEmbeddings`).
+
+        Returns:
+            FAISS: Vector store (must not be modified when the index is memory-mapped).
+        """
+        from langchain_community.vectorstores import FAISS
+        from rag.vector_indexer import EncoderEmbeddings
+        return FAISS(
+            embedding_model or EncoderEmbeddings(self.encoder), self.index, self.docstore, self.index_to_docstore_id
+        )
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Register the `rag search` command-line options.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser (or subparser) to extend.
+    """
+    parser.add_argument("queries", nargs="*", help="Queries (read one per line from stdin if omitted)")
+    parser.add_argument("--index-dir", "-i", required=True, help="Folder of the persisted FAISS index")
+    parser.add_argument("--k", type=int, default=5, help="Number of results per query (default: %(default)s)")
+    parser.add_argument("--model", default=None, help="Embedding model (default: the one recorded in the index manifest)")
+    parser.add_argument("--onnx-encoder", default=None, help="Embed queries with this ONNX export (see `rag quantize`)")
+    parser.add_argument("--nprobe", type=int, default=IndexConfig().nprobe, help="IVF clusters visited per query")
+    parser.add_argument("--ef-search", type=int, default=IndexConfig().ef_search, help="HNSW query-time search depth")
+    parser.add_argument("--no-mmap", action="store_true", help="Read the index into memory instead of memory-mapping it")
+    parser.add_argument("--glossary", default=None, help="Trilingual glossary CSV (term, han, vi, fr) expanding queries")
+    parser.add_argument("--publication", default=None, help="Only search publications whose title contains this")
+    parser.add_argument("--date-from", default=None, help="Earliest publication date (e.g. 1917)")
+    parser.add_argument("--date-to", default=None, help="Latest publication date (e.g. 1920)")
+    parser.add_argument("--author", action="append", default=[], help="Accepted author (repeatable)")
+    parser.add_argument("--genre", action="append", default=[], help="Accepted genre (repeatable)")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per query")
+
+
+def main(args: argparse.Namespace) -> None:
+    """
+    Run `rag search`: print the top-k chunks of each query.
+
+    Args:
+        args (argparse.Namespace): Options registered by `add_arguments`.
+    """
+    encoder = None
+    if args.onnx_encoder:
+        encoder = OnnxQueryEncoder(Path(args.onnx_encoder))
+    elif args.model:
+        encoder = QueryEncoder(args.model)
+    engine = SearchEngine(
+        Path(args.index_dir),
+        encoder=encoder,
+        index_config=IndexConfig(nprobe=args.nprobe, ef_search=args.ef_search),
+        mmap=not args.no_mmap,
+        glossary=load_glossary(Path(args.glossary) if args.glossary else None)
+    )
+    metadata_filter = MetadataFilter(
+        publication=args.publication, date_from=args.date_from, date_to=args.date_to,
+        authors=args.author, genres=args.genre
+    )
+    queries = args.queries or [line.strip() for line in sys.stdin if line.strip()]
+    for query, hits in zip(queries, engine.search_batch(queries, args.k, metadata_filter)):
+        if args.json:
+            results = [
+                {"id": doc.id, "distance": distance, "text": doc.page_content, "metadata": doc.metadata}
+                for doc, distance in hits
+            ]
+            print(json.dumps({"query": query, "results": results}, ensure_ascii=False, default=str))
+            continue
+        print(f"\n# {query}")
+        for rank, (doc, distance) in enumerate(hits, start=1):
+            m = doc.metadata
+            snippet = " ".join(doc.page_content.split())[:160]
+            print(f"{rank:>2}. [{distance:.4f}] {m.get('title_main', 'Unknown title')} ({m.get('publication_date', 'Unknown date')})")
+            print(f"    {snippet}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search a persisted index without loading the RAG pipeline.")
+    add_arguments(parser)
+    main(parser.parse_args())
@@ -0,0 +1,437 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+from pathlib import Path
+from pydantic import BaseModel, ValidationError
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from rag.glossary import load_glossary
+from rag.index_store import load_persisted_vectorstore
+from rag.metadata_filter import MetadataFilter
+from rag.query_encoder import OnnxQueryEncoder
+from rag.search_engine import indexed_embedding_model
+from rag.sparse_index import SPARSE_INDEX_FILENAME, BM25Index
+from rag.stub_llm import StubLLM
+from rag.vector_indexer import EncoderEmbeddings, IndexConfig, embed_queries, load_embedding_model
+from rag.wrapper import SimpleRAG
+
+CONFIG_ENV_VAR = "RAG_SERVER_CONFIG"
+
+
+class ServerConfig(BaseModel):
+    """
+    Settings of the query server, shared by all worker processes.
+
+    Attributes:
+        index_dir: Folder of the persisted FAISS index.
+        model_name: Ollama model used by /ask.
+        embedding_model: Sentence-transformers model used to embed queries
+            (default: the one recorded in the index manifest).
+        onnx_encoder: Folder of an ONNX export of the embedding model (see
+            `rag quantize`) used to embed queries instead of sentence-transformers.
+        search_type: Retrieval mode ("similarity", "mmr" or "hybrid").
+        k: Default number of retrieved documents.
+        nprobe: Number of IVF clusters visited per query.
+        ef_search: HNSW query-time search depth.
+        mmap: Memory-map the index file so workers share its pages.
+        batch_window_ms: How long the first query of a batch waits for others.
+        max_batch_size: Maximum number of queries embedded together.
+        max_concurrency: Maximum number of concurrent LLM calls per worker.
+        glossary: Trilingual glossary CSV used to expand queries across languages.
+        stub_llm: Answer with the deterministic offline stub instead of Ollama.
+    """
+    index_dir: str
+    model_name: str = "mistral"
+    embedding_model: Optional[str] = None
+    onnx_encoder: Optional[str] = None
+    search_type: str = "similarity"
+    k: int = 5
+    nprobe: int = IndexConfig().nprobe
+    ef_search: int = IndexConfig().ef_search
+    mmap: bool = True
+    batch_window_ms: float = 5.0
+    max_batch_size: int = 64
+    max_concurrency: int = 4
+    glossary: Optional[str] = None
+    stub_llm: bool = False
+
+
+class QueryBatcher:
+    """
+    Micro-batch query embeddings across concurrent requests.
+
+    The first query waits up to `window_ms` for others (or until `max_batch_size`
+    queries are queued), then the whole batch is embedded with `embed_queries`
+    in a worker thread.
+
+    Attributes:
+        embeddings (Embeddings): Query embedding model.
+        window_ms (float): Batching window in milliseconds.
+        max_batch_size (int): Maximum number of queries per batch.
+        batches (int): Number of embedding calls made.
+        queries (int): Number of queries embedded.
+    """
+    def __init__(self, embeddings: Embeddings, window_ms: float = 5.0, max_batch_size: int = 64):
+        """
+        Initialize the batcher (the batching task starts with the first query).
+
+        Args:
+            embeddings (Embeddings): Query embedding model.
+            window_ms (float): Batching window in milliseconds.
+            max_batch_size (int): Maximum number of queries per batch.
+
+        Returns:
+            None
+        """
+        self.embeddings = embeddings
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self.queries = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def embed(self, query: str) -> np.ndarray:
+        """
+        Embed one query as part of the next batch.
+
+        Args:
+            query (str): Query text.
+
+        Returns:
+            np.ndarray: Query embedding (float32).
+        """
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future]]:
+        """Wait for a first query, then gather more until the window closes or the batch is full."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.window_ms / 1000
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        """Embed queued queries batch by batch, forever."""
+        while True:
+            batch = await self._collect()
+            try:
+                vectors = await asyncio.to_thread(embed_queries, self.embeddings, [q for q, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.queries += len(batch)
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    def close(self) -> None:
+        """Stop the batching task."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        """
+        Report batching counters.
+
+        Returns:
+            dict: Number of batches, queries and mean batch size.
+        """
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "mean_batch_size": self.queries / self.batches if self.batches else 0.0,
+        }
+
+
+def _serialize_document(doc: Any, score: Optional[float] = None) -> dict:
+    """JSON-friendly view of a retrieved document."""
+    result = {"id": doc.id, "content": doc.page_content, "metadata": doc.metadata}
+    if score is not None:
+        result["score"] = score
+    return result
+
+
+class RAGServer:
+    """
+    ASGI application answering queries over a warm, shared index.
+
+    Endpoints:
+        GET /health: index size and batching statistics.
+        POST /search: {"query", "k"?, "filter"?} -> retrieved documents with scores.
+        POST /ask: {"query", "filter"?} -> generated answer and its sources.
+
+    `filter` takes the fields of `MetadataFilter`.
+
+    Attributes:
+        rag (SimpleRAG): Pipeline sharing the loaded index and models.
+        batcher (QueryBatcher): Micro-batcher of query embeddings.
+    """
+    def __init__(self, rag: SimpleRAG, batcher: QueryBatcher):
+        """
+        Wrap a loaded pipeline.
+
+        Args:
+            rag (SimpleRAG): Pipeline sharing the loaded index and models.
+            batcher (QueryBatcher): Micro-batcher of query embeddings.
+
+        Returns:
+            None
+        """
+        self.rag = rag
+        self.batcher = batcher
+        self._routes: Dict[Tuple[str, str], Callable[[dict], Awaitable[dict]]] = {
+            ("GET", "/health"): self.health,
+            ("POST", "/search"): self.search,
+            ("POST", "/ask"): self.ask,
+        }
+
+    async def _retrieve(self, query: str, metadata_filter: MetadataFilter, k: int) -> List[Tuple[Any, Optional[float]]]:
+        """
+        Retrieve documents, with a batched query embedding for similarity search.
+
+        Args:
+            query (str): Query text.
+            metadata_filter (MetadataFilter): Restriction of the search.
+            k (int): Number of documents.
+
+        Returns:
+            List[Tuple[Any, Optional[float]]]: (document, distance) pairs; distances are
+                None for search types that do not report them.
+        """
+        if self.rag.search_type == "similarity":
+            vector = await self.batcher.embed(self.rag.expand_query(query))
+            return (await asyncio.to_thread(self.rag.search_by_vectors, vector[None, :], metadata_filter, k))[0]
+        docs = await asyncio.to_thread(self.rag.retrieve, query, metadata_filter, k)
+        return [(doc, None) for doc in docs]
+
+    @staticmethod
+    def _parse_request(body: dict) -> Tuple[str, MetadataFilter]:
+        """Validate the query and filter of a request body (raises ValueError)."""
+        query = body.get("query")
+        if not isinstance(query, str) or not query.strip():
+            raise ValueError("'query' must be a non-empty string")
+        return query, MetadataFilter(**(body.get("filter") or {}))
+
+    async def health(self, body: dict) -> dict:
+        """GET /health: liveness and index statistics."""
+        return {
+            "status": "ok",
+            "documents": self.rag.vectorstore.index.ntotal,
+            "search_type": self.rag.search_type,
+            "batching": self.batcher.stats(),
+        }
+
+    async def search(self, body: dict) -> dict:
+        """POST /search: retrieval only."""
+        query, metadata_filter = self._parse_request(body)
+        start = time.perf_counter()
+        results = await self._retrieve(query, metadata_filter, int(body.get("k") or self.rag.k))
+        return {
+            "results": [_serialize_document(doc, score) for doc, score in results],
+            "retrieval_s": time.perf_counter() - start,
+        }
+
+    async def ask(self, body: dict) -> dict:
+        """POST /ask: retrieval and generation."""
+        query, metadata_filter = self._parse_request(body)
+        start = time.perf_counter()
+        sources = [doc for doc, _ in await self._retrieve(query, metadata_filter, self.rag.k)]
+        retrieval_s = time.perf_counter() - start
+        response = await self.rag.agenerate(query, sources, metadata_filter)
+        return {
+            "result": response["result"],
+            "sources": [_serialize_document(doc) for doc in response["source_documents"]],
+            "retrieval_s": retrieval_s,
+            "generation_s": time.perf_counter() - start - retrieval_s,
+        }
+
+    @staticmethod
+    async def _send_json(send: Callable, status: int, payload: dict) -> None:
+        """Send a JSON HTTP response."""
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json; charset=utf-8"),
+                        (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        """
+        ASGI entry point.
+
+        Args:
+            scope (dict): Connection scope.
+            receive (Callable): Receives request events.
+            send (Callable): Sends response events.
+        """
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    self.batcher.close()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        handler = self._routes.get((scope["method"], scope["path"]))
+        if handler is None:
+            known = any(path == scope["path"] for _, path in self._routes)
+            await self._send_json(send, 405 if known else 404, {"error": "method not allowed" if known else "not found"})
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        try:
+            body = json.loads(b"".join(chunks) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("request body must be a JSON object")
+            payload = await handler(body)
+        except (ValueError, ValidationError) as e:
+            await self._send_json(send, 400, {"error": str(e)})
+            return
+        except Exception as e:
+            logger.exception(f"Error handling {scope['path']}: {e}")
+            await self._send_json(send, 500, {"error": "internal server error"})
+            return
+        await self._send_json(send, 200, payload)
+
+
+def build_server(config: ServerConfig, embedding_model: Optional[Embeddings] = None) -> RAGServer:
+    """
+    Load the persisted index and models once and wrap them in the ASGI app.
+
+    Args:
+        config (ServerConfig): Server settings.
+        embedding_model (Optional[Embeddings]): Preloaded query embedding model.
+
+    Returns:
+        RAGServer: ASGI application.
+    """
+    index_dir = Path(config.index_dir)
+    model_name = config.embedding_model or indexed_embedding_model(index_dir)
+    if embedding_model is None and config.onnx_encoder:
+        encoder = OnnxQueryEncoder(Path(config.onnx_encoder))
+        if encoder.model_name != model_name:
+            logger.warning(f"ONNX encoder exports {encoder.model_name}, the index expects {model_name}")
+        embedding_model = EncoderEmbeddings(encoder)
+    embedding_model = embedding_model or load_embedding_model(model_name)
+    vectorstore = load_persisted_vectorstore(
+        index_dir, embedding_model, IndexConfig(nprobe=config.nprobe, ef_search=config.ef_search), mmap=config.mmap
+    )
+    sparse_index = None
+    if config.search_type == "hybrid" and (index_dir / SPARSE_INDEX_FILENAME).exists():
+        sparse_index = BM25Index.load(index_dir)
+    rag = SimpleRAG(
+        vectorstore, model_name=config.model_name, k=config.k, search_type=config.search_type,
+        sparse_index=sparse_index, llm=StubLLM() if config.stub_llm else None,
+        max_concurrency=config.max_concurrency,
+        glossary=load_glossary(Path(config.glossary) if config.glossary else None)
+    )
+    return RAGServer(rag, QueryBatcher(embedding_model, config.batch_window_ms, config.max_batch_size))
+
+
+def create_app() -> RAGServer:
+    """
+    App factory run by each uvicorn worker, configured through `RAG_SERVER_CONFIG`.
+
+    Returns:
+        RAGServer: ASGI application.
+    """
+    return build_server(ServerConfig(**json.loads(os.environ[CONFIG_ENV_VAR])))
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Register the `rag serve` command-line options.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser (or subparser) to extend.
+    """
+    parser.add_argument("--index-dir", "-i", required=True, help="Folder of the persisted FAISS index")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8000, help="Port (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes (default: %(default)s)")
+    parser.add_argument(
+        "--search-type",
+        choices=["similarity", "mmr", "hybrid"],
+        default="similarity",
+        help="Retrieval mode (default: %(default)s)"
+    )
+    parser.add_argument("--k", type=int, default=5, help="Default number of retrieved documents (default: %(default)s)")
+    parser.add_argument("--nprobe", type=int, default=IndexConfig().nprobe, help="IVF clusters visited per query")
+    parser.add_argument("--ef-search", type=int, default=IndexConfig().ef_search, help="HNSW query-time search depth")
+    parser.add_argument("--no-mmap", action="store_true", help="Read the index into memory instead of memory-mapping it")
+    parser.add_argument(
+        "--embedding-model",
+        default=None,
+        help="Query embedding model (default: the one recorded in the index manifest)"
+    )
+    parser.add_argument("--onnx-encoder", default=None, help="Embed queries with this ONNX export (see `rag quantize`)")
+    parser.add_argument(
+        "--batch-window-ms",
+        type=float,
+        default=5.0,
+        help="Time the first query of a batch waits for others to embed them together (default: %(default)s)"
+    )
+    parser.add_argument("--max-batch-size", type=int, default=64, help="Maximum queries per embedding batch")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="Concurrent LLM calls per worker")
+    parser.add_argument("--glossary", default=None, help="Trilingual glossary CSV (term, han, vi, fr) expanding queries")
+    parser.add_argument("--stub-llm", action="store_true", help="Answer with the deterministic offline stub")
+
+
+def main(args: argparse.Namespace) -> None:
+    """
+    Run `rag serve` with uvicorn.
+
+    Args:
+        args (argparse.Namespace): Options registered by `add_arguments`.
+    """
+    import uvicorn
+
+    config = ServerConfig(
+        index_dir=args.index_dir, embedding_model=args.embedding_model, onnx_encoder=args.onnx_encoder,
+        search_type=args.search_type, k=args.k, nprobe=args.nprobe,
+        ef_search=args.ef_search, mmap=not args.no_mmap, batch_window_ms=args.batch_window_ms,
+        max_batch_size=args.max_batch_size, max_concurrency=args.max_concurrency, glossary=args.glossary,
+        stub_llm=args.stub_llm
+    )
+    # Worker processes rebuild the app from the environment
+    os.environ[CONFIG_ENV_VAR] = config.model_dump_json()
+    uvicorn.run("rag.server:create_app", factory=True, host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the RAG pipeline over HTTP.")
+    add_arguments(parser)
+    main(parser.parse_args())
@@ -0,0 +1,236 @@
+import re
+import unicodedata
+import numpy as np
+from array import array
+from collections import Counter
+from loguru import logger
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+# Resolved from the repository root, so the BM25 index tokenizes the same way from any working directory
+STOPWORDS_PATH = Path(__file__).resolve().parents[2] / "data" / "vi_stopwords.txt"
+SPARSE_INDEX_FILENAME = "sparse_index.npz"
+
+# Unicode-aware word characters: Vietnamese syllables, French words, Hán characters
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def load_stopwords(path: Path = STOPWORDS_PATH) -> Set[str]:
+    """
+    Load the Vietnamese stopword list, one entry per line.
+
+    Tokenization is syllable-level, so multi-syllable entries are ignored.
+
+    Args:
+        path (Path): Path to the stopword file.
+
+    Returns:
+        Set[str]: NFC-normalized, lowercased single-syllable stopwords.
+    """
+    if not path.exists():
+        logger.warning(f"Stopword file not found: {path}")
+        return set()
+    words = {
+        unicodedata.normalize("NFC", line.strip().lower())
+        for line in path.read_text(encoding="utf-8").splitlines()
+    }
+    return {w for w in words if w and " " not in w and "_" not in w}
+
+
+def tokenize(text: str, stopwords: Set[str] = frozenset()) -> List[str]:
+    """
+    Split text into NFC-normalized, lowercased syllables, dropping stopwords.
+
+    Args:
+        text (str): Input text (Vietnamese, French, English or Hán).
+        stopwords (Set[str]): Tokens to drop.
+
+    Returns:
+        List[str]: Tokens in order of appearance.
+    """
+    text = unicodedata.normalize("NFC", text).lower()
+    return [t for t in _TOKEN_RE.findall(text) if t not in stopwords]
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index stored as compressed sparse postings arrays.
+
+    Postings of term `t` are `doc_idx[indptr[t]:indptr[t + 1]]`, with the
+    BM25 weight of each posting (idf included) precomputed in `weights`, so
+    that scoring a query is a sum of array slices.
+
+    Attributes:
+        doc_ids (List[str]): Docstore id of each indexed document.
+        vocabulary (Dict[str, int]): Term to term id.
+        indptr (np.ndarray): Offsets of each term's postings (int64).
+        doc_idx (np.ndarray): Document index of each posting (int32).
+        weights (np.ndarray): BM25 weight of each posting (float32).
+        stopwords (Set[str]): Stopwords dropped from documents and queries.
+    """
+    def __init__(self,
+        doc_ids: List[str],
+        vocabulary: Dict[str, int],
+        indptr: np.ndarray,
+        doc_idx: np.ndarray,
+        weights: np.ndarray,
+        stopwords: Optional[Set[str]] = None):
+        """
+        Wrap prebuilt postings arrays (see `build` and `load`).
+
+        Args:
+            doc_ids (List[str]): Docstore id of each indexed document.
+            vocabulary (Dict[str, int]): Term to term id.
+            indptr (np.ndarray): Offsets of each term's postings.
+            doc_idx (np.ndarray): Document index of each posting.
+            weights (np.ndarray): BM25 weight of each posting.
+            stopwords (Optional[Set[str]]): Stopwords (default: `load_stopwords()`).
+
+        Returns:
+            None
+        """
+        self.doc_ids = doc_ids
+        self.vocabulary = vocabulary
+        self.indptr = indptr
+        self.doc_idx = doc_idx
+        self.weights = weights
+        self.stopwords = stopwords if stopwords is not None else load_stopwords()
+
+    @classmethod
+    def build(cls,
+        documents: Iterable[Tuple[str, str]],
+        stopwords: Optional[Set[str]] = None,
+        k1: float = 1.5,
+        b: float = 0.75) -> "BM25Index":
+        """
+        Build the index from (doc id, text) pairs.
+
+        Args:
+            documents (Iterable[Tuple[str, str]]): Documents to index.
+            stopwords (Optional[Set[str]]): Stopwords (default: `load_stopwords()`).
+            k1 (float): BM25 term-frequency saturation.
+            b (float): BM25 length normalization.
+
+        Returns:
+            BM25Index: The built index.
+        """
+        stopwords = stopwords if stopwords is not None else load_stopwords()
+        doc_ids: List[str] = []
+        vocabulary: Dict[str, int] = {}
+        terms, docs, freqs, lengths = array("i"), array("i"), array("f"), array("f")
+
+        for doc_id, text in documents:
+            tokens = tokenize(text, stopwords)
+            counts = Counter(tokens)
+            n = len(doc_ids)
+            doc_ids.append(doc_id)
+            lengths.append(len(tokens))
+            terms.extend(vocabulary.setdefault(token, len(vocabulary)) for token in counts)
+            docs.extend([n] * len(counts))
+            freqs.extend(counts.values())
+
+        terms_np = np.frombuffer(terms, dtype=np.int32)
+        order = np.argsort(terms_np, kind="stable")
+        doc_idx = np.frombuffer(docs, dtype=np.int32)[order]
+        tf = np.frombuffer(freqs, dtype=np.float32)[order]
+        indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms_np, minlength=len(vocabulary)), out=indptr[1:])
+
+        # Precompute idf * saturated, length-normalized term frequency per posting
+        n_docs = len(doc_ids)
+        doc_len = np.frombuffer(lengths, dtype=np.float32)
+        avg_len = float(doc_len.mean()) if n_docs else 0.0
+        df = np.diff(indptr).astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        norm = k1 * (1 - b + b * doc_len[doc_idx] / max(avg_len, 1e-9))
+        weights = (np.repeat(idf, np.diff(indptr)) * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+
+        logger.info(f"Built BM25 index: {n_docs} documents, {len(vocabulary)} terms, {len(weights)} postings")
+        return cls(doc_ids, vocabulary, indptr, np.ascontiguousarray(doc_idx), weights, stopwords)
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore: "FAISS", stopwords: Optional[Set[str]] = None) -> "BM25Index":
+        """
+        Build the index over every document of a FAISS vector store.
+
+        Args:
+            vectorstore (FAISS): Vector store whose docstore is indexed.
+            stopwords (Optional[Set[str]]): Stopwords (default: `load_stopwords()`).
+
+        Returns:
+            BM25Index: The built index.
+        """
+        ids = [vectorstore.index_to_docstore_id[i] for i in sorted(vectorstore.index_to_docstore_id)]
+        return cls.build(((i, vectorstore.docstore.search(i).page_content) for i in ids), stopwords)
+
+    def search(self, query: str, k: int = 5, mask: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """
+        Return the top-k documents for a query.
+
+        Args:
+            query (str): Query text.
+            k (int): Number of results.
+            mask (Optional[np.ndarray]): Boolean mask over indexed documents (in
+                `doc_ids` order); only selected documents are returned.
+
+        Returns:
+            List[Tuple[str, float]]: (doc id, BM25 score) pairs, best first.
+        """
+        term_ids = {self.vocabulary[t] for t in tokenize(query, self.stopwords) if t in self.vocabulary}
+        if not term_ids:
+            return []
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            scores[self.doc_idx[start:end]] += self.weights[start:end]
+        if mask is not None:
+            scores[~mask] = 0.0
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        return [(self.doc_ids[i], float(scores[i])) for i in candidates]
+
+    def save(self, index_dir: Path) -> None:
+        """
+        Save the postings arrays next to the FAISS index.
+
+        Args:
+            index_dir (Path): Index directory.
+        """
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        np.savez(
+            index_dir / SPARSE_INDEX_FILENAME,
+            doc_ids=np.array(self.doc_ids, dtype=str),
+            terms=np.array(terms, dtype=str),
+            indptr=self.indptr,
+            doc_idx=self.doc_idx,
+            weights=self.weights,
+        )
+
+    @classmethod
+    def load(cls, index_dir: Path, stopwords: Optional[Set[str]] = None) -> "BM25Index":
+        """
+        Load postings arrays saved with `save`.
+
+        Args:
+            index_dir (Path): Index directory.
+            stopwords (Optional[Set[str]]): Stopwords (default: `load_stopwords()`).
+
+        Returns:
+            BM25Index: The loaded index.
+        """
+        with np.load(index_dir / SPARSE_INDEX_FILENAME) as data:
+            terms = data["terms"].tolist()
+            return cls(
+                data["doc_ids"].tolist(),
+                {t: i for i, t in enumerate(terms)},
+                data["indptr"],
+                data["doc_idx"],
+                data["weights"],
+                stopwords,
+            )
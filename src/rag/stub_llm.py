@@ -0,0 +1,78 @@
+import asyncio
+import time
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+from typing import Any, Iterator, List, Optional
+
+
+class StubLLM(LLM):
+    """
+    Deterministic offline stand-in for the Ollama model.
+
+    The answer is derived from the prompt only (number of context passages
+    and the question), so runs are reproducible and need no model server.
+    An optional fixed latency simulates generation time; when streaming,
+    it is spread over the generated words.
+
+    Attributes:
+        latency (float): Seconds slept per call.
+    """
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    @staticmethod
+    def _answer(prompt: str) -> str:
+        """
+        Build the deterministic answer for a prompt.
+
+        Args:
+            prompt (str): Prompt built by SimpleRAG.
+
+        Returns:
+            str: Answer text.
+        """
+        question = prompt.rsplit("Question:", 1)[-1].split("\n", 1)[0].strip()
+        passages = prompt.count("Title:")
+        return f"Stub answer to '{question}' from {passages} context passage(s)."
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._answer(prompt)
+
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._answer(prompt)
+
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[GenerationChunk]:
+        words = self._answer(prompt).split(" ")
+        for i, word in enumerate(words):
+            if self.latency:
+                time.sleep(self.latency / len(words))
+            chunk = GenerationChunk(text=word if i == 0 else " " + word)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
@@ -1,21 +1,332 @@
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain.schema import Document
+import numpy as np
+import time
+from itertools import islice
+from langchain_core.embeddings import Embeddings
+from langchain_core.documents import Document
 from loguru import logger
-from typing import List
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, List, Optional, Tuple
 
-def build_vectorstore(documents: List[Document]) -> FAISS:
+from rag.compact_store import CompactDocstore
+from rag.config import EMBEDDING_MODEL_NAME
+from rag.embedding_cache import CachedEmbeddings
+from rag.faiss_index import IndexConfig, configure_index, create_faiss_index, search_index
+
+if TYPE_CHECKING:
+    # LangChain's FAISS wrapper and langchain_huggingface are slow to import: they are
+    # only loaded when a vector store or an embedding model is created
+    from langchain_community.vectorstores import FAISS
+
+DEFAULT_BATCH_SIZE = 1024
+
+
+def configure_search(vectorstore: "FAISS", config: IndexConfig) -> None:
+    """
+    Apply query-time parameters (nprobe, efSearch) to the FAISS index of a vector store.
+
+    Args:
+        vectorstore (FAISS): Vector store whose index is configured in place.
+        config (IndexConfig): Index configuration.
+    """
+    configure_index(vectorstore.index, config)
+
+
+def filtered_search(
+    vectorstore: "FAISS",
+    vectors: np.ndarray,
+    k: int,
+    row_mask: np.ndarray
+) -> List[List[Tuple[Document, float]]]:
+    """
+    Search only the vector store rows selected by a mask (see `search_index`).
+
+    Args:
+        vectorstore (FAISS): Vector store to search.
+        vectors (np.ndarray): Query vectors, shape (n_queries, dim).
+        k (int): Number of results per query.
+        row_mask (np.ndarray): Boolean mask over FAISS row ids.
+
+    Returns:
+        List[List[Tuple[Document, float]]]: (document, distance) pairs per query, best first.
+    """
+    distances, rows = search_index(vectorstore.index, vectors, k, row_mask)
+    id_map = vectorstore.index_to_docstore_id
+    return [
+        [(vectorstore.docstore.search(id_map[row]), float(d)) for row, d in zip(row_ids, dists) if row != -1]
+        for row_ids, dists in zip(rows.tolist(), distances.tolist())
+    ]
+
+
+def _new_vectorstore(
+    embedding_model: Embeddings,
+    config: IndexConfig,
+    sample: List[List[float]]
+) -> "FAISS":
+    """
+    Create an empty vector store, training its index on a sample of vectors if needed.
+
+    Documents are kept in a `CompactDocstore`.
+
+    Args:
+        embedding_model (Embeddings): Embedding model attached to the store.
+        config (IndexConfig): Index type and parameters.
+        sample (List[List[float]]): Vectors used for training and to infer the dimension.
+
+    Returns:
+        FAISS: Empty LangChain-compatible FAISS vector store.
+    """
+    from langchain_community.vectorstores import FAISS
+    vectors = np.asarray(sample, dtype=np.float32)
+    index = create_faiss_index(config, vectors.shape[1], n_train=len(vectors))
+    if not index.is_trained:
+        logger.info(f"Training {config.index_type} index on {len(vectors)} vectors")
+        index.train(vectors)
+    vectorstore = FAISS(embedding_model, index, CompactDocstore(), {})
+    configure_search(vectorstore, config)
+    return vectorstore
+
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[list]:
+    """
+    Group an iterable into lists of at most `batch_size` items.
+
+    Args:
+        items (Iterable): Items to group.
+        batch_size (int): Maximum size of each batch.
+
+    Yields:
+        list: Consecutive batches of items.
+    """
+    iterator = iter(items)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def load_embedding_model(
+    model_name: str = EMBEDDING_MODEL_NAME,
+    cache_path: Optional[Path] = None,
+    encode_batch_size: int = 64,
+    num_workers: int = 1,
+    num_threads: Optional[int] = None,
+    device: str = "cpu"
+) -> Embeddings:
+    """
+    Load the multilingual sentence-transformers embedding model.
+
+    Args:
+        model_name (str): Hugging Face identifier of the embedding model.
+        cache_path (Optional[Path]): SQLite embedding cache; document embeddings
+            are only computed for text missing from it.
+        encode_batch_size (int): Number of texts per forward pass of the encoder.
+        num_workers (int): Number of embedding processes (1 embeds in-process).
+        num_threads (Optional[int]): Torch threads in-process, or per worker
+            when `num_workers` > 1.
+        device (str): Torch device for in-process encoding (e.g. "cpu", "cuda").
+
+    Returns:
+        Embeddings: LangChain-compatible embedding model.
+    """
+    logger.info(f"Loading embedding model: {model_name}")
+    if num_workers > 1:
+        from rag.embedding_pool import MultiProcessEmbeddings
+        embeddings = MultiProcessEmbeddings(
+            model_name, num_workers, batch_size=encode_batch_size, threads_per_worker=num_threads
+        )
+    else:
+        if num_threads:
+            import torch
+            torch.set_num_threads(num_threads)
+        from langchain_huggingface import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={"device": device},
+            encode_kwargs={"batch_size": encode_batch_size}
+        )
+    if cache_path is not None:
+        logger.info(f"Using embedding cache: {cache_path}")
+        embeddings = CachedEmbeddings(embeddings, model_name, cache_path)
+    return embeddings
+
+
+def close_embedding_workers(embeddings: Embeddings) -> None:
+    """
+    Stop the worker processes of a multi-process embedding model, if any.
+
+    The model stays usable afterwards: documents are then embedded in-process.
+
+    Args:
+        embeddings (Embeddings): Model returned by `load_embedding_model`.
+    """
+    from rag.embedding_pool import MultiProcessEmbeddings
+    inner = embeddings.embeddings if isinstance(embeddings, CachedEmbeddings) else embeddings
+    if isinstance(inner, MultiProcessEmbeddings):
+        inner.close()
+
+
+class EncoderEmbeddings(Embeddings):
+    """
+    LangChain `Embeddings` view of a raw encoder such as `QueryEncoder`.
+
+    Attributes:
+        encoder (Any): Object with an `encode(texts) -> np.ndarray` method.
+    """
+    def __init__(self, encoder: Any):
+        """
+        Wrap an encoder.
+
+        Args:
+            encoder (Any): Encoder to wrap.
+
+        Returns:
+            None
+        """
+        self.encoder = encoder
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents with the wrapped encoder."""
+        return self.encoder.encode(texts).tolist() if texts else []
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query with the wrapped encoder."""
+        return self.encoder.encode([text])[0].tolist()
+
+
+def query_model_key(embeddings: Embeddings) -> str:
+    """
+    Identify the model embedding the queries, e.g. to keep cached answers of different encoders apart.
+
+    Args:
+        embeddings (Embeddings): Query embedding model.
+
+    Returns:
+        str: Model name, or the encoder's `cache_key` (e.g. an ONNX export).
+    """
+    inner = embeddings.embeddings if isinstance(embeddings, CachedEmbeddings) else embeddings
+    if isinstance(inner, EncoderEmbeddings):
+        return getattr(inner.encoder, "cache_key", type(inner.encoder).__name__)
+    return getattr(embeddings, "model_name", None) or getattr(inner, "model_name", None) or type(inner).__name__
+
+
+def embed_queries(embeddings: Embeddings, queries: List[str]) -> np.ndarray:
+    """
+    Embed queries through the model's query path, in one batch when the model allows it.
+
+    `embed_documents` is not used for queries: it would fill the document
+    embedding cache with them, and asymmetric models embed queries and
+    documents differently.
+
+    Args:
+        embeddings (Embeddings): Query embedding model.
+        queries (List[str]): Query texts.
+
+    Returns:
+        np.ndarray: Query embeddings (float32), shape (n_queries, dim).
+    """
+    inner = embeddings.embeddings if isinstance(embeddings, CachedEmbeddings) else embeddings
+    if isinstance(inner, EncoderEmbeddings):
+        # Query encoders embed a batch in one call
+        return np.asarray(inner.encoder.encode(queries), dtype=np.float32)
+    return np.asarray([embeddings.embed_query(q) for q in queries], dtype=np.float32)
+
+
+def add_documents_in_batches(
+    vectorstore: Optional["FAISS"],
+    documents: Iterable[Document],
+    embedding_model: Embeddings,
+    ids: Optional[Iterable[str]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    index_config: Optional[IndexConfig] = None
+) -> Optional["FAISS"]:
+    """
+    Stream documents through the embedding model and add the vectors to FAISS batch by batch.
+
+    Only one batch of documents and vectors is held in memory at a time, except
+    when a new IVF index is created: batches are then buffered until
+    `train_size` vectors are available to train it.
+
+    Args:
+        vectorstore (Optional[FAISS]): Existing vector store, or None to create one.
+        documents (Iterable[Document]): Input documents, possibly a generator.
+        embedding_model (Embeddings): Embedding model.
+        ids (Optional[Iterable[str]]): Docstore ids, one per document (defaults
+            to each document's `id`, random if unset).
+        batch_size (int): Number of documents embedded and added per batch.
+        index_config (Optional[IndexConfig]): Index type used when creating a
+            new vector store (default: flat).
+
+    Returns:
+        Optional[FAISS]: The updated vector store (None if there was nothing to add).
+    """
+    index_config = index_config or IndexConfig()
+    id_iter = iter(ids) if ids is not None else None
+    pending = []
+    total = 0
+    start = time.perf_counter()
+
+    def flush() -> None:
+        nonlocal vectorstore, pending, total
+        if vectorstore is None:
+            vectorstore = _new_vectorstore(
+                embedding_model, index_config, [v for _, vectors, _, _ in pending for v in vectors]
+            )
+        for texts, vectors, metadatas, batch_ids in pending:
+            vectorstore.add_embeddings(zip(texts, vectors), metadatas=metadatas, ids=batch_ids)
+            total += len(texts)
+        pending = []
+        elapsed = time.perf_counter() - start
+        logger.info(f"Indexed {total} documents ({total / elapsed:.1f} docs/sec)")
+
+    for batch in iter_batches(documents, batch_size):
+        texts = [doc.page_content for doc in batch]
+        metadatas = [doc.metadata for doc in batch]
+        if id_iter is not None:
+            batch_ids = list(islice(id_iter, len(batch)))
+        elif all(doc.id for doc in batch):
+            batch_ids = [doc.id for doc in batch]
+        else:
+            batch_ids = None
+        vectors = embedding_model.embed_documents(texts)
+        pending.append((texts, vectors, metadatas, batch_ids))
+
+        # Keep buffering until there are enough vectors to train a new IVF index
+        buffered = sum(len(p[0]) for p in pending)
+        if vectorstore is None and index_config.requires_training and buffered < index_config.train_size:
+            continue
+        flush()
+
+    if pending:
+        flush()
+    return vectorstore
+
+
+def build_vectorstore(
+    documents: Iterable[Document],
+    ids: Optional[Iterable[str]] = None,
+    embedding_model: Optional[Embeddings] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    index_config: Optional[IndexConfig] = None
+) -> "FAISS":
     """
     Generate multilingual embeddings and build a FAISS vector store.
 
     Args:
-        documents (List[Document]): Input documents.
+        documents (Iterable[Document]): Input documents, possibly a generator.
+        ids (Optional[Iterable[str]]): Docstore ids, one per document (random if omitted).
+        embedding_model (Optional[Embeddings]): Preloaded embedding model.
+        batch_size (int): Number of documents embedded and added per batch.
+        index_config (Optional[IndexConfig]): FAISS index type and parameters (default: flat).
 
     Returns:
         FAISS: LangChain-compatible FAISS index.
     """
     logger.info("Building vector store with multilingual sentence-transformers embeddings")
-    embedding_model = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    if embedding_model is None:
+        embedding_model = load_embedding_model()
+    vectorstore = add_documents_in_batches(
+        None, documents, embedding_model, ids=ids, batch_size=batch_size, index_config=index_config
     )
-    return FAISS.from_documents(documents, embedding_model)
+    if vectorstore is None:
+        raise ValueError("No documents to index")
+    if isinstance(embedding_model, CachedEmbeddings):
+        logger.info(f"Embedding cache stats: {embedding_model.stats()}")
+    return vectorstore
@@ -1,25 +1,56 @@
-from langchain.chains import RetrievalQA
-from langchain.schema import BaseRetriever
-from langchain_ollama import OllamaLLM
+import asyncio
+import hashlib
+import numpy as np
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseLLM
+from langchain_core.retrievers import BaseRetriever
 from loguru import logger
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from rag.context_builder import ContextBuilder, ContextConfig
+from rag.glossary import Glossary
+from rag.hybrid_retriever import HybridRetriever
+from rag.metadata_filter import MetadataFilter, MetadataIndex
+from rag.query_cache import QueryCache
+from rag.sparse_index import BM25Index
+from rag.vector_indexer import embed_queries, filtered_search, query_model_key
 
 class SimpleRAG:
     """
     A flexible Retrieval-Augmented Generation (RAG) wrapper using OllamaLLM
     and a vectorstore retriever. Includes metadata integration in responses.
 
+    Retrieved documents are deduplicated, merged per source and fitted to a
+    token budget, then "stuffed" into the standard LangChain QA prompt.
+    Queries can be answered one at a time (`ask`), asynchronously (`aask`)
+    or in batches (`ask_batch`), optionally restricted by a `MetadataFilter`
+    applied inside the FAISS search. With a glossary, queries are expanded
+    with the Hán / Việt / French forms of the terms they mention before
+    retrieval (the LLM still sees the original question).
+
     Attributes:
+        vectorstore (Any): Vector store the documents are retrieved from.
         retriever (BaseRetriever): Configured retriever with specified search type and k-neighbors.
-        llm (OllamaLLM): Ollama language model instance.
-        qa_chain (RetrievalQA): RAG chain combining the retriever and the LLM.
+        llm (BaseLLM): Language model instance (Ollama by default).
+        cache (Optional[QueryCache]): Exact and semantic answer cache.
+        context_builder (ContextBuilder): Assembles the retrieved chunks into the prompt context.
+        max_concurrency (int): Maximum number of concurrent LLM calls in `ask_batch` and `aask`.
+        glossary (Optional[Glossary]): Trilingual glossary used to expand queries.
     """
     def __init__(self,
         vectorstore: Any,
         model_name: str = "mistral",
         k: int = 5,
         chain_type: str = "stuff",
-        search_type: str = "similarity"):
+        search_type: str = "similarity",
+        sparse_index: Optional[BM25Index] = None,
+        cache: Optional[QueryCache] = None,
+        llm: Optional[BaseLLM] = None,
+        max_concurrency: int = 4,
+        context_config: Optional[ContextConfig] = None,
+        glossary: Optional[Glossary] = None):
         """
         Initialize the SimpleRAG pipeline.
 
@@ -27,63 +58,460 @@ class SimpleRAG:
             vectorstore (Any): A vectorstore instance (e.g., FAISS, Chroma) supporting `as_retriever()`.
             model_name (str): Name of the Ollama model to use.
             k (int): Number of top documents to retrieve.
-            chain_type (str): Method for combining retrieved documents.
-            search_type (str): Vector search algorithm.
+            chain_type (str): Method for combining retrieved documents (only "stuff").
+            search_type (str): Vector search algorithm, or "hybrid" for dense + BM25
+                retrieval merged by reciprocal rank fusion.
+            sparse_index (Optional[BM25Index]): BM25 index used by "hybrid" search
+                (built from the vectorstore if omitted).
+            cache (Optional[QueryCache]): Answer cache checked before running the chain.
+            llm (Optional[BaseLLM]): Language model to use instead of Ollama (e.g. `StubLLM`).
+            max_concurrency (int): Maximum number of concurrent LLM calls in `ask_batch` and `aask`.
+            context_config (Optional[ContextConfig]): Deduplication, merging and token budget
+                of the prompt context (defaults if omitted).
+            glossary (Optional[Glossary]): Trilingual glossary used to expand queries
+                across languages before retrieval.
 
         Returns:
             None
         """
-        logger.info("Initializing SimpleRAG with Ollama model '{}'", model_name)
+        if chain_type != "stuff":
+            raise ValueError(f"Unsupported chain type: {chain_type} (only 'stuff' is supported)")
+        logger.info("Initializing SimpleRAG with model '{}'", model_name if llm is None else llm._llm_type)
+
+        self.vectorstore = vectorstore
+        self.k = k
+        self.search_type = search_type
+        self.max_concurrency = max_concurrency
+        # Created in the event loop that first awaits it (see `_llm_semaphore`)
+        self._llm_slots: Optional[asyncio.Semaphore] = None
+        self._llm_slots_loop: Optional[asyncio.AbstractEventLoop] = None
 
         # Configure the retriever
-        self.retriever: BaseRetriever = vectorstore.as_retriever(
-            search_type=search_type,
-            search_kwargs={"k": k}
-        )
+        if search_type == "hybrid":
+            if sparse_index is None:
+                sparse_index = BM25Index.from_vectorstore(vectorstore)
+            self.retriever: BaseRetriever = HybridRetriever(
+                vectorstore=vectorstore, sparse_index=sparse_index, k=k
+            )
+        else:
+            self.retriever: BaseRetriever = vectorstore.as_retriever(
+                search_type=search_type,
+                search_kwargs={"k": k}
+            )
+
+        self.cache = cache
+        self._cache_namespace: Optional[str] = None
+        self.glossary = glossary
+        self._metadata_index: Optional[MetadataIndex] = None
+        self.context_builder = ContextBuilder(context_config)
 
         # Initialize the Ollama language model
-        self.llm = OllamaLLM(model=model_name)
+        if llm is None:
+            from langchain_ollama import OllamaLLM
+            llm = OllamaLLM(model=model_name)
+        self.llm = llm
+
+    @property
+    def metadata_index(self) -> MetadataIndex:
+        """Columnar metadata index of the vector store, built on first filtered query."""
+        if self._metadata_index is None:
+            self._metadata_index = MetadataIndex.from_vectorstore(self.vectorstore)
+        return self._metadata_index
+
+    def cache_namespace(self, metadata_filter: Optional[MetadataFilter] = None) -> str:
+        """
+        Namespace of the cached answers: the LLM, the QA prompt, the number of
+        retrieved documents, the query embedding model and the metadata filter.
+
+        Answers cached by a pipeline with a different model, prompt, k or
+        query encoder (e.g. an ONNX export instead of the float32 model), or
+        for a different filter, are not returned.
+
+        Args:
+            metadata_filter (Optional[MetadataFilter]): Filter of the query.
+
+        Returns:
+            str: Namespace passed to the `QueryCache`.
+        """
+        if self._cache_namespace is None:
+            from langchain.chains.question_answering.stuff_prompt import PROMPT
+            llm_name = getattr(self.llm, "model", None) or self.llm._llm_type
+            prompt_hash = hashlib.sha256(PROMPT.template.encode("utf-8")).hexdigest()[:16]
+            encoder = query_model_key(self.vectorstore.embedding_function)
+            self._cache_namespace = f"{llm_name}:{prompt_hash}:{self.k}:{encoder}"
+        if metadata_filter is None or metadata_filter.is_empty():
+            return self._cache_namespace
+        return f"{self._cache_namespace}:{metadata_filter.cache_key()}"
+
+    def expand_query(self, query: str) -> str:
+        """
+        Expand a query with the other-language forms of the glossary terms it contains.
+
+        Args:
+            query (str): The user's question.
+
+        Returns:
+            str: The query to retrieve with (unchanged without a glossary).
+        """
+        return query if self.glossary is None else self.glossary.expand(query)
+
+    def retrieve(
+        self,
+        query: str,
+        metadata_filter: Optional[MetadataFilter] = None,
+        k: Optional[int] = None
+    ) -> List[Document]:
+        """
+        Retrieve the top-k documents for a query.
+
+        Args:
+            query (str): The user's question.
+            metadata_filter (Optional[MetadataFilter]): Only retrieve documents matching it.
+            k (Optional[int]): Number of documents (default: `self.k`).
+
+        Returns:
+            List[Document]: Retrieved documents.
+        """
+        query = self.expand_query(query)
+        k = k or self.k
+        if metadata_filter is None or metadata_filter.is_empty():
+            if self.search_type == "mmr":
+                # MMR picks among `fetch_k` candidates (20 by default): never fewer than k
+                return self.retriever.invoke(query, k=k, fetch_k=max(20, k))
+            return self.retriever.invoke(query, k=k)
+
+        if self.search_type == "mmr":
+            # FAISS has no pre-filtered MMR: post-filter a larger candidate pool instead
+            return self.vectorstore.max_marginal_relevance_search(
+                query, k=k, fetch_k=20 * k, filter=metadata_filter.matches
+            )
+        row_mask = self.metadata_index.row_mask(metadata_filter)
+        if self.search_type == "hybrid":
+            return self.retriever.invoke(query, row_mask=row_mask, k=k)
+        vector = np.asarray([self.vectorstore.embeddings.embed_query(query)], dtype=np.float32)
+        return [doc for doc, _ in filtered_search(self.vectorstore, vector, k, row_mask)[0]]
+
+    def retrieve_batch(
+        self,
+        queries: List[str],
+        metadata_filter: Optional[MetadataFilter] = None
+    ) -> List[List[Document]]:
+        """
+        Retrieve documents for many queries at once.
+
+        For plain similarity search over FAISS, the queries are embedded with
+        `embed_queries` and the index is searched with the whole query matrix;
+        other search types retrieve query by query.
+
+        Args:
+            queries (List[str]): The users' questions.
+            metadata_filter (Optional[MetadataFilter]): Only retrieve documents matching it.
+
+        Returns:
+            List[List[Document]]: Retrieved documents for each query.
+        """
+        if self.search_type != "similarity" or not hasattr(self.vectorstore, "index"):
+            return [self.retrieve(q, metadata_filter) for q in queries]
+
+        queries = [self.expand_query(q) for q in queries]
+        vectors = embed_queries(self.vectorstore.embeddings, queries)
+        return [[doc for doc, _ in row] for row in self.search_by_vectors(vectors, metadata_filter)]
+
+    def search_by_vectors(
+        self,
+        vectors: np.ndarray,
+        metadata_filter: Optional[MetadataFilter] = None,
+        k: Optional[int] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Similarity search of already embedded queries with one FAISS call.
+
+        Args:
+            vectors (np.ndarray): Query embeddings, shape (n_queries, dim).
+            metadata_filter (Optional[MetadataFilter]): Only retrieve documents matching it.
+            k (Optional[int]): Number of documents per query (default: `self.k`).
+
+        Returns:
+            List[List[Tuple[Document, float]]]: (document, distance) pairs per query, best first.
+        """
+        k = k or self.k
+        if metadata_filter is not None and not metadata_filter.is_empty():
+            return filtered_search(self.vectorstore, vectors, k, self.metadata_index.row_mask(metadata_filter))
+        distances, indices = self.vectorstore.index.search(np.ascontiguousarray(vectors, dtype=np.float32), k)
+        id_map = self.vectorstore.index_to_docstore_id
+        return [
+            [(self.vectorstore.docstore.search(id_map[i]), float(d)) for i, d in zip(row, dists) if i != -1]
+            for row, dists in zip(indices.tolist(), distances.tolist())
+        ]
+
+    def build_prompt(self, query: str, sources: List[Document]) -> Tuple[str, List[Document]]:
+        """
+        Stuff the retrieved documents into the QA prompt, after merging chunks of
+        the same source, dropping near-duplicates and fitting the token budget.
+
+        Args:
+            query (str): The user's question.
+            sources (List[Document]): Retrieved documents.
+
+        Returns:
+            Tuple[str, List[Document]]: Prompt sent to the LLM, and the documents
+                actually in its context (the ones to cite).
+        """
+        from langchain.chains.question_answering.stuff_prompt import PROMPT
+        context, kept = self.context_builder.assemble(sources)
+        return PROMPT.format(context=context, question=query), kept
+
+    @staticmethod
+    def format_sources(sources: List[Document]) -> str:
+        """
+        Build the reference section listing the metadata of the documents in the prompt context.
+
+        Args:
+            sources (List[Document]): Documents kept by `build_prompt`.
+
+        Returns:
+            str: Markdown "Sources" block, or an empty string if there are no sources.
+        """
+        if not sources:
+            return ""
+        # Use literal '\n' for newlines
+        refs = ["\n**Sources:**"]
+        for doc in sources:
+            m = doc.metadata
+            title = m.get('title_main', 'Unknown title')
+            authors = ", ".join(m.get('authors', [])) or 'Unknown authors'
+            date = m.get('publication_date', 'Unknown date')
+            refs.append(f"- **{title}** by {authors} ({date})")
+        return "\n" + "\n".join(refs)
+
+    def _finish(
+        self,
+        query: str,
+        answer: str,
+        sources: List[Document],
+        metadata_filter: Optional[MetadataFilter] = None
+    ) -> Dict[str, Any]:
+        """
+        Append source metadata to an answer and store the response in the cache.
 
-        # Build the RetrievalQA chain with explicit chain_type
-        self.qa_chain = RetrievalQA.from_chain_type(
-            llm=self.llm,
-            chain_type=chain_type,
-            retriever=self.retriever
+        Args:
+            query (str): The user's question.
+            answer (str): Generated answer.
+            sources (List[Document]): Documents in the prompt context.
+            metadata_filter (Optional[MetadataFilter]): Filter the documents were retrieved
+                with (part of the cache namespace).
+
+        Returns:
+            Dict[str, Any]: Response with "result" and "source_documents".
+        """
+        logger.debug(
+            "Retrieved {} source documents for the query",
+            len(sources)
         )
+        response = {"result": answer + self.format_sources(sources), "source_documents": sources}
+        if self.cache is not None:
+            self.cache.put(query, response, self.cache_namespace(metadata_filter))
+        return response
+
+    def _cached(self, query: str, metadata_filter: Optional[MetadataFilter] = None) -> Optional[Dict[str, Any]]:
+        """
+        Look up a query in the answer cache, if any.
+
+        Args:
+            query (str): The user's question.
+            metadata_filter (Optional[MetadataFilter]): Filter of the query; only answers
+                cached for the same filter apply.
 
-    def ask(self, query: str) -> Dict[str, Any]:
+        Returns:
+            Optional[Dict[str, Any]]: Cached response, or None.
+        """
+        if self.cache is None:
+            return None
+        cached = self.cache.get(query, self.cache_namespace(metadata_filter))
+        if cached is not None:
+            logger.info("Answer served from cache (hit rate {:.0%})", self.cache.stats()["hit_rate"])
+        return cached
+
+    def ask(self, query: str, metadata_filter: Optional[MetadataFilter] = None) -> Dict[str, Any]:
         """
         Execute a query through the RAG pipeline, then append source metadata.
 
         Args:
             query (str): The user's question.
+            metadata_filter (Optional[MetadataFilter]): Only retrieve documents matching it
+                (answers are cached per filter).
 
         Returns:
             Dict[str, Any]: A dictionary containing:
                 - "result": Generated answer with embedded references.
-                - "source_documents": List of retrieved document objects.
+                - "source_documents": Retrieved documents kept in the prompt context.
         """
         logger.info("Processing query: '{}'", query)
 
-        # Invoke the QA chain
-        result = self.qa_chain.invoke({"query": query})
-        answer = result.get("result", "")
-        sources = result.get("source_documents", [])
-
-        # Build a reference section with metadata
-        if sources:
-            # Use literal '\n' for newlines
-            refs = ["\n**Sources:**"]
-            for doc in sources:
-                m = doc.metadata
-                title = m.get('title_main', 'Unknown title')
-                authors = ", ".join(m.get('authors', [])) or 'Unknown authors'
-                date = m.get('publication_date', 'Unknown date')
-                refs.append(f"- **{title}** by {authors} ({date})")
-            answer += "\n" + "\n".join(refs)
+        cached = self._cached(query, metadata_filter)
+        if cached is not None:
+            return cached
 
-        logger.debug(
-            "Retrieved %d source documents for the query",
-            len(sources)
-        )
-        return {"result": answer, "source_documents": sources}
+        start = time.perf_counter()
+        sources = self.retrieve(query, metadata_filter)
+        retrieval_s = time.perf_counter() - start
+        prompt, sources = self.build_prompt(query, sources)
+        answer = self.llm.invoke(prompt)
+        generation_s = time.perf_counter() - start - retrieval_s
+        logger.info("Retrieval: {:.3f}s, generation: {:.3f}s", retrieval_s, generation_s)
+        return self._finish(query, answer, sources, metadata_filter)
+
+    def ask_stream(self, query: str, metadata_filter: Optional[MetadataFilter] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming version of `ask`: the source references are emitted as soon as
+        the prompt context is assembled, then the answer tokens as the LLM
+        generates them.
+
+        Args:
+            query (str): The user's question.
+            metadata_filter (Optional[MetadataFilter]): Only retrieve documents matching it
+                (answers are cached per filter).
+
+        Yields:
+            Dict[str, Any]: Events, in order:
+                - {"type": "sources", "content": Markdown "Sources" block,
+                   "source_documents": retrieved documents kept in the prompt context}
+                - {"type": "token", "content": generated text} (repeated)
+                - {"type": "done", "timings": retrieval, time-to-first-token and
+                   generation durations in seconds}
+        """
+        logger.info("Processing query: '{}'", query)
+        start = time.perf_counter()
+
+        cached = self._cached(query, metadata_filter)
+        if cached is not None:
+            sources = cached["source_documents"]
+            refs = self.format_sources(sources)
+            yield {"type": "sources", "content": refs, "source_documents": sources}
+            yield {"type": "token", "content": cached["result"].removesuffix(refs)}
+            elapsed = time.perf_counter() - start
+            yield {"type": "done", "timings": {"retrieval_s": elapsed, "first_token_s": elapsed, "generation_s": 0.0}}
+            return
+
+        sources = self.retrieve(query, metadata_filter)
+        retrieval_s = time.perf_counter() - start
+        prompt, sources = self.build_prompt(query, sources)
+        yield {"type": "sources", "content": self.format_sources(sources), "source_documents": sources}
+
+        tokens = []
+        first_token_s = None
+        for token in self.llm.stream(prompt):
+            if first_token_s is None:
+                first_token_s = time.perf_counter() - start
+            tokens.append(token)
+            yield {"type": "token", "content": token}
+        generation_s = time.perf_counter() - start - retrieval_s
+
+        timings = {
+            "retrieval_s": retrieval_s,
+            "first_token_s": first_token_s if first_token_s is not None else retrieval_s,
+            "generation_s": generation_s,
+        }
+        logger.info("Retrieval: {:.3f}s, first token: {:.3f}s, generation: {:.3f}s", *timings.values())
+        self._finish(query, "".join(tokens), sources, metadata_filter)
+        yield {"type": "done", "timings": timings}
+
+    async def aask(self, query: str, metadata_filter: Optional[MetadataFilter] = None) -> Dict[str, Any]:
+        """
+        Asynchronous version of `ask`: retrieval runs in a worker thread and
+        the LLM is awaited, so many queries can be in flight at once (at most
+        `max_concurrency` LLM calls).
+
+        Args:
+            query (str): The user's question.
+            metadata_filter (Optional[MetadataFilter]): Only retrieve documents matching it
+                (answers are cached per filter).
+
+        Returns:
+            Dict[str, Any]: Same dictionary as `ask`.
+        """
+        logger.info("Processing query: '{}'", query)
+
+        # The cache does SQLite I/O and may embed the query: keep it off the event loop
+        cached = await asyncio.to_thread(self._cached, query, metadata_filter)
+        if cached is not None:
+            return cached
+
+        sources = await asyncio.to_thread(self.retrieve, query, metadata_filter)
+        return await self.agenerate(query, sources, metadata_filter)
+
+    async def agenerate(
+        self,
+        query: str,
+        sources: List[Document],
+        metadata_filter: Optional[MetadataFilter] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate the answer to a query from already retrieved documents (at most
+        `max_concurrency` concurrent LLM calls).
+
+        Args:
+            query (str): The user's question.
+            sources (List[Document]): Retrieved documents.
+            metadata_filter (Optional[MetadataFilter]): Filter the documents were retrieved with.
+
+        Returns:
+            Dict[str, Any]: Same dictionary as `ask`.
+        """
+        prompt, sources = self.build_prompt(query, sources)
+        async with self._llm_semaphore():
+            answer = await self.llm.ainvoke(prompt)
+        return await asyncio.to_thread(self._finish, query, answer, sources, metadata_filter)
+
+    def _llm_semaphore(self) -> asyncio.Semaphore:
+        """
+        Semaphore bounding concurrent LLM calls, created in the running event loop.
+
+        A semaphore is bound to the loop it is first used in, so a new one is
+        created when the pipeline is used from another loop (e.g. successive
+        `asyncio.run` calls).
+
+        Returns:
+            asyncio.Semaphore: Semaphore with `max_concurrency` slots.
+        """
+        loop = asyncio.get_running_loop()
+        if self._llm_slots is None or self._llm_slots_loop is not loop:
+            self._llm_slots = asyncio.Semaphore(self.max_concurrency)
+            self._llm_slots_loop = loop
+        return self._llm_slots
+
+    def ask_batch(
+        self,
+        queries: List[str],
+        max_concurrency: Optional[int] = None,
+        metadata_filter: Optional[MetadataFilter] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Answer many queries: cached answers are reused, retrieval is batched,
+        and LLM calls run concurrently.
+
+        Args:
+            queries (List[str]): The users' questions.
+            max_concurrency (Optional[int]): Maximum number of concurrent LLM calls
+                (default: `self.max_concurrency`).
+            metadata_filter (Optional[MetadataFilter]): Only retrieve documents matching it
+                (answers are cached per filter).
+
+        Returns:
+            List[Dict[str, Any]]: One `ask` response per query, in order.
+        """
+        logger.info("Processing batch of {} queries", len(queries))
+        responses: List[Optional[Dict[str, Any]]] = [self._cached(q, metadata_filter) for q in queries]
+        pending = [i for i, r in enumerate(responses) if r is None]
+        if not pending:
+            return responses
+
+        pending_queries = [queries[i] for i in pending]
+        all_sources = self.retrieve_batch(pending_queries, metadata_filter)
+        prompts, all_sources = zip(*[self.build_prompt(q, s) for q, s in zip(pending_queries, all_sources)])
+        # LangChain's LLM.batch generates sequentially, so fan out over threads
+        with ThreadPoolExecutor(max_workers=max_concurrency or self.max_concurrency) as executor:
+            answers = list(executor.map(self.llm.invoke, prompts))
+        for i, query, answer, sources in zip(pending, pending_queries, answers, all_sources):
+            responses[i] = self._finish(query, answer, sources, metadata_filter)
+        return responses
@@ -0,0 +1,19 @@
+from rag.glossary import Glossary
+
+ENTRIES = [
+    {"term": "Văn minh", "han": "文明", "vi": "văn minh", "fr": "Civilisation"},
+    {"term": "Văn", "han": "文", "vi": "văn chương", "fr": "Lettres"},
+    {"term": "Minh", "han": "明", "vi": "sáng", "fr": "Lumière"},
+]
+
+
+def test_only_the_longest_overlapping_term_is_matched() -> None:
+    glossary = Glossary(ENTRIES)
+
+    assert glossary.tag("Nền văn minh nước Nam") == ["Văn minh"]
+    assert glossary.tag("文明") == ["Văn minh"]
+    # Neither "Văn" nor "Minh" is expanded inside "văn minh"
+    assert glossary.expand("văn minh là gì?") == "văn minh là gì? (文明; Civilisation)"
+
+    # The shorter terms still match on their own
+    assert glossary.tag("văn và minh") == ["Văn", "Minh"]
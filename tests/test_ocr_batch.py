@@ -0,0 +1,50 @@
+import os
+import struct
+import zlib
+from pathlib import Path
+
+from ocr.ocr_batch import load_manifest, ocr_batch
+
+
+def write_png(path: Path, shade: int, size: int = 8) -> None:
+    """Write a small grayscale PNG of a uniform shade."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = b"".join(b"\x00" + bytes([shade]) * size for _ in range(size))
+    path.write_bytes(
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 0, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+def test_rerun_only_processes_pending_pages(tmp_path: Path) -> None:
+    scans, output = tmp_path / "scans", tmp_path / "ocr"
+    scans.mkdir()
+    for page in range(3):
+        write_png(scans / f"page_{page}.png", shade=60 * page)
+    # An unreadable "image" makes its page fail
+    (scans / "page_3.png").mkdir()
+
+    summary = ocr_batch(scans, output, extension="png", workers=2, backend="fake")
+    assert (summary["done"], summary["skipped"], summary["failed"]) == (3, 0, 1)
+    pages = load_manifest(output)["pages"]
+    assert pages["page_3.png"]["status"] == "failed" and pages["page_3.png"]["error"]
+    untouched_mtime = (output / "page_0.txt").stat().st_mtime_ns
+
+    # Fix the failed page and rescan another one: only those two are redone
+    (scans / "page_3.png").rmdir()
+    write_png(scans / "page_3.png", shade=255)
+    rescanned = scans / "page_1.png"
+    write_png(rescanned, shade=200)
+    later = (output / "page_1.txt").stat().st_mtime + 10
+    os.utime(rescanned, (later, later))
+
+    summary = ocr_batch(scans, output, extension="png", workers=2, backend="fake")
+    assert (summary["done"], summary["skipped"], summary["failed"]) == (2, 2, 0)
+    pages = load_manifest(output)["pages"]
+    assert {name: entry["status"] for name, entry in pages.items()} == {f"page_{i}.png": "done" for i in range(4)}
+    assert (output / "page_0.txt").stat().st_mtime_ns == untouched_mtime
+    assert (output / "page_3.txt").read_text(encoding="utf-8").startswith("page_3 ")
@@ -0,0 +1,40 @@
+import random
+from typing import Sequence
+
+import pytest
+
+from ocr import ocr_quality_report
+from ocr.ocr_quality_report import aggregate_scores, edit_distance, score_page
+
+
+def reference_distance(a: Sequence, b: Sequence) -> int:
+    """Textbook full-matrix Levenshtein distance."""
+    table = [[i + j if i * j == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            table[i][j] = min(
+                table[i - 1][j] + 1, table[i][j - 1] + 1, table[i - 1][j - 1] + (a[i - 1] != b[j - 1])
+            )
+    return table[-1][-1]
+
+
+def test_numpy_edit_distance_matches_reference(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Force the NumPy fallback even when rapidfuzz is installed
+    monkeypatch.setattr(ocr_quality_report, "Levenshtein", None)
+    rng = random.Random(0)
+    for _ in range(500):
+        a = "".join(rng.choices("aăbc ", k=rng.randint(0, 12)))
+        b = "".join(rng.choices("aăbc ", k=rng.randint(0, 12)))
+        assert edit_distance(a, b) == reference_distance(a, b), (a, b)
+    assert edit_distance("văn minh nước nam".split(), "văn minh nam".split()) == 1
+
+
+def test_aggregate_scores_weights_pages_by_length() -> None:
+    short = score_page("ab", "xb")                      # 1 / 2 characters wrong
+    long = score_page("a" * 98, "a" * 98)               # 0 / 98 characters wrong
+    assert (short["CER"], long["CER"]) == (0.5, 0.0)
+
+    scores = aggregate_scores([short, long])
+    assert scores["CER"] == pytest.approx(1 / 100)      # not the mean of page rates (0.25)
+    assert scores["WER"] == pytest.approx(1 / 2)
+    assert aggregate_scores([]) == {"WER": None, "CER": None}
@@ -0,0 +1,94 @@
+import hashlib
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+from urllib.parse import unquote
+
+import pytest
+
+from data_extraction.wikisource_crawler import CrawlConfig, WikisourceCrawler
+
+PAGES = {
+    "/wiki/Nam_Phong": (
+        '<div class="mw-parser-output">'
+        '<a href="/wiki/Nam_Phong/Số_1">Số 1</a> <a href="/wiki/Nam_Phong/Số_2#mục">Số 2</a>'
+        ' <a href="/wiki/Trang_khác">Trang khác</a></div>'
+    ),
+    "/wiki/Nam_Phong/Số_1": '<div class="mw-parser-output"><p>Số thứ nhất</p></div>',
+    "/wiki/Nam_Phong/Số_2": '<div class="mw-parser-output"><p>Số thứ hai</p></div>',
+    "/wiki/Trang_khác": '<div class="mw-parser-output"><p>Ngoài tạp chí</p></div>',
+}
+
+
+class WikiHandler(BaseHTTPRequestHandler):
+    """Serve `PAGES` with ETags, answering 503 to the first `unavailable` requests of a page."""
+    requests: Counter = Counter()
+    unavailable: Dict[str, int] = {}
+
+    def do_GET(self) -> None:
+        path = unquote(self.path)
+        self.requests[path] += 1
+        if self.requests[path] <= self.unavailable.get(path, 0):
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        if path not in PAGES:
+            self.send_error(404)
+            return
+        body = PAGES[path].encode("utf-8")
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def wiki_server() -> Iterator[Tuple[str, type]]:
+    """Local stand-in for Wikisource on an ephemeral port."""
+    handler = type("Handler", (WikiHandler,), {"requests": Counter(), "unavailable": {}})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", handler
+    server.shutdown()
+    server.server_close()
+
+
+def crawler(output_dir: Path) -> WikisourceCrawler:
+    return WikisourceCrawler(output_dir, CrawlConfig(requests_per_second=0, max_workers=2, backoff=0.01, timeout=5))
+
+
+def test_crawl_follows_subpages_then_revalidates(tmp_path: Path, wiki_server: Tuple[str, type]) -> None:
+    base_url, handler = wiki_server
+    counts = crawler(tmp_path).crawl([f"{base_url}/wiki/Nam_Phong"])
+
+    # The index page and the two issues below it, not the page outside the hierarchy
+    assert counts == {"downloaded": 3, "not_modified": 0, "failed": 0}
+    assert handler.requests["/wiki/Trang_khác"] == 0
+    assert (tmp_path / "Nam-Phong" / "So-2.html").read_text(encoding="utf-8") == PAGES["/wiki/Nam_Phong/Số_2"]
+
+    # A second crawl (with the manifest reloaded) revalidates every page with its ETag
+    counts = crawler(tmp_path).crawl([f"{base_url}/wiki/Nam_Phong"])
+    assert counts == {"downloaded": 0, "not_modified": 3, "failed": 0}
+
+
+def test_crawl_retries_unavailable_pages(tmp_path: Path, wiki_server: Tuple[str, type]) -> None:
+    base_url, handler = wiki_server
+    handler.unavailable["/wiki/Nam_Phong/Số_1"] = 1
+    counts = crawler(tmp_path).crawl([f"{base_url}/wiki/Nam_Phong"])
+
+    assert counts == {"downloaded": 3, "not_modified": 0, "failed": 0}
+    assert handler.requests["/wiki/Nam_Phong/Số_1"] == 2